@@ -5,11 +5,19 @@ from framework.serialization.serializer import configure_serializer
 from quart import Quart
 
 from routes.devices import devices_bp
+from routes.diagnostics import diagnostics_bp
 from routes.events import events_bp
 from routes.health import health_bp
 from routes.preset import preset_bp
 from routes.region import region_bp
 from routes.scene import scene_bp
+from services.kasa_auth_service import KasaAuthService
+from services.kasa_client_response_service import KasaClientResponseService
+from services.kasa_device_log_service import KasaDeviceLogService
+from services.kasa_discovery_service import KasaDiscoveryService
+from services.kasa_event_service import KasaEventService
+from services.kasa_polling_service import KasaPollingService
+from services.kasa_reconciler_service import KasaReconcilerService
 from utils.provider import ContainerProvider
 
 load_dotenv()
@@ -25,6 +33,7 @@ app.register_blueprint(scene_bp)
 app.register_blueprint(preset_bp)
 app.register_blueprint(region_bp)
 app.register_blueprint(events_bp)
+app.register_blueprint(diagnostics_bp)
 
 
 @app.before_serving
@@ -32,6 +41,29 @@ async def startup():
     RequestContextProvider.initialize_provider(
         app=app)
 
+    await provider.resolve(KasaDeviceLogService).initialize()
+    await provider.resolve(KasaClientResponseService).initialize()
+    provider.resolve(KasaEventService).start()
+    provider.resolve(KasaAuthService).start()
+    provider.resolve(KasaReconcilerService).start()
+    provider.resolve(KasaPollingService).start()
+    provider.resolve(KasaDiscoveryService).start()
+
+
+@app.after_serving
+async def shutdown():
+    # Stop the background loops first, they write to the
+    # buffers and publisher stopped below
+    await provider.resolve(KasaReconcilerService).stop()
+    await provider.resolve(KasaPollingService).stop()
+    await provider.resolve(KasaDiscoveryService).stop()
+
+    # Flush buffered writes before the worker exits
+    await provider.resolve(KasaDeviceLogService).stop()
+    await provider.resolve(KasaClientResponseService).stop()
+    await provider.resolve(KasaEventService).stop()
+    await provider.resolve(KasaAuthService).stop()
+
 
 # swag = Swagger(
 #     app=app,
@@ -0,0 +1,168 @@
+'''
+Model construction and serialization benchmark for
+list endpoint sized collections
+
+    python -m benchmarks.bench_models --count 5000
+'''
+
+import argparse
+import time
+import tracemalloc
+import uuid
+
+from domain.constants import KasaDeviceType
+from domain.kasa.device import DeviceLog, KasaDevice
+from domain.kasa.preset import KasaPreset
+from domain.kasa.scene import KasaScene
+
+
+def get_device_entity():
+    return {
+        'device_id': str(uuid.uuid4()),
+        'device_name': str(uuid.uuid4()),
+        'device_type': KasaDeviceType.KasaLight,
+        'device_sync': True,
+        'region_id': str(uuid.uuid4())
+    }
+
+
+def get_preset_entity():
+    return {
+        'preset_id': str(uuid.uuid4()),
+        'preset_name': str(uuid.uuid4()),
+        'device_type': KasaDeviceType.KasaLight,
+        'definition': {
+            'state': True,
+            'brightness': 100,
+            'hue': 0,
+            'saturation': 0,
+            'temperature': 2700
+        },
+        'created_date': int(time.time()),
+        'modified_date': int(time.time())
+    }
+
+
+def get_scene_entity():
+    return {
+        'scene_id': str(uuid.uuid4()),
+        'scene_name': str(uuid.uuid4()),
+        'scene_category_id': str(uuid.uuid4()),
+        'mapping': [{
+            'preset_id': str(uuid.uuid4()),
+            'devices': [str(uuid.uuid4())]
+        }],
+        'flow': None,
+        'modified_date': int(time.time()),
+        'created_date': int(time.time())
+    }
+
+
+def get_log_entity():
+    return DeviceLog(
+        log_id=str(uuid.uuid4()),
+        timestamp=int(time.time()),
+        level='INFO',
+        device_id=str(uuid.uuid4()),
+        device_name=str(uuid.uuid4()),
+        preset_id=str(uuid.uuid4()),
+        preset_name=str(uuid.uuid4()),
+        state_key=str(uuid.uuid4()),
+        message=str(uuid.uuid4())).to_entity()
+
+
+CASES = {
+    'device': (get_device_entity, [
+        ('constructor', lambda data: KasaDevice(data=data)),
+        ('from_entity', lambda data: KasaDevice.from_entity(data=data))
+    ]),
+    'preset': (get_preset_entity, [
+        ('from_dict', lambda data: KasaPreset.from_dict(data=data)),
+        ('from_entity', lambda data: KasaPreset.from_entity(data=data))
+    ]),
+    'scene': (get_scene_entity, [
+        ('from_dict', lambda data: KasaScene.from_dict(data=data)),
+        ('from_entity', lambda data: KasaScene.from_entity(data=data))
+    ]),
+    'device_log': (get_log_entity, [
+        ('from_entity', lambda data: DeviceLog.from_entity(data=data))
+    ])
+}
+
+
+def measure(func, entities, iterations):
+    # Best of n to reduce scheduler noise
+    best = None
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func(entities)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def measure_memory(constructor, entities):
+    tracemalloc.start()
+    models = [constructor(entity) for entity in entities]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del models
+    return current
+
+
+def run(count, iterations):
+    results = list()
+
+    for name, (factory, constructors) in CASES.items():
+        entities = [factory() for _ in range(count)]
+
+        for label, constructor in constructors:
+            models = [constructor(entity) for entity in entities]
+
+            build = measure(
+                lambda items: [constructor(entity) for entity in items],
+                entities,
+                iterations)
+            serialize = measure(
+                lambda items: [model.to_dict() for model in items],
+                models,
+                iterations)
+
+            results.append({
+                'model': name,
+                'path': label,
+                'count': count,
+                'build_ms': round(build * 1000, 3),
+                'to_dict_ms': round(serialize * 1000, 3),
+                # Slots only save memory if no class in the
+                # hierarchy gives the instance a __dict__
+                'has_dict': hasattr(models[0], '__dict__'),
+                'bytes_per_model': round(
+                    measure_memory(constructor, entities) / count, 1)
+            })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=5000)
+    parser.add_argument('--iterations', type=int, default=5)
+    args = parser.parse_args()
+
+    results = run(
+        count=args.count,
+        iterations=args.iterations)
+
+    print(f"{'model':<12}{'path':<14}{'build ms':>12}{'to_dict ms':>12}"
+          f"{'__dict__':>10}{'bytes/model':>14}")
+    for result in results:
+        print(f"{result['model']:<12}{result['path']:<14}"
+              f"{result['build_ms']:>12}{result['to_dict_ms']:>12}"
+              f"{str(result['has_dict']):>10}{result['bytes_per_model']:>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,421 @@
+'''
+End to end scene execution benchmark, seeds a fleet of
+devices, presets and a scene then times
+`KasaSceneService.run_scene` against the Kasa cloud
+simulator
+
+Needs the Mongo and Redis instances from the service
+configuration, seeded documents are removed afterwards
+
+    python -m benchmarks.bench_scenes --devices 10,100,1000 --runs 20
+'''
+
+import argparse
+import asyncio
+import datetime
+import json
+import math
+import os
+import platform
+import subprocess
+import time
+import uuid
+from collections import Counter
+
+from framework.clients.cache_client import CacheClientAsync
+from framework.configuration.configuration import Configuration
+from framework.di.service_provider import ServiceProvider
+from httpx import AsyncClient, AsyncHTTPTransport
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+from clients.kasa_client import KasaClient
+from clients.kasa_simulator import KasaCloudSimulator
+from data.repositories.kasa_client_response_repository import \
+    KasaClientResponseRepository
+from data.repositories.kasa_device_repository import KasaDeviceRepository
+from data.repositories.kasa_preset_repository import KasaPresetRepository
+from data.repositories.kasa_scene_repository import KasaSceneRepository
+from domain.constants import ClientResponseMode, KasaDeviceType
+from domain.rest import RunSceneRequest
+from services.kasa_client_response_service import KasaClientResponseService
+from services.kasa_device_log_service import KasaDeviceLogService
+from services.kasa_scene_service import KasaSceneService
+from utils.provider import ContainerProvider
+
+RESULTS_DIRECTORY = os.path.join(
+    os.path.dirname(__file__), 'results')
+
+PRESET_DEFINITIONS = {
+    KasaDeviceType.KasaPlug: {
+        'state': True
+    },
+    KasaDeviceType.KasaLight: {
+        'state': True,
+        'brightness': 80,
+        'hue': 30,
+        'saturation': 60,
+        'temperature': 0
+    }
+}
+
+
+class MongoCommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = Counter()
+
+    def started(self, event):
+        self.commands[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+class CacheCallCounter:
+    '''
+    Counts calls made through the cache client by method
+    '''
+
+    def __init__(self, cache_client):
+        self._cache_client = cache_client
+        self.calls = Counter()
+
+    def __getattr__(self, name):
+        attr = getattr(self._cache_client, name)
+
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            self.calls[name] += 1
+            return attr(*args, **kwargs)
+
+        return call
+
+
+def get_mongo_cnxn():
+    mongo_host = os.environ.get('MONGO_HOST') or 'localhost'
+    mongo_port = os.environ.get('LOCAL_MONGO_PORT_OVERRIDE', 27017)
+
+    return f'mongodb://{mongo_host}:{mongo_port}'
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def percentile(values, pct):
+    # Nearest rank
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+
+    return ordered[rank - 1]
+
+
+def get_delta(after, before):
+    return {key: after[key] - before.get(key, 0)
+            for key in after
+            if after[key] - before.get(key, 0) > 0}
+
+
+def build_provider(args, device_count, mongo_counter, state):
+    services = ContainerProvider.configure_container()
+
+    def configure_configuration(container):
+        configuration = Configuration()
+
+        # Keep client responses in process rather than
+        # publishing them to the service bus
+        configuration.events['client_response_mode'] = ClientResponseMode.Local
+
+        return configuration
+
+    def configure_mongo(container):
+        return AsyncIOMotorClient(
+            get_mongo_cnxn(),
+            event_listeners=[mongo_counter])
+
+    def configure_cache(container):
+        state['cache'] = CacheCallCounter(
+            CacheClientAsync(
+                container.resolve(Configuration)))
+
+        return state['cache']
+
+    def configure_http(container):
+        configuration = container.resolve(Configuration)
+
+        state['simulator'] = KasaCloudSimulator.from_config(
+            base_url=configuration.kasa.get('base_url'),
+            settings={
+                'seed': args.seed,
+                'fleet': {
+                    'plugs': device_count // 2,
+                    'lights': device_count - device_count // 2,
+                    'latency': {
+                        'distribution': 'lognormal',
+                        'median_ms': args.latency_ms,
+                        'sigma': args.latency_sigma
+                    },
+                    'error_rate': args.error_rate
+                }
+            },
+            fallback=AsyncHTTPTransport())
+
+        return AsyncClient(
+            timeout=None,
+            transport=state['simulator'])
+
+    services.add_singleton(
+        dependency_type=Configuration,
+        factory=configure_configuration)
+    services.add_singleton(
+        dependency_type=AsyncIOMotorClient,
+        factory=configure_mongo)
+    services.add_singleton(
+        dependency_type=CacheClientAsync,
+        factory=configure_cache)
+    services.add_singleton(
+        dependency_type=AsyncClient,
+        factory=configure_http)
+
+    provider = ServiceProvider(
+        service_collection=services)
+    provider.build()
+
+    return provider
+
+
+async def seed(provider, simulator):
+    now = int(time.time())
+    presets = dict()
+
+    for device_type, definition in PRESET_DEFINITIONS.items():
+        presets[device_type] = {
+            'preset_id': str(uuid.uuid4()),
+            'preset_name': f'bench-{device_type}',
+            'device_type': device_type,
+            'definition': definition,
+            'created_date': now,
+            'modified_date': now
+        }
+
+    devices = [{
+        'device_id': device.device_id,
+        'device_name': device.alias,
+        'device_type': device.device_type,
+        'device_sync': True,
+        'region_id': None
+    } for device in simulator.devices]
+
+    scene = {
+        'scene_id': str(uuid.uuid4()),
+        'scene_name': f'bench-{uuid.uuid4()}',
+        'scene_category_id': None,
+        'mapping': [{
+            'preset_id': preset.get('preset_id'),
+            'devices': [device.get('device_id') for device in devices
+                        if device.get('device_type') == device_type]
+        } for device_type, preset in presets.items()],
+        'flow': None,
+        'created_date': now,
+        'modified_date': now
+    }
+
+    device_repository = provider.resolve(KasaDeviceRepository)
+    preset_repository = provider.resolve(KasaPresetRepository)
+    scene_repository = provider.resolve(KasaSceneRepository)
+
+    await device_repository.collection.delete_many({
+        'device_id': {'$in': [device.get('device_id') for device in devices]}
+    })
+    await device_repository.collection.insert_many(devices)
+    await preset_repository.collection.insert_many(list(presets.values()))
+    await scene_repository.insert(document=scene)
+
+    return {
+        'device_ids': [device.get('device_id') for device in devices],
+        'preset_ids': [preset.get('preset_id') for preset in presets.values()],
+        'scene_id': scene.get('scene_id')
+    }
+
+
+async def cleanup(provider, seeded):
+    await provider.resolve(KasaDeviceRepository).collection.delete_many({
+        'device_id': {'$in': seeded.get('device_ids')}
+    })
+    await provider.resolve(KasaPresetRepository).collection.delete_many({
+        'preset_id': {'$in': seeded.get('preset_ids')}
+    })
+    await provider.resolve(KasaSceneRepository).collection.delete_many({
+        'scene_id': seeded.get('scene_id')
+    })
+    await provider.resolve(KasaClientResponseRepository).collection.delete_many({
+        'device_id': {'$in': seeded.get('device_ids')}
+    })
+
+
+async def run_size(args, device_count):
+    mongo_counter = MongoCommandCounter()
+    state = dict()
+
+    provider = build_provider(
+        args=args,
+        device_count=device_count,
+        mongo_counter=mongo_counter,
+        state=state)
+
+    scene_service: KasaSceneService = provider.resolve(KasaSceneService)
+    kasa_client: KasaClient = provider.resolve(KasaClient)
+    device_log_service = provider.resolve(KasaDeviceLogService)
+    client_response_service = provider.resolve(KasaClientResponseService)
+
+    simulator: KasaCloudSimulator = state['simulator']
+    cache: CacheCallCounter = state['cache']
+
+    await device_log_service.initialize()
+    await client_response_service.initialize()
+
+    seeded = await seed(
+        provider=provider,
+        simulator=simulator)
+
+    request = RunSceneRequest(
+        scene_id=seeded.get('scene_id'),
+        region_id=None)
+
+    # Warm up the token, scene and device caches so the
+    # timed runs measure steady state
+    for _ in range(args.warmup):
+        await scene_service.run_scene(request=request)
+
+    mongo_before = Counter(mongo_counter.commands)
+    cache_before = Counter(cache.calls)
+    http_before = Counter(simulator.get_metrics().get('methods'))
+
+    latencies = list()
+    updated = 0
+
+    started = time.perf_counter()
+    for _ in range(args.runs):
+        run_started = time.perf_counter()
+        results = await scene_service.run_scene(request=request)
+
+        latencies.append(time.perf_counter() - run_started)
+        updated += len(results)
+    elapsed = time.perf_counter() - started
+
+    # Flush buffered log and client response writes so
+    # they're counted against the runs that queued them
+    await device_log_service.stop()
+    await client_response_service.stop()
+
+    mongo = get_delta(mongo_counter.commands, mongo_before)
+    cache_calls = get_delta(cache.calls, cache_before)
+    http = get_delta(
+        Counter(simulator.get_metrics().get('methods')), http_before)
+
+    await cleanup(
+        provider=provider,
+        seeded=seeded)
+
+    return {
+        'devices': device_count,
+        'runs': args.runs,
+        'devices_updated': updated,
+        'scenes_per_second': round(args.runs / elapsed, 3),
+        'devices_per_second': round(updated / elapsed, 1),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 2),
+            'p95': round(percentile(latencies, 95) * 1000, 2),
+            'p99': round(percentile(latencies, 99) * 1000, 2),
+            'max': round(max(latencies) * 1000, 2)
+        },
+        'calls_per_run': {
+            'mongo': round(sum(mongo.values()) / args.runs, 1),
+            'redis': round(sum(cache_calls.values()) / args.runs, 1),
+            'http': round(sum(http.values()) / args.runs, 1)
+        },
+        'calls': {
+            'mongo': mongo,
+            'redis': cache_calls,
+            'http': http
+        },
+        'simulator': simulator.get_metrics(),
+        'kasa_client': kasa_client.get_metrics().get('transports').get('cloud')
+    }
+
+
+async def run(args):
+    results = list()
+
+    for device_count in args.devices:
+        results.append(await run_size(
+            args=args,
+            device_count=device_count))
+
+    return {
+        'benchmark': 'scenes',
+        'commit': get_commit(),
+        'timestamp': datetime.datetime.now(datetime.UTC).isoformat(),
+        'python': platform.python_version(),
+        'parameters': {
+            'devices': args.devices,
+            'runs': args.runs,
+            'warmup': args.warmup,
+            'latency_ms': args.latency_ms,
+            'latency_sigma': args.latency_sigma,
+            'error_rate': args.error_rate,
+            'seed': args.seed
+        },
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--devices', type=lambda value: [int(count) for count in value.split(',')],
+                        default=[10, 100, 1000])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--latency-sigma', type=float, default=0.4)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    output = args.output or os.path.join(
+        RESULTS_DIRECTORY,
+        f"bench_scenes-{report.get('commit') or 'local'}-{int(time.time())}.json")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2)
+
+    print(f"{'devices':>8}{'scenes/s':>10}{'devices/s':>11}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'mongo':>8}{'redis':>8}{'http':>8}")
+    for result in report.get('results'):
+        latency = result.get('latency_ms')
+        calls = result.get('calls_per_run')
+
+        print(f"{result['devices']:>8}{result['scenes_per_second']:>10}"
+              f"{result['devices_per_second']:>11}{latency['p50']:>10}"
+              f"{latency['p95']:>10}{latency['p99']:>10}"
+              f"{calls['mongo']:>8}{calls['redis']:>8}{calls['http']:>8}")
+
+    print(f'Results: {output}')
+
+
+if __name__ == '__main__':
+    main()
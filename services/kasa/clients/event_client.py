@@ -1,4 +1,6 @@
-from azure.servicebus import ServiceBusClient, ServiceBusMessage
+from azure.servicebus import ServiceBusMessage
+from azure.servicebus.aio import ServiceBusClient
+from azure.servicebus.exceptions import MessageSizeExceededError
 from framework.configuration.configuration import Configuration
 from framework.logger.providers import get_logger
 
@@ -21,28 +23,46 @@ class EventClient:
         self._sender = self._client.get_queue_sender(
             queue_name=self._queue_name)
 
-    def send_messages(
+    async def send_messages(
         self,
         messages: list[ServiceBusMessage]
-    ) -> None:
+    ) -> int:
         '''
-        Send a batch of service bus messages
+        Send service bus messages in as few batches as the
+        max batch size allows, returns the number of
+        batches sent
         '''
 
-        logger.info(f'Getting service bus queue sender')
+        batch = await self._sender.create_message_batch()
+        sent = 0
 
-        # TODO: Batch the mesages batches to prevent exceeding max batch size
-        batch = self._sender.create_message_batch()
         for message in messages:
-            logger.info(
-                f'Adding message to batch: {message.message_id}: {message.correlation_id}')
-            batch.add_message(message)
+            try:
+                batch.add_message(message)
+            except MessageSizeExceededError:
+                # A single message that won't fit in an
+                # empty batch can't be sent at all
+                if len(batch) == 0:
+                    raise
+
+                logger.info(
+                    f'Batch full, sending batch of {len(batch)} messages')
+
+                await self._sender.send_messages(batch)
+                sent += 1
+
+                batch = await self._sender.create_message_batch()
+                batch.add_message(message)
 
-        self._sender.send_messages(batch)
+        if len(batch) > 0:
+            await self._sender.send_messages(batch)
+            sent += 1
 
-        logger.info(f'Messages sent successfully')
+        logger.info(f'Sent {len(messages)} messages in {sent} batches')
 
-    def send_message(
+        return sent
+
+    async def send_message(
         self,
         message: ServiceBusMessage
     ) -> None:
@@ -50,5 +70,11 @@ class EventClient:
         Send a service bus message
         '''
 
-        self._sender.send_messages(
-            message=message)
+        await self._sender.send_messages(
+            message)
+
+    async def close(
+        self
+    ) -> None:
+        await self._sender.close()
+        await self._client.close()
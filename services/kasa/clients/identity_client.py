@@ -1,4 +1,5 @@
-import httpx
+from typing import Dict
+
 from framework.auth.configuration import AzureAdConfiguration
 from framework.clients.cache_client import CacheClientAsync
 from framework.configuration.configuration import Configuration
@@ -6,8 +7,12 @@ from framework.constants.constants import ConfigurationKey
 from framework.exceptions.nulls import ArgumentNullException
 from framework.logger.providers import get_logger
 from framework.validators.nulls import none_or_whitespace
+from httpx import AsyncClient
 
 from domain.cache import CacheKey
+from domain.kasa.auth import AuthToken
+from utils.concurrency import SingleFlight
+from utils.helpers import fire_task
 
 logger = get_logger(__name__)
 
@@ -16,14 +21,22 @@ class IdentityClient:
     def __init__(
         self,
         configuration: Configuration,
-        cache_client: CacheClientAsync
+        cache_client: CacheClientAsync,
+        http_client: AsyncClient
     ):
         ArgumentNullException.if_none(configuration, 'configuration')
         ArgumentNullException.if_none(cache_client, 'cache_client')
+        ArgumentNullException.if_none(http_client, 'http_client')
 
         self._cache_client = cache_client
+        self._http_client = http_client
         self._ad_auth: AzureAdConfiguration = configuration.ad_auth
 
+        # In-process tokens keyed on client and scope
+        self._tokens: Dict[str, AuthToken] = dict()
+        self._single_flight = SingleFlight(
+            name='identity-token')
+
         self._clients = dict()
         for client in self._ad_auth.clients:
             self.add_client(client)
@@ -46,37 +59,124 @@ class IdentityClient:
         self,
         client_name: str,
         scope: str = None
-    ):
+    ) -> str:
+        '''
+        Get an access token for the client, concurrent
+        misses for the same client and scope share one
+        fetch and tokens are refreshed ahead of expiry
+        '''
+
         cache_key = CacheKey.auth_token(
             client=client_name,
             scope=scope)
 
+        token = self._tokens.get(cache_key)
+
+        if token is not None and not token.is_expired():
+            # Still valid, refresh in the background once
+            # the token is near the end of its lifetime
+            if (token.needs_refresh()
+                    and not self._single_flight.is_inflight(cache_key)):
+                logger.info(f'Refreshing token ahead of expiry: {cache_key}')
+                fire_task(self._refresh_token(
+                    cache_key=cache_key,
+                    client_name=client_name,
+                    scope=scope))
+
+            return token.access_token
+
+        token = await self._single_flight.run(
+            key=cache_key,
+            func=lambda: self._acquire_token(
+                cache_key=cache_key,
+                client_name=client_name,
+                scope=scope))
+
+        return token.access_token
+
+    def get_metrics(
+        self
+    ) -> dict:
+        return self._single_flight.get_metrics() | {
+            'tokens': len(self._tokens)
+        }
+
+    async def _refresh_token(
+        self,
+        cache_key: str,
+        client_name: str,
+        scope: str
+    ) -> None:
+        try:
+            await self._single_flight.run(
+                key=cache_key,
+                func=lambda: self._acquire_token(
+                    cache_key=cache_key,
+                    client_name=client_name,
+                    scope=scope))
+        except Exception as ex:
+            # The current token stays in use until it
+            # expires, the next call will retry
+            logger.exception(f'Failed to refresh token: {str(ex)}')
+
+    async def _acquire_token(
+        self,
+        cache_key: str,
+        client_name: str,
+        scope: str
+    ) -> AuthToken:
         logger.info(f'Auth token key: {cache_key}')
 
-        cached_token = await self._cache_client.get_cache(
+        # Another instance may already have a fresh token
+        cached = await self._cache_client.get_json(
             key=cache_key)
 
-        if not none_or_whitespace(cached_token):
-            return cached_token
+        # Tokens cached by older versions are bare strings
+        # without an expiry and are refetched
+        if isinstance(cached, dict):
+            token = AuthToken.from_entity(
+                data=cached)
 
+            if not token.needs_refresh():
+                self._tokens[cache_key] = token
+                return token
+
+        token = await self._fetch_token(
+            client_name=client_name,
+            scope=scope)
+
+        self._tokens[cache_key] = token
+
+        await self._cache_client.set_json(
+            key=cache_key,
+            value=token.to_dict(),
+            ttl=token.get_ttl_minutes())
+
+        return token
+
+    async def _fetch_token(
+        self,
+        client_name: str,
+        scope: str
+    ) -> AuthToken:
         logger.info('Fetching token from AD')
+
         client_credentials = self._clients.get(client_name)
 
         if client_credentials is None:
             raise Exception(f'No client exists with the name {client_name}')
 
+        # Copy the credentials so a scope override doesn't
+        # leak into the shared client config
+        client_credentials = dict(client_credentials)
+
         if not none_or_whitespace(scope):
             logger.info(f'Using scope: {scope}')
-            client_credentials |= {
-                'scope': scope
-            }
-
-        logger.info(f'Client credential request: {client_credentials}')
+            client_credentials['scope'] = scope
 
-        async with httpx.AsyncClient(timeout=None) as client:
-            response = await client.post(
-                url=self._ad_auth.identity_url,
-                data=client_credentials)
+        response = await self._http_client.post(
+            url=self._ad_auth.identity_url,
+            data=client_credentials)
 
         logger.info(f'Response: {response.status_code}')
 
@@ -84,15 +184,8 @@ class IdentityClient:
             raise Exception(
                 f'Failed to fetch auth token: {response.status_code}: {response.text}')
 
-        token = response.json().get(
-            'access_token')
-
-        await self._cache_client.set_cache(
-            key=cache_key,
-            value=token,
-            ttl=50)
-
-        return token
+        return AuthToken.from_response(
+            data=response.json())
 
     def get_client(self, client_name):
         if not self._clients.get(client_name):
@@ -0,0 +1,165 @@
+import asyncio
+import time
+from typing import Dict
+
+import jwt
+from framework.auth.configuration import AzureAdConfiguration
+from framework.configuration.configuration import Configuration
+from framework.exceptions.nulls import ArgumentNullException
+from framework.logger.providers import get_logger
+from httpx import AsyncClient
+
+from domain.exceptions import SigningKeyNotFoundException
+from utils.concurrency import SingleFlight
+from utils.helpers import get_config_section
+
+logger = get_logger(__name__)
+
+
+class JwksClient:
+    def __init__(
+        self,
+        configuration: Configuration,
+        http_client: AsyncClient
+    ):
+        ArgumentNullException.if_none(configuration, 'configuration')
+        ArgumentNullException.if_none(http_client, 'http_client')
+
+        self._http_client = http_client
+
+        ad_auth: AzureAdConfiguration = configuration.ad_auth
+        settings = get_config_section(
+            configuration, 'auth')
+
+        self._jwks_url = settings.get(
+            'jwks_url',
+            f'https://login.microsoftonline.com/{ad_auth.tenant_id}/discovery/v2.0/keys')
+        self._refresh_interval = settings.get(
+            'jwks_refresh_interval_seconds', 3600)
+
+        # Lower bound on refetches triggered by an unknown
+        # key ID so bad tokens can't hammer the endpoint
+        self._min_refresh_interval = settings.get(
+            'jwks_min_refresh_seconds', 60)
+
+        self._keys: Dict[str, jwt.PyJWK] = dict()
+        self._fetched_at: float = None
+        self._single_flight = SingleFlight(
+            name='jwks')
+        self._task: asyncio.Task = None
+
+        self._refreshes = 0
+        self._failures = 0
+
+    async def get_signing_key(
+        self,
+        kid: str
+    ) -> jwt.PyJWK:
+        '''
+        Get the signing key for a key ID, the key set
+        is refetched once if the key ID is unknown
+        '''
+
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        if (self._fetched_at is None
+                or time.time() - self._fetched_at >= self._min_refresh_interval):
+            logger.info(f'Unknown signing key, refreshing key set: {kid}')
+            await self.refresh()
+
+        key = self._keys.get(kid)
+        if key is None:
+            raise SigningKeyNotFoundException(kid)
+
+        return key
+
+    async def refresh(
+        self
+    ) -> None:
+        '''
+        Refetch the key set, concurrent refreshes share
+        one request
+        '''
+
+        await self._single_flight.run(
+            key='jwks',
+            func=self._fetch_keys)
+
+    def start(
+        self
+    ) -> None:
+        '''
+        Start refreshing the key set in the background
+        '''
+
+        if self._task is not None and not self._task.done():
+            return
+
+        self._task = asyncio.create_task(
+            self._run())
+
+    async def stop(
+        self
+    ) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_metrics(
+        self
+    ) -> dict:
+        return {
+            'keys': len(self._keys),
+            'age_seconds': (
+                round(time.time() - self._fetched_at, 3)
+                if self._fetched_at is not None else None),
+            'refreshes': self._refreshes,
+            'failures': self._failures
+        }
+
+    async def _fetch_keys(
+        self
+    ) -> None:
+        logger.info(f'Fetching signing keys: {self._jwks_url}')
+
+        try:
+            response = await self._http_client.get(
+                url=self._jwks_url)
+
+            if response.is_error:
+                raise Exception(
+                    f'Failed to fetch signing keys: {response.status_code}: {response.text}')
+
+            key_set = jwt.PyJWKSet.from_dict(
+                response.json())
+        except Exception:
+            self._failures += 1
+            raise
+
+        self._keys = {
+            key.key_id: key
+            for key in key_set.keys
+        }
+
+        self._fetched_at = time.time()
+        self._refreshes += 1
+
+        logger.info(f'Fetched {len(self._keys)} signing keys')
+
+    async def _run(
+        self
+    ) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as ex:
+                # Keep serving the keys we have
+                logger.exception(f'Failed to refresh signing keys: {str(ex)}')
+
+            await asyncio.sleep(self._refresh_interval)
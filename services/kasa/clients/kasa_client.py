@@ -1,7 +1,12 @@
 import asyncio
 import logging
+import time
+from typing import Dict
 
+from clients.kasa_endpoints import KasaEndpointRouter
+from clients.kasa_transport import KasaLanTransport, TransportMetrics
 from domain.cache import CacheExpiration, CacheKey
+from domain.kasa.device_list import KasaDeviceList
 from domain.rest import (GetDevicesRequest, GetKasaDeviceStateRequest,
                          KasaGetDevicesResponse, KasaResponse,
                          KasaTokenRequest, KasaTokenResponse)
@@ -13,6 +18,8 @@ from framework.validators.nulls import none_or_whitespace
 from httpx import AsyncClient
 from tenacity import (after_log, retry, retry_if_exception_type,
                       stop_after_attempt, wait_exponential)
+from utils.cache import BoundedTtlCache
+from utils.concurrency import SingleFlight
 from utils.helpers import fire_task
 
 logger = get_logger(__name__)
@@ -42,6 +49,53 @@ class KasaClient:
         ArgumentNullException.if_none_or_whitespace(
             self._base_url, 'base_url')
 
+        # Concurrent state reads for the same device share
+        # one upstream request
+        self._state_reads = SingleFlight(
+            name='kasa-device-state-reads')
+
+        # Optional micro cache to absorb polling storms, off
+        # unless a TTL is configured
+        self._state_ttl = configuration.kasa.get(
+            'state_cache_ttl_seconds', 0)
+        self._state_cache = BoundedTtlCache(
+            name='kasa-device-states',
+            max_size=configuration.kasa.get('state_cache_size', 1024))
+
+        # Bumped on every state change so reads that started
+        # before a set aren't shared or cached after it
+        self._state_generations: Dict[str, int] = dict()
+
+        # Short lived device list, sync and status requests
+        # within the TTL share one getDeviceList call
+        self._device_list: KasaDeviceList = None
+        self._device_list_ttl = configuration.kasa.get(
+            'device_list_ttl_seconds', 30)
+        self._device_list_reads = SingleFlight(
+            name='kasa-device-list-reads')
+
+        # Route passthroughs to each device's home endpoint
+        # rather than relying on the cloud to redirect
+        self._regional_routing = configuration.kasa.get(
+            'regional_routing', True)
+        self._router = KasaEndpointRouter(
+            default_endpoint=self._base_url,
+            endpoint_concurrency=configuration.kasa.get(
+                'endpoint_concurrency', 8))
+
+        # Devices with a known LAN address are sent requests
+        # directly, the cloud is the fallback
+        lan_settings = configuration.kasa.get('lan') or dict()
+
+        self._lan_enabled = lan_settings.get('enabled', False)
+        self._lan_transport = KasaLanTransport(
+            timeout=lan_settings.get('timeout_seconds', 2),
+            addresses=lan_settings.get('devices'),
+            concurrency=lan_settings.get('concurrency', 8))
+        self._cloud_metrics = TransportMetrics(
+            name='cloud')
+        self._lan_fallbacks = 0
+
     async def get_device_state(
         self,
         device_id: str
@@ -52,15 +106,119 @@ class KasaClient:
 
         ArgumentNullException.if_none_or_whitespace(device_id, 'device_id')
 
+        if self._state_ttl > 0:
+            cached = self._state_cache.get(device_id)
+            if cached is not None:
+                logger.info(f'Device state cache hit: {device_id}')
+                return cached
+
+        generation = self._state_generations.get(device_id, 0)
+
+        return await self._state_reads.run(
+            key=f'{device_id}-{generation}',
+            func=lambda: self._fetch_device_state(
+                device_id=device_id,
+                generation=generation))
+
+    async def _fetch_device_state(
+        self,
+        device_id: str,
+        generation: int
+    ) -> KasaResponse:
         request = GetKasaDeviceStateRequest(
             device_id=device_id)
 
         data = request.to_dict()
         logger.info(f'Device state request: {data}')
 
-        return await self._send_request(
+        response = await self._send_passthrough(
             json=data)
 
+        # Don't cache failures, the next read should retry,
+        # or a read the device state was set during
+        if (self._state_ttl > 0
+                and not response.is_error
+                and self._state_generations.get(device_id, 0) == generation):
+            self._state_cache.set(
+                key=device_id,
+                value=response,
+                expires_at=time.time() + self._state_ttl)
+
+        return response
+
+    async def get_device_list(
+        self,
+        refresh: bool = False
+    ) -> KasaDeviceList:
+        '''
+        Get the fingerprinted Kasa device list, cached for
+        the device list TTL unless `refresh` is set
+        '''
+
+        if (not refresh
+                and self._device_list is not None
+                and self._device_list.get_age() < self._device_list_ttl):
+            return self._device_list
+
+        return await self._device_list_reads.run(
+            key='device-list',
+            func=self._fetch_device_list)
+
+    async def _fetch_device_list(
+        self
+    ) -> KasaDeviceList:
+        response = await self.get_devices()
+
+        if response.response.is_error:
+            raise Exception(
+                f'Failed to fetch Kasa device list: {response.response.error_message}')
+
+        device_list = KasaDeviceList(
+            devices=response.device_list)
+
+        if (self._device_list is None
+                or self._device_list.fingerprint != device_list.fingerprint):
+            logger.info(
+                f'Kasa device list changed: {len(device_list.devices)} devices: {device_list.fingerprint}')
+
+        self._device_list = device_list
+
+        if self._regional_routing:
+            self._router.set_endpoints(
+                devices=device_list.devices)
+
+        return device_list
+
+    def get_metrics(
+        self
+    ) -> dict:
+        return {
+            'device_list': {
+                'devices': (len(self._device_list.devices)
+                            if self._device_list is not None else None),
+                'fingerprint': (self._device_list.fingerprint
+                                if self._device_list is not None else None),
+                'age_seconds': (round(self._device_list.get_age(), 3)
+                                if self._device_list is not None else None),
+                'ttl_seconds': self._device_list_ttl,
+                'reads': self._device_list_reads.get_metrics()
+            },
+            'transports': {
+                'lan': self._lan_transport.get_metrics() | {
+                    'enabled': self._lan_enabled,
+                    'fallbacks': self._lan_fallbacks
+                },
+                'cloud': self._cloud_metrics.get_metrics()
+            },
+            'routing': self._router.get_metrics() | {
+                'enabled': self._regional_routing
+            },
+            'state_reads': self._state_reads.get_metrics(),
+            'state_cache': self._state_cache.get_metrics() | {
+                'ttl_seconds': self._state_ttl
+            }
+        }
+
     async def set_device_state(
         self,
         kasa_request: dict,
@@ -75,8 +233,15 @@ class KasaClient:
 
         logger.info(f'Sending device state request to Kasa client')
 
+        device_id = kasa_request.get('params', dict()).get('deviceId')
+
+        # Reads issued from here on don't join a read that's
+        # already in flight
+        self._expire_device_state(
+            device_id=device_id)
+
         try:
-            return await self._send_request(
+            return await self._send_passthrough(
                 json=kasa_request,
                 kasa_token=kasa_token)
 
@@ -85,6 +250,23 @@ class KasaClient:
             logger.exception(f'Failed to set device state: {str(ex)}')
             return KasaResponse.empty_response()
 
+        finally:
+            # Reads that ran while the set was in flight may
+            # have seen the old state, drop anything cached
+            self._expire_device_state(
+                device_id=device_id)
+
+    def _expire_device_state(
+        self,
+        device_id: str
+    ) -> None:
+        if device_id is None:
+            return
+
+        self._state_generations[device_id] = self._state_generations.get(
+            device_id, 0) + 1
+        self._state_cache.delete(device_id)
+
     async def get_devices(
         self
     ) -> KasaGetDevicesResponse:
@@ -133,6 +315,65 @@ class KasaClient:
 
         return token_response.token
 
+    @property
+    def lan_transport(
+        self
+    ) -> KasaLanTransport:
+        return self._lan_transport
+
+    async def _send_passthrough(
+        self,
+        json: dict,
+        kasa_token: str = None
+    ) -> KasaResponse:
+        '''
+        Send a passthrough request over the LAN if the
+        device address is known, otherwise through the
+        cloud
+        '''
+
+        params = json.get('params', dict())
+        device_id = params.get('deviceId')
+
+        if self._lan_enabled and self._lan_transport.has_address(device_id):
+            try:
+                return await self._lan_transport.send(
+                    device_id=device_id,
+                    request_data=params.get('requestData'))
+            except Exception as ex:
+                self._lan_fallbacks += 1
+                logger.info(
+                    f'{device_id}: LAN request failed, falling back to cloud: {str(ex)}')
+
+        return await self._send_request(
+            json=json,
+            kasa_token=kasa_token)
+
+    def _get_endpoint(
+        self,
+        json: dict
+    ) -> str:
+        '''
+        Get the endpoint for a request, passthroughs go to
+        the device's home endpoint
+        '''
+
+        if not self._regional_routing:
+            return self._router.get_endpoint()
+
+        device_id = json.get('params', dict()).get('deviceId')
+
+        if device_id is None:
+            return self._router.get_endpoint()
+
+        # Map the devices in the background on the first
+        # passthrough, until then requests use the default
+        if not self._router.is_loaded and not self._device_list_reads.is_inflight('device-list'):
+            fire_task(self.get_device_list())
+
+        return self._router.get_endpoint(
+            device_id=device_id)
+
     @retry(
         stop=stop_after_attempt(5),
         wait=wait_exponential(multiplier=0.5, min=0.25, max=10),
@@ -155,18 +396,42 @@ class KasaClient:
         if none_or_whitespace(kasa_token):
             kasa_token = await self.get_kasa_token()
 
-        await semaphore.acquire()
-
-        try:
-            response = await self._http_client.post(
-                url=f'{self._base_url}/?token={kasa_token}',
-                json=json)
-        finally:
-            semaphore.release()
+        endpoint = self._get_endpoint(
+            json=json)
+        endpoint_limit = self._router.get_limit(
+            endpoint=endpoint)
+
+        # Wait on the endpoint limit before taking a global
+        # slot so a slow endpoint can't hold the global slots
+        # requests homed elsewhere need
+        async with endpoint_limit, semaphore:
+            started = time.perf_counter()
+
+            try:
+                response = await self._http_client.post(
+                    url=f'{endpoint}/?token={kasa_token}',
+                    json=json)
+            except Exception:
+                self._router.record(
+                    endpoint=endpoint,
+                    started=started,
+                    is_error=True)
+                self._cloud_metrics.record(
+                    started=started,
+                    is_error=True)
+                raise
 
         response = KasaResponse(
             response=response)
 
+        self._router.record(
+            endpoint=endpoint,
+            started=started,
+            is_error=response.is_error)
+        self._cloud_metrics.record(
+            started=started,
+            is_error=response.is_error)
+
         if response.is_error:
             logger.info(f'Failed to send Kasa request: {response.response.status_code}: {response.data}')
 
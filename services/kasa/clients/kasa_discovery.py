@@ -0,0 +1,87 @@
+import asyncio
+import json
+import socket
+from typing import List, Tuple
+
+from framework.logger.providers import get_logger
+
+from clients.kasa_transport import KASA_LAN_PORT, decrypt, obfuscate
+
+logger = get_logger(__name__)
+
+# Discovery probe, devices answer a broadcast sysinfo
+# request with their own sysinfo
+DISCOVERY_PROBE = {
+    'system': {
+        'get_sysinfo': None
+    }
+}
+
+
+class KasaDiscoveryProtocol(asyncio.DatagramProtocol):
+    def __init__(
+        self
+    ):
+        self.replies: List[Tuple[str, dict]] = list()
+        self.errors = 0
+
+    def datagram_received(
+        self,
+        data: bytes,
+        addr: Tuple[str, int]
+    ) -> None:
+        try:
+            reply = json.loads(decrypt(data))
+        except Exception:
+            # Not every datagram on the port is a Kasa reply
+            self.errors += 1
+            return
+
+        self.replies.append((addr[0], reply))
+
+    def error_received(
+        self,
+        exc: Exception
+    ) -> None:
+        logger.info(f'Discovery socket error: {str(exc)}')
+
+
+async def broadcast_discovery(
+    address: str = '255.255.255.255',
+    port: int = KASA_LAN_PORT,
+    timeout: float = 3
+) -> List[Tuple[str, dict]]:
+    '''
+    Broadcast the discovery probe and collect replies for
+    `timeout` seconds, returns the (IP, sysinfo) of each
+    device that answered
+    '''
+
+    loop = asyncio.get_running_loop()
+
+    transport, protocol = await loop.create_datagram_endpoint(
+        KasaDiscoveryProtocol,
+        local_addr=('0.0.0.0', 0),
+        allow_broadcast=True,
+        family=socket.AF_INET)
+
+    try:
+        transport.sendto(
+            obfuscate(json.dumps(DISCOVERY_PROBE).encode()),
+            (address, port))
+
+        await asyncio.sleep(timeout)
+    finally:
+        transport.close()
+
+    devices = list()
+    for ip, reply in protocol.replies:
+        sysinfo = reply.get('system', dict()).get('get_sysinfo')
+
+        if isinstance(sysinfo, dict) and sysinfo.get('deviceId') is not None:
+            devices.append((ip, sysinfo))
+
+    logger.info(
+        f'Discovery replies: {len(devices)} devices: {protocol.errors} unparsed')
+
+    return devices
@@ -0,0 +1,121 @@
+import asyncio
+import time
+from typing import Dict
+
+from framework.logger.providers import get_logger
+
+logger = get_logger(__name__)
+
+
+class KasaEndpointRouter:
+    '''
+    Maps devices to their home cloud endpoint from the
+    device list `appServerUrl`, each endpoint gets its
+    own request limit so a slow region doesn't hold up
+    requests homed elsewhere
+    '''
+
+    def __init__(
+        self,
+        default_endpoint: str,
+        endpoint_concurrency: int = 8
+    ):
+        self._default_endpoint = default_endpoint.rstrip('/')
+        self._endpoint_concurrency = endpoint_concurrency
+
+        self._endpoints: Dict[str, str] = dict()
+        self._limits: Dict[str, asyncio.Semaphore] = dict()
+        self._stats: Dict[str, dict] = dict()
+
+        self._routed = 0
+        self._unrouted = 0
+
+    @property
+    def is_loaded(
+        self
+    ) -> bool:
+        return any(self._endpoints)
+
+    def set_endpoints(
+        self,
+        devices: list
+    ) -> None:
+        '''
+        Rebuild the device to endpoint map from the Kasa
+        device list
+        '''
+
+        self._endpoints = {
+            device.get('deviceId'): device.get('appServerUrl').rstrip('/')
+            for device in devices
+            if device.get('appServerUrl')
+        }
+
+        logger.info(
+            f'Device endpoints mapped: {len(self._endpoints)} devices: {len(set(self._endpoints.values()))} endpoints')
+
+    def get_endpoint(
+        self,
+        device_id: str = None
+    ) -> str:
+        '''
+        Get the home endpoint for a device, the default
+        endpoint if the device isn't mapped
+        '''
+
+        if device_id is None:
+            return self._default_endpoint
+
+        endpoint = self._endpoints.get(device_id)
+
+        if endpoint is None:
+            self._unrouted += 1
+            return self._default_endpoint
+
+        self._routed += 1
+        return endpoint
+
+    def get_limit(
+        self,
+        endpoint: str
+    ) -> asyncio.Semaphore:
+        if endpoint not in self._limits:
+            self._limits[endpoint] = asyncio.Semaphore(
+                self._endpoint_concurrency)
+
+        return self._limits[endpoint]
+
+    def record(
+        self,
+        endpoint: str,
+        started: float,
+        is_error: bool
+    ) -> None:
+        stats = self._stats.setdefault(endpoint, {
+            'requests': 0,
+            'errors': 0,
+            'total_latency': 0
+        })
+
+        stats['requests'] += 1
+        stats['errors'] += 1 if is_error else 0
+        stats['total_latency'] += time.perf_counter() - started
+
+    def get_metrics(
+        self
+    ) -> dict:
+        return {
+            'default_endpoint': self._default_endpoint,
+            'devices_mapped': len(self._endpoints),
+            'routed': self._routed,
+            'unrouted': self._unrouted,
+            'endpoints': {
+                endpoint: {
+                    'requests': stats.get('requests'),
+                    'errors': stats.get('errors'),
+                    'avg_latency_ms': round(
+                        stats.get('total_latency') / stats.get('requests') * 1000, 2)
+                }
+                for endpoint, stats in self._stats.items()
+            }
+        }
@@ -0,0 +1,549 @@
+import asyncio
+import hashlib
+import json
+import random
+import uuid
+from typing import Dict, List
+from urllib.parse import urlparse
+
+from framework.logger.providers import get_logger
+from httpx import AsyncBaseTransport, Request, Response
+
+from domain.constants import KasaDeviceType, KasaRest
+from utils.concurrency import TokenBucket
+
+logger = get_logger(__name__)
+
+# Kasa cloud error codes returned by the simulator
+SIMULATOR_TOKEN_EXPIRED = -20651
+SIMULATOR_DEVICE_OFFLINE = -20571
+SIMULATOR_RATE_LIMITED = -20003
+SIMULATOR_DEVICE_NOT_FOUND = -20580
+SIMULATOR_INJECTED_ERROR = -20002
+
+
+class LatencyDistribution:
+    '''
+    Simulated request latency, `fixed`, `uniform`,
+    `normal` or `lognormal` in milliseconds
+    '''
+
+    def __init__(
+        self,
+        distribution: str = 'lognormal',
+        median_ms: float = 50,
+        sigma: float = 0.4,
+        min_ms: float = 0,
+        max_ms: float = None
+    ):
+        self.distribution = distribution
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+
+    def sample(
+        self,
+        rng: random.Random
+    ) -> float:
+        '''
+        Sample a latency in seconds
+        '''
+
+        match self.distribution:
+            case 'fixed':
+                value = self.median_ms
+            case 'uniform':
+                value = rng.uniform(self.min_ms, self.max_ms or self.median_ms * 2)
+            case 'normal':
+                value = rng.gauss(self.median_ms, self.sigma * self.median_ms)
+            case 'lognormal':
+                value = rng.lognormvariate(0, self.sigma) * self.median_ms
+            case _:
+                raise Exception(f"Unsupported latency distribution: '{self.distribution}'")
+
+        value = max(value, self.min_ms)
+        if self.max_ms is not None:
+            value = min(value, self.max_ms)
+
+        return value / 1000
+
+    @staticmethod
+    def from_config(
+        data: dict | None
+    ) -> 'LatencyDistribution':
+        return LatencyDistribution(**(data or dict()))
+
+
+class SimulatedDevice:
+    def __init__(
+        self,
+        device_id: str,
+        alias: str,
+        device_type: str,
+        app_server_url: str,
+        latency: LatencyDistribution,
+        online: bool = True,
+        error_rate: float = 0
+    ):
+        self.device_id = device_id
+        self.alias = alias
+        self.device_type = device_type
+        self.app_server_url = app_server_url
+        self.latency = latency
+        self.online = online
+        self.error_rate = error_rate
+
+        self.relay_state = 0
+        self.light_state = {
+            'on_off': 0,
+            'mode': 'normal',
+            'hue': 0,
+            'saturation': 0,
+            'color_temp': 2700,
+            'brightness': 100
+        }
+
+    def to_device_list_entry(
+        self
+    ) -> dict:
+        return {
+            'deviceId': self.device_id,
+            'alias': self.alias,
+            'deviceType': self.device_type,
+            'deviceModel': ('HS103(US)' if self.device_type == KasaDeviceType.KasaPlug
+                            else 'KL130(US)'),
+            'status': 1 if self.online else 0,
+            'appServerUrl': self.app_server_url
+        }
+
+    def get_sysinfo(
+        self
+    ) -> dict:
+        sysinfo = {
+            'deviceId': self.device_id,
+            'alias': self.alias,
+            'mic_type': self.device_type,
+            'err_code': 0
+        }
+
+        if self.device_type == KasaDeviceType.KasaPlug:
+            return sysinfo | {
+                'relay_state': self.relay_state
+            }
+
+        # Bulbs that are off report their parameters under
+        # the default on state
+        params = {key: value for key, value in self.light_state.items()
+                  if key != 'on_off'}
+
+        if self.light_state.get('on_off') == 1:
+            return sysinfo | {'light_state': dict(self.light_state)}
+
+        return sysinfo | {'light_state': {
+            'on_off': 0,
+            'dft_on_state': params
+        }}
+
+    def respond(
+        self,
+        request_data: dict
+    ) -> dict:
+        '''
+        Apply a passthrough request and build the device
+        response data
+        '''
+
+        response = dict()
+
+        system = request_data.get(KasaRest.SYSTEM)
+        if system is not None:
+            response[KasaRest.SYSTEM] = dict()
+
+            if KasaRest.SET_RELAY_STATE in system:
+                self.relay_state = system.get(
+                    KasaRest.SET_RELAY_STATE).get(KasaRest.STATE)
+                response[KasaRest.SYSTEM][KasaRest.SET_RELAY_STATE] = {
+                    'err_code': 0
+                }
+
+            if KasaRest.GET_SYSINFO in system:
+                response[KasaRest.SYSTEM][KasaRest.GET_SYSINFO] = self.get_sysinfo()
+
+        lighting = request_data.get('smartlife.iot.smartbulb.lightingservice')
+        if lighting is not None:
+            transition = lighting.get('transition_light_state') or dict()
+
+            self.light_state |= {
+                key: value for key, value in transition.items()
+                if key in self.light_state and value is not None
+            }
+
+            response['smartlife.iot.smartbulb.lightingservice'] = {
+                'transition_light_state': dict(self.light_state) | {'err_code': 0}
+            }
+
+        return response
+
+
+class ThrottleRule:
+    '''
+    Token bucket limit on simulated requests, per `scope`
+    of `global`, `token` or `device`
+    '''
+
+    def __init__(
+        self,
+        rate_per_second: float,
+        burst: float = None,
+        scope: str = 'global',
+        methods: List[str] = None
+    ):
+        self.rate_per_second = rate_per_second
+        self.burst = burst or max(rate_per_second, 1)
+        self.scope = scope
+        self.methods = methods
+
+        self._buckets: Dict[str, TokenBucket] = dict()
+
+    def try_acquire(
+        self,
+        method: str,
+        token: str,
+        device_id: str
+    ) -> bool:
+        if self.methods is not None and method not in self.methods:
+            return True
+
+        match self.scope:
+            case 'device':
+                key = device_id
+            case 'token':
+                key = token
+            case _:
+                key = 'global'
+
+        if key not in self._buckets:
+            self._buckets[key] = TokenBucket(
+                name=f'simulator-throttle-{self.scope}',
+                rate=self.rate_per_second,
+                capacity=self.burst)
+
+        return self._buckets[key].try_acquire()
+
+
+class KasaCloudSimulator(AsyncBaseTransport):
+    '''
+    Local stand-in for the Kasa cloud API, serves login,
+    getDeviceList and passthrough for a virtual fleet with
+    simulated latency, errors, offline devices and rate
+    limits, requests to other hosts go to `fallback`
+    '''
+
+    def __init__(
+        self,
+        base_url: str,
+        devices: List[SimulatedDevice],
+        throttles: List[ThrottleRule] = None,
+        strict_tokens: bool = False,
+        login_latency: LatencyDistribution = None,
+        seed: int = None,
+        fallback: AsyncBaseTransport = None
+    ):
+        self._base_url = base_url
+        self._devices = {device.device_id: device
+                         for device in devices}
+        self._throttles = throttles or list()
+        self._strict_tokens = strict_tokens
+        self._login_latency = login_latency or LatencyDistribution(
+            distribution='fixed',
+            median_ms=0)
+        self._rng = random.Random(seed)
+        self._fallback = fallback
+
+        self._hosts = {urlparse(base_url).netloc} | {
+            urlparse(device.app_server_url).netloc
+            for device in devices
+        }
+        self._tokens = set()
+
+        self._requests = 0
+        self._methods: Dict[str, int] = dict()
+        self._throttled = 0
+        self._errors = 0
+        self._offline = 0
+        self._total_latency = 0
+
+    @property
+    def devices(
+        self
+    ) -> List[SimulatedDevice]:
+        return list(self._devices.values())
+
+    def get_device(
+        self,
+        device_id: str
+    ) -> SimulatedDevice | None:
+        return self._devices.get(device_id)
+
+    def set_online(
+        self,
+        device_id: str,
+        online: bool
+    ) -> None:
+        self._devices[device_id].online = online
+
+    def get_metrics(
+        self
+    ) -> dict:
+        return {
+            'devices': len(self._devices),
+            'online': len([device for device in self._devices.values()
+                           if device.online]),
+            'requests': self._requests,
+            'methods': dict(self._methods),
+            'throttled': self._throttled,
+            'errors': self._errors,
+            'offline': self._offline,
+            'avg_latency_ms': (
+                round(self._total_latency / self._requests * 1000, 2)
+                if self._requests > 0 else None)
+        }
+
+    async def handle_async_request(
+        self,
+        request: Request
+    ) -> Response:
+        if request.url.netloc.decode() not in self._hosts:
+            if self._fallback is None:
+                raise Exception(f"No simulated route for host: '{request.url.host}'")
+
+            return await self._fallback.handle_async_request(request)
+
+        body = json.loads(await request.aread() or b'{}')
+        method = body.get(KasaRest.Method)
+        params = body.get(KasaRest.PARAMS) or dict()
+        token = request.url.params.get('token')
+
+        self._requests += 1
+        self._methods[method] = self._methods.get(method, 0) + 1
+
+        match method:
+            case 'login':
+                return await self._login(
+                    request=request)
+            case KasaRest.GetDeviceList:
+                return self._get_device_list(
+                    request=request,
+                    token=token)
+            case 'passthrough':
+                return await self._passthrough(
+                    request=request,
+                    token=token,
+                    params=params)
+
+        return self._error(
+            request=request,
+            error_code=-1,
+            message=f"Unsupported method: '{method}'")
+
+    async def aclose(
+        self
+    ) -> None:
+        if self._fallback is not None:
+            await self._fallback.aclose()
+
+    async def _login(
+        self,
+        request: Request
+    ) -> Response:
+        await self._delay(
+            latency=self._login_latency)
+
+        token = str(uuid.uuid4())
+        self._tokens.add(token)
+
+        return self._result(
+            request=request,
+            result={
+                'accountId': 'simulator',
+                'token': token
+            })
+
+    def _get_device_list(
+        self,
+        request: Request,
+        token: str
+    ) -> Response:
+        if not self._is_valid_token(token):
+            return self._error(
+                request=request,
+                error_code=SIMULATOR_TOKEN_EXPIRED,
+                message='Token expired')
+
+        return self._result(
+            request=request,
+            result={
+                KasaRest.DEVICE_LIST: [
+                    device.to_device_list_entry()
+                    for device in self._devices.values()
+                ]
+            })
+
+    async def _passthrough(
+        self,
+        request: Request,
+        token: str,
+        params: dict
+    ) -> Response:
+        device_id = params.get(KasaRest.DEVICE_ID)
+        device = self._devices.get(device_id)
+
+        if not self._is_valid_token(token):
+            return self._error(
+                request=request,
+                error_code=SIMULATOR_TOKEN_EXPIRED,
+                message='Token expired')
+
+        for rule in self._throttles:
+            if not rule.try_acquire(method='passthrough', token=token, device_id=device_id):
+                self._throttled += 1
+                return self._error(
+                    request=request,
+                    error_code=SIMULATOR_RATE_LIMITED,
+                    message='API rate limit exceeded')
+
+        if device is None:
+            return self._error(
+                request=request,
+                error_code=SIMULATOR_DEVICE_NOT_FOUND,
+                message='Device not found')
+
+        await self._delay(
+            latency=device.latency)
+
+        if not device.online:
+            self._offline += 1
+            return self._error(
+                request=request,
+                error_code=SIMULATOR_DEVICE_OFFLINE,
+                message='Device is offline')
+
+        if device.error_rate > 0 and self._rng.random() < device.error_rate:
+            self._errors += 1
+            return self._error(
+                request=request,
+                error_code=SIMULATOR_INJECTED_ERROR,
+                message='Simulated device error')
+
+        return self._result(
+            request=request,
+            result={
+                KasaRest.RESPONSE_DATA: device.respond(
+                    request_data=params.get(KasaRest.REQUEST_DATA) or dict())
+            })
+
+    def _is_valid_token(
+        self,
+        token: str
+    ) -> bool:
+        if token is None:
+            return False
+
+        return not self._strict_tokens or token in self._tokens
+
+    async def _delay(
+        self,
+        latency: LatencyDistribution
+    ) -> None:
+        seconds = latency.sample(self._rng)
+        self._total_latency += seconds
+
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    def _result(
+        self,
+        request: Request,
+        result: dict
+    ) -> Response:
+        return Response(
+            status_code=200,
+            json={
+                KasaRest.ERROR_CODE: 0,
+                KasaRest.RESULT: result
+            },
+            request=request)
+
+    def _error(
+        self,
+        request: Request,
+        error_code: int,
+        message: str
+    ) -> Response:
+        return Response(
+            status_code=200,
+            json={
+                KasaRest.ERROR_CODE: error_code,
+                KasaRest.MESSAGE: message
+            },
+            request=request)
+
+    @staticmethod
+    def from_config(
+        base_url: str,
+        settings: dict,
+        fallback: AsyncBaseTransport = None
+    ) -> 'KasaCloudSimulator':
+        '''
+        Build a simulator from the `kasa.simulator` config,
+        the fleet is generated from the seed so device IDs
+        are stable between runs
+        '''
+
+        seed = settings.get('seed', 0)
+        rng = random.Random(seed)
+
+        fleet = settings.get('fleet') or dict()
+        endpoints = fleet.get('endpoints') or [base_url]
+        latency = fleet.get('latency')
+        offline_rate = fleet.get('offline_rate', 0)
+        error_rate = fleet.get('error_rate', 0)
+        overrides = settings.get('devices') or dict()
+
+        counts = [
+            (KasaDeviceType.KasaPlug, 'Plug', fleet.get('plugs', 10)),
+            (KasaDeviceType.KasaLight, 'Light', fleet.get('lights', 10))
+        ]
+
+        devices = list()
+        for device_type, name, count in counts:
+            for index in range(count):
+                device_id = hashlib.sha1(
+                    f'{seed}-{device_type}-{index}'.encode()).hexdigest().upper()
+                override = overrides.get(device_id) or dict()
+
+                devices.append(SimulatedDevice(
+                    device_id=device_id,
+                    alias=f'Simulated {name} {index + 1}',
+                    device_type=device_type,
+                    app_server_url=endpoints[len(devices) % len(endpoints)],
+                    latency=LatencyDistribution.from_config(
+                        override.get('latency') or latency),
+                    online=override.get(
+                        'online', rng.random() >= offline_rate),
+                    error_rate=override.get('error_rate', error_rate)))
+
+        logger.info(
+            f'Kasa cloud simulator: {len(devices)} devices: {len(endpoints)} endpoints')
+
+        return KasaCloudSimulator(
+            base_url=base_url,
+            devices=devices,
+            throttles=[ThrottleRule(**rule)
+                       for rule in settings.get('throttles') or list()],
+            strict_tokens=settings.get('strict_tokens', False),
+            login_latency=LatencyDistribution.from_config(
+                settings.get('login_latency') or {'distribution': 'fixed', 'median_ms': 0}),
+            seed=seed,
+            fallback=fallback)
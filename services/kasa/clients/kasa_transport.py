@@ -0,0 +1,272 @@
+import asyncio
+import datetime
+import json
+import struct
+import time
+from typing import Dict, Tuple
+
+from framework.logger.providers import get_logger
+from httpx import Request, Response
+
+from domain.rest import KasaResponse
+
+logger = get_logger(__name__)
+
+KASA_LAN_PORT = 9999
+
+# Initial key for the XOR autokey cipher used by the
+# local protocol
+KASA_LAN_KEY = 171
+
+
+def obfuscate(
+    payload: bytes
+) -> bytes:
+    '''
+    XOR autokey cipher used by the local protocol, each
+    byte is XORed with the previous ciphertext byte
+    '''
+
+    key = KASA_LAN_KEY
+    output = bytearray(len(payload))
+
+    for index, byte in enumerate(payload):
+        key = key ^ byte
+        output[index] = key
+
+    return bytes(output)
+
+
+def encrypt(
+    payload: bytes
+) -> bytes:
+    '''
+    Obfuscate a payload for the TCP protocol, which is
+    prefixed with its big endian length
+    '''
+
+    return struct.pack('>I', len(payload)) + obfuscate(payload)
+
+
+def decrypt(
+    payload: bytes
+) -> bytes:
+    '''
+    Reverse the XOR autokey cipher, `payload` doesn't
+    include the length prefix
+    '''
+
+    key = KASA_LAN_KEY
+    output = bytearray(len(payload))
+
+    for index, byte in enumerate(payload):
+        output[index] = key ^ byte
+        key = byte
+
+    return bytes(output)
+
+
+def get_device_error(
+    response_data: dict
+) -> Tuple[int, str] | None:
+    '''
+    Get the first nonzero `err_code` in a device response,
+    each module method in the response carries its own
+    '''
+
+    for module in response_data.values():
+        if not isinstance(module, dict):
+            continue
+
+        for result in module.values():
+            if isinstance(result, dict) and result.get('err_code', 0) != 0:
+                return result.get('err_code'), result.get('err_msg')
+
+    return None
+
+
+class KasaLanDeviceException(Exception):
+    def __init__(self, device_id, err_code, err_msg, *args: object) -> None:
+        super().__init__(
+            f"Device '{device_id}' returned error code {err_code}: {err_msg}")
+
+
+class TransportMetrics:
+    def __init__(
+        self,
+        name: str
+    ):
+        self._name = name
+
+        self._requests = 0
+        self._errors = 0
+        self._total_latency = 0
+
+    def record(
+        self,
+        started: float,
+        is_error: bool
+    ) -> None:
+        self._requests += 1
+        self._errors += 1 if is_error else 0
+        self._total_latency += time.perf_counter() - started
+
+    def get_metrics(
+        self
+    ) -> dict:
+        return {
+            'name': self._name,
+            'requests': self._requests,
+            'errors': self._errors,
+            'avg_latency_ms': (
+                round(self._total_latency / self._requests * 1000, 2)
+                if self._requests > 0 else None)
+        }
+
+
+class KasaLanTransport:
+    '''
+    Sends passthrough request data straight to a device
+    over the local protocol, XOR obfuscated JSON over
+    TCP, when the device address is known
+    '''
+
+    def __init__(
+        self,
+        timeout: float = 2,
+        addresses: Dict[str, str] = None,
+        concurrency: int = 8
+    ):
+        self._timeout = timeout
+        self._addresses: Dict[str, Tuple[str, int]] = dict()
+        self._metrics = TransportMetrics(
+            name='lan')
+
+        # Local requests don't go through the cloud request
+        # limits, bound the open device connections here
+        self._concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+        # Configured addresses, kept apart from the ones
+        # discovery sets and evicts
+        self._static = set(addresses or dict())
+
+        for device_id, host in (addresses or dict()).items():
+            self.set_address(
+                device_id=device_id,
+                host=host)
+
+    def set_address(
+        self,
+        device_id: str,
+        host: str,
+        port: int = KASA_LAN_PORT
+    ) -> None:
+        self._addresses[device_id] = (host, port)
+
+    def remove_address(
+        self,
+        device_id: str
+    ) -> None:
+        self._addresses.pop(device_id, None)
+
+    def has_address(
+        self,
+        device_id: str
+    ) -> bool:
+        return device_id in self._addresses
+
+    def is_static(
+        self,
+        device_id: str
+    ) -> bool:
+        return device_id in self._static
+
+    async def send(
+        self,
+        device_id: str,
+        request_data: dict
+    ) -> KasaResponse:
+        '''
+        Send request data to a device on the LAN, the
+        device response is wrapped in the cloud
+        passthrough response shape, a device error is
+        raised as `KasaLanDeviceException`
+        '''
+
+        host, port = self._addresses.get(device_id)
+
+        async with self._semaphore:
+            started = time.perf_counter()
+
+            try:
+                data = await asyncio.wait_for(
+                    self._send(
+                        host=host,
+                        port=port,
+                        payload=json.dumps(request_data).encode()),
+                    timeout=self._timeout)
+
+                response_data = json.loads(decrypt(data))
+
+                error = get_device_error(
+                    response_data=response_data)
+                if error is not None:
+                    raise KasaLanDeviceException(
+                        device_id, *error)
+
+            except Exception:
+                self._metrics.record(
+                    started=started,
+                    is_error=True)
+                raise
+
+        self._metrics.record(
+            started=started,
+            is_error=False)
+
+        response = Response(
+            status_code=200,
+            json={
+                'error_code': 0,
+                'result': {
+                    'responseData': response_data
+                }
+            },
+            request=Request('POST', f'tcp://{host}:{port}'))
+
+        response.elapsed = datetime.timedelta(
+            seconds=time.perf_counter() - started)
+
+        return KasaResponse(
+            response=response)
+
+    def get_metrics(
+        self
+    ) -> dict:
+        return self._metrics.get_metrics() | {
+            'devices': len(self._addresses),
+            'static': len(self._static),
+            'concurrency': self._concurrency
+        }
+
+    async def _send(
+        self,
+        host: str,
+        port: int,
+        payload: bytes
+    ) -> bytes:
+        reader, writer = await asyncio.open_connection(
+            host=host,
+            port=port)
+
+        try:
+            writer.write(encrypt(payload))
+            await writer.drain()
+
+            header = await reader.readexactly(4)
+            length = struct.unpack('>I', header)[0]
+
+            return await reader.readexactly(length)
+        finally:
+            writer.close()
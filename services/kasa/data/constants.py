@@ -9,8 +9,10 @@ class MongoConstants:
     ConnectionStringName = 'connection_string'
     DatabaseName = 'Kasa'
     KasaDeviceCollectionName = 'KasaDevice'
-    KasaDeviceLogCollectionName = 'KasaDeviceLog'
+    KasaDeviceLogCollectionName = 'KasaDeviceLogSeries'
+    KasaDeviceLogRollupCollectionName = 'KasaDeviceLogRollup'
     KasaLinkCollectionName = 'KasaLink'
+    KasaLeaseCollectionName = 'KasaLease'
     KasaPresetCollectionName = 'KasaPreset'
     KasaSceneCollectionName = 'KasaScene'
     KasaClientResponseCollection = 'KasaClientResponseCollection'
@@ -18,6 +20,19 @@ class MongoConstants:
     KasaSceneCategoryCollectionName = 'KasaSceneCategory'
 
 
+class DeviceLogConstants:
+    TimeField = 'timestamp'
+    MetaField = 'metadata'
+    Granularity = 'seconds'
+    DefaultRetentionDays = 30
+    DefaultPageSize = 500
+    MaxPageSize = 5000
+    StreamBatchSize = 500
+    AnalyticsBuckets = ['minute', 'hour', 'day', 'week', 'month']
+    DefaultAnalyticsBucket = 'hour'
+    LatencyPercentiles = [0.5, 0.95, 0.99]
+
+
 class KasaActionType(enum.Enum):
     TogglePlug = 1
     SetLight = 2
@@ -1,5 +1,10 @@
+from typing import Dict, List
+
+from framework.exceptions.nulls import ArgumentNullException
 from framework.mongo.mongo_repository import MongoRepositoryAsync
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.results import BulkWriteResult
 
 from data.constants import MongoConstants
 
@@ -13,3 +18,78 @@ class KasaClientResponseRepository(MongoRepositoryAsync):
             client=client,
             database=MongoConstants.DatabaseName,
             collection=MongoConstants.KasaClientResponseCollection)
+
+    async def ensure_indexes(
+        self
+    ) -> None:
+        '''
+        Unique device index so concurrent upserts for
+        the same device resolve to a single record
+        '''
+
+        await self.collection.create_index(
+            'device_id',
+            unique=True)
+
+    async def upsert_client_response(
+        self,
+        device_id: str,
+        update: Dict
+    ) -> Dict:
+        '''
+        Atomically create or update the client response
+        for a device, returns the updated document
+        '''
+
+        ArgumentNullException.if_none_or_whitespace(device_id, 'device_id')
+        ArgumentNullException.if_none(update, 'update')
+
+        return await self.collection.find_one_and_update(
+            {'device_id': device_id},
+            update,
+            upsert=True,
+            return_document=ReturnDocument.AFTER)
+
+    async def upsert_client_responses(
+        self,
+        updates: Dict[str, Dict]
+    ) -> BulkWriteResult | None:
+        '''
+        Create or update client responses for many
+        devices in a single bulk write
+
+        `updates`: update documents keyed by device ID
+        '''
+
+        ArgumentNullException.if_none(updates, 'updates')
+
+        if not updates:
+            return None
+
+        operations = [
+            UpdateOne(
+                {'device_id': device_id},
+                update,
+                upsert=True)
+            for device_id, update in updates.items()
+        ]
+
+        return await self.collection.bulk_write(
+            operations,
+            ordered=False)
+
+    async def get_client_responses(
+        self,
+        device_ids: List[str]
+    ) -> List[Dict]:
+        '''
+        Get the client responses for a list of devices
+        '''
+
+        ArgumentNullException.if_none(device_ids, 'device_ids')
+
+        return await (
+            self.collection
+            .find({'device_id': {'$in': device_ids}})
+            .to_list(length=None)
+        )
@@ -1,11 +1,17 @@
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List
 
-from data.constants import MongoConstants
-from domain.queries import (GetDeviceLogsByTimestampRangeQuery,
+from data.constants import DeviceLogConstants, MongoConstants
+from domain.queries import (GetDeviceLogAnalyticsQuery,
+                            GetDeviceLogsByTimestampRangeQuery,
                             GetDevicesByRegionQuery, GetDevicesQuery)
 from framework.exceptions.nulls import ArgumentNullException
+from framework.logger.providers import get_logger
 from framework.mongo.mongo_repository import MongoRepositoryAsync
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DeleteOne, IndexModel, InsertOne, UpdateOne
+from pymongo.results import BulkWriteResult
+
+logger = get_logger(__name__)
 
 
 class KasaDeviceRepository(MongoRepositoryAsync):
@@ -30,6 +36,11 @@ class KasaDeviceRepository(MongoRepositoryAsync):
 
         return result
 
+    async def get_device_count(
+        self
+    ) -> int:
+        return await self.collection.count_documents({})
+
     async def get_devices_by_region(
         self,
         region_id: str
@@ -97,6 +108,51 @@ class KasaDeviceRepository(MongoRepositoryAsync):
         return await results.to_list(
             length=None)
 
+    async def apply_device_sync(
+        self,
+        created: List[Dict],
+        updated: List[Dict],
+        removed: List[str]
+    ) -> BulkWriteResult | None:
+        '''
+        Apply a device sync diff in a single bulk write
+
+        `created`: device documents to insert
+        `updated`: device documents w/ changed name or type
+        `removed`: IDs of devices to delete
+        '''
+
+        ArgumentNullException.if_none(created, 'created')
+        ArgumentNullException.if_none(updated, 'updated')
+        ArgumentNullException.if_none(removed, 'removed')
+
+        operations = [InsertOne(document)
+                      for document in created]
+
+        # Only touch the fields owned by the Kasa client so
+        # region and sync settings are preserved
+        operations.extend([
+            UpdateOne(
+                {'device_id': document.get('device_id')},
+                {'$set': {
+                    'device_name': document.get('device_name'),
+                    'device_type': document.get('device_type')
+                }})
+            for document in updated
+        ])
+
+        operations.extend([
+            DeleteOne({'device_id': device_id})
+            for device_id in removed
+        ])
+
+        if not operations:
+            return None
+
+        return await self.collection.bulk_write(
+            operations,
+            ordered=False)
+
 
 class KasaDeviceLogRepository(MongoRepositoryAsync):
     def __init__(
@@ -108,17 +164,194 @@ class KasaDeviceLogRepository(MongoRepositoryAsync):
             database=MongoConstants.DatabaseName,
             collection=MongoConstants.KasaDeviceLogCollectionName)
 
-    async def get_device_logs_by_timestamp_range(
+    async def ensure_time_series(
         self,
-        start_timestamp: int,
-        end_timestamp: int
-    ):
-        query = GetDeviceLogsByTimestampRangeQuery(
-            start_timestamp=start_timestamp,
-            end_timestamp=end_timestamp)
+        expire_after_seconds: int = None
+    ) -> None:
+        '''
+        Provision the log collection as a time-series
+        collection, or update the retention if it exists
+
+        `expire_after_seconds`: TTL for log documents, logs
+        are retained indefinitely if not provided
+        '''
+
+        database = self.collection.database
+        name = self.collection.name
+
+        existing = await database.list_collection_names(
+            filter={'name': name})
+
+        if not any(existing):
+            logger.info(f'Creating time-series collection: {name}')
+
+            options = {
+                'timeseries': {
+                    'timeField': DeviceLogConstants.TimeField,
+                    'metaField': DeviceLogConstants.MetaField,
+                    'granularity': DeviceLogConstants.Granularity
+                }
+            }
+
+            if expire_after_seconds is not None:
+                options['expireAfterSeconds'] = expire_after_seconds
+
+            await database.create_collection(
+                name, **options)
+            return
+
+        logger.info(
+            f'Updating log retention: {name}: {expire_after_seconds}')
+
+        await database.command(
+            'collMod', name,
+            expireAfterSeconds=(
+                expire_after_seconds
+                if expire_after_seconds is not None
+                else 'off'))
+
+    async def ensure_indexes(
+        self
+    ) -> None:
+        '''
+        Indexes backing the device log filters
+        and sort order
+        '''
+
+        await self.collection.create_indexes([
+            IndexModel([('timestamp', ASCENDING),
+                        ('log_id', ASCENDING)]),
+            IndexModel([('metadata.device_id', ASCENDING),
+                        ('timestamp', ASCENDING)]),
+            IndexModel([('preset_id', ASCENDING),
+                        ('timestamp', ASCENDING)]),
+            IndexModel([('level', ASCENDING),
+                        ('timestamp', ASCENDING)])
+        ])
+
+    async def get_device_logs(
+        self,
+        query: GetDeviceLogsByTimestampRangeQuery,
+        limit: int
+    ) -> List[Dict]:
+        '''
+        Get a page of device logs
+        '''
+
+        ArgumentNullException.if_none(query, 'query')
 
         return await (
             self.collection
             .find(query.get_query())
+            .sort(query.get_sort())
+            .limit(limit)
+            .to_list(length=limit)
+        )
+
+    async def stream_device_logs(
+        self,
+        query: GetDeviceLogsByTimestampRangeQuery,
+        batch_size: int = 500
+    ) -> AsyncIterator[Dict]:
+        '''
+        Yield device logs as the cursor fetches
+        them from the server
+        '''
+
+        ArgumentNullException.if_none(query, 'query')
+
+        cursor = (
+            self.collection
+            .find(query.get_query())
+            .sort(query.get_sort())
+            .batch_size(batch_size)
+        )
+
+        async for document in cursor:
+            yield document
+
+    async def get_device_log_analytics(
+        self,
+        query: GetDeviceLogAnalyticsQuery
+    ) -> Dict:
+        '''
+        Aggregate per device and per preset log
+        analytics over the query range
+        '''
+
+        ArgumentNullException.if_none(query, 'query')
+
+        results = await (
+            self.collection
+            .aggregate(query.get_pipeline())
+            .to_list(length=None)
+        )
+
+        return results[0] if any(results) else dict()
+
+    async def rollup_device_logs(
+        self,
+        query: GetDeviceLogAnalyticsQuery,
+        key_type: str
+    ) -> None:
+        '''
+        Merge log analytics for the query range into
+        the rollup collection
+        '''
+
+        ArgumentNullException.if_none(query, 'query')
+
+        pipeline = query.get_rollup_pipeline(
+            key_type=key_type,
+            collection=MongoConstants.KasaDeviceLogRollupCollectionName)
+
+        # The merge only runs when the cursor is consumed
+        await (
+            self.collection
+            .aggregate(pipeline)
+            .to_list(length=None)
+        )
+
+    async def insert_logs(
+        self,
+        documents: List[Dict]
+    ):
+        '''
+        Insert a batch of device logs
+        '''
+
+        ArgumentNullException.if_none(documents, 'documents')
+
+        return await self.collection.insert_many(
+            documents,
+            ordered=False)
+
+
+class KasaDeviceLogRollupRepository(MongoRepositoryAsync):
+    def __init__(
+        self,
+        client: AsyncIOMotorClient
+    ):
+        super().__init__(
+            client=client,
+            database=MongoConstants.DatabaseName,
+            collection=MongoConstants.KasaDeviceLogRollupCollectionName)
+
+    async def get_rollups(
+        self,
+        query: GetDeviceLogAnalyticsQuery,
+        key_type: str
+    ) -> List[Dict]:
+        '''
+        Get daily log rollups for the query range
+        '''
+
+        ArgumentNullException.if_none(query, 'query')
+
+        return await (
+            self.collection
+            .find(query.get_rollup_query(key_type=key_type))
+            .sort([('_id.bucket', ASCENDING),
+                   ('errors', -1)])
             .to_list(length=None)
         )
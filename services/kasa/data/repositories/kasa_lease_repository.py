@@ -0,0 +1,76 @@
+import datetime
+
+from framework.exceptions.nulls import ArgumentNullException
+from framework.mongo.mongo_repository import MongoRepositoryAsync
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from data.constants import MongoConstants
+
+
+class KasaLeaseRepository(MongoRepositoryAsync):
+    def __init__(
+        self,
+        client: AsyncIOMotorClient
+    ):
+        super().__init__(
+            client=client,
+            database=MongoConstants.DatabaseName,
+            collection=MongoConstants.KasaLeaseCollectionName)
+
+    async def try_acquire(
+        self,
+        lease_name: str,
+        holder: str,
+        lease_seconds: float
+    ) -> bool:
+        '''
+        Acquire or renew a named lease, returns False if
+        another holder has an unexpired lease
+        '''
+
+        ArgumentNullException.if_none_or_whitespace(lease_name, 'lease_name')
+        ArgumentNullException.if_none_or_whitespace(holder, 'holder')
+
+        now = datetime.datetime.now(tz=datetime.UTC)
+
+        try:
+            # Matches only if the lease is expired or already
+            # ours, otherwise the upsert hits the unique _id
+            result = await self.collection.find_one_and_update(
+                {
+                    '_id': lease_name,
+                    '$or': [
+                        {'expires_at': {'$lte': now}},
+                        {'holder': holder}
+                    ]
+                },
+                {
+                    '$set': {
+                        'holder': holder,
+                        'expires_at': now + datetime.timedelta(
+                            seconds=lease_seconds),
+                        'renewed_at': now
+                    }
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER)
+        except DuplicateKeyError:
+            return False
+
+        return result is not None and result.get('holder') == holder
+
+    async def release(
+        self,
+        lease_name: str,
+        holder: str
+    ) -> None:
+        '''
+        Release a lease if it's held by `holder`
+        '''
+
+        await self.collection.delete_one({
+            '_id': lease_name,
+            'holder': holder
+        })
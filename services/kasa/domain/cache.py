@@ -57,6 +57,21 @@ class CacheKey:
     def device_state(device_id, preset_id):
         return f'device-state-{device_id}-{preset_id}'
 
+    @staticmethod
+    def device_shadow(device_id):
+        return f'device-shadow-{device_id}'
+
+    @staticmethod
+    def device_sync_fingerprint(destructive):
+        # Tracked separately since a non-destructive sync
+        # leaves removed devices in place
+        mode = 'destructive' if destructive else 'additive'
+        return f'device-sync-fingerprint-{mode}'
+
+    @staticmethod
+    def device_discovery():
+        return 'device-discovery'
+
 
 class CacheExpiration:
     @staticmethod
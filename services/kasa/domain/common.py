@@ -19,6 +19,25 @@ class Hashable:
         return base64.b64encode(hash_value).decode()
 
 
+class SlottedSerializable:
+    '''
+    Serializable base for models that declare `__slots__`,
+    the framework `Serializable` has no slots of its own
+    so its subclasses always get an instance `__dict__`
+    '''
+
+    __slots__ = ()
+
+    def to_dict(
+        self
+    ) -> dict:
+        return {
+            name: getattr(self, name, None)
+            for cls in reversed(type(self).__mro__)
+            for name in getattr(cls, '__slots__', ())
+        }
+
+
 class KasaRegion(Serializable):
     def __init__(self, data):
         self.region_id = data.get('region_id')
@@ -9,6 +9,39 @@ class KasaDeviceType:
     KasaCamera = 'IOT.IPCAMERA'
 
 
+class ClientResponseMode:
+    '''
+    Where client responses from device state
+    requests are persisted from
+    '''
+
+    Event = 'event'
+    Local = 'local'
+    Both = 'both'
+
+
+class DeviceShadowSource:
+    '''
+    Where a device shadow's reported state came from
+    '''
+
+    Set = 'set'
+    Read = 'read'
+    Poll = 'poll'
+
+
+class IdentityConstants:
+    # Refresh tokens once this much of their lifetime
+    # has passed
+    RefreshRatio = 0.8
+
+    # Treat tokens as expired this many seconds early
+    # to allow for clock skew and request latency
+    ExpirySkewSeconds = 30
+
+    DefaultExpiresInSeconds = 3600
+
+
 class KasaRequestMethod:
     Login = 'login'
     PASSTHROUGH = 'passthrough'
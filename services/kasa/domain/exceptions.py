@@ -140,3 +140,39 @@ class ClientResponseNotFoundException(Exception):
 class KasaClientResponseEventException(Exception):
     def __init__(self, *args: object) -> None:
         super().__init__(*args)
+
+
+class InvalidClientResponseRequestException(Exception):
+    def __init__(self, message, *args: object) -> None:
+        super().__init__(f"Client response request is not valid: {message}")
+
+
+class InvalidCursorException(Exception):
+    def __init__(self, cursor, *args: object) -> None:
+        super().__init__(f"Cursor '{cursor}' is not valid")
+
+
+class InvalidDeviceLogRequestException(Exception):
+    def __init__(self, message, *args: object) -> None:
+        super().__init__(f"Device log request is not valid: {message}")
+
+
+class UnauthorizedException(Exception):
+    def __init__(self, message, *args: object) -> None:
+        super().__init__(f"Unauthorized: {message}")
+
+
+class ForbiddenException(Exception):
+    def __init__(self, policy, *args: object) -> None:
+        super().__init__(f"Token does not satisfy policy '{policy}'")
+
+
+class SigningKeyNotFoundException(Exception):
+    def __init__(self, kid, *args: object) -> None:
+        super().__init__(f"No signing key with the ID '{kid}' exists")
+
+
+class KasaDeviceStateException(Exception):
+    def __init__(self, device_id, message, *args: object) -> None:
+        super().__init__(
+            f"Failed to get state for device with the ID '{device_id}': {message}")
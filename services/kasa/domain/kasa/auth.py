@@ -1,7 +1,11 @@
+import time
+
 from framework.auth.azure import AzureAd
 from framework.auth.configuration import AzureAdConfiguration
 from framework.configuration import Configuration
 
+from domain.constants import IdentityConstants
+
 
 class AdRole:
     Read = 'Kasa.Read'
@@ -15,8 +19,83 @@ class AuthPolicy:
     Execute = 'execute'
 
 
+# Role required by each authorization policy, None
+# allows any valid token
+AuthPolicyRoles = {
+    AuthPolicy.Read: AdRole.Read,
+    AuthPolicy.Write: AdRole.Write,
+    AuthPolicy.Execute: AdRole.Execute,
+    'default': None
+}
+
+
+class AuthToken:
+    def __init__(
+        self,
+        access_token: str,
+        expires_at: float,
+        refresh_at: float
+    ):
+        self.access_token = access_token
+        self.expires_at = expires_at
+        self.refresh_at = refresh_at
+
+    def is_expired(
+        self
+    ) -> bool:
+        return time.time() >= self.expires_at
+
+    def needs_refresh(
+        self
+    ) -> bool:
+        return time.time() >= self.refresh_at
+
+    def get_ttl_minutes(
+        self
+    ) -> int:
+        return max(int((self.expires_at - time.time()) // 60), 1)
+
+    def to_dict(
+        self
+    ) -> dict:
+        return {
+            'access_token': self.access_token,
+            'expires_at': self.expires_at,
+            'refresh_at': self.refresh_at
+        }
+
+    @staticmethod
+    def from_entity(
+        data: dict
+    ) -> 'AuthToken':
+        return AuthToken(
+            access_token=data.get('access_token'),
+            expires_at=data.get('expires_at'),
+            refresh_at=data.get('refresh_at'))
+
+    @staticmethod
+    def from_response(
+        data: dict
+    ) -> 'AuthToken':
+        '''
+        Create a token from an identity provider
+        response using `expires_in`
+        '''
+
+        expires_in = int(data.get(
+            'expires_in', IdentityConstants.DefaultExpiresInSeconds))
+        issued = time.time()
+
+        return AuthToken(
+            access_token=data.get('access_token'),
+            expires_at=(
+                issued + expires_in - IdentityConstants.ExpirySkewSeconds),
+            refresh_at=(
+                issued + expires_in * IdentityConstants.RefreshRatio))
+
+
 def contains_role(
-    token: str,
+    token: dict,
     role: str
 ) -> bool:
 
@@ -27,6 +106,27 @@ def contains_role(
     return True
 
 
+def is_authorized(
+    claims: dict,
+    policy: str
+) -> bool:
+    '''
+    Evaluate an authorization policy against verified
+    token claims
+    '''
+
+    if policy not in AuthPolicyRoles:
+        return False
+
+    role = AuthPolicyRoles.get(policy)
+    if role is None:
+        return True
+
+    return contains_role(
+        token=claims,
+        role=role)
+
+
 def configure_azure_ad(container):
     configuration = container.resolve(Configuration)
 
@@ -38,29 +138,11 @@ def configure_azure_ad(container):
         audiences=ad_auth.audiences,
         issuer=ad_auth.issuer)
 
-    azure_ad.add_authorization_policy(
-        name='read',
-        func=lambda t: contains_role(
-            token=t,
-            role=AdRole.Read
-        ))
-
-    azure_ad.add_authorization_policy(
-        name='write',
-        func=lambda t: contains_role(
-            token=t,
-            role=AdRole.Write
-        ))
-
-    azure_ad.add_authorization_policy(
-        name='default',
-        func=lambda t: True)
-
-    azure_ad.add_authorization_policy(
-        name='execute',
-        func=lambda t: contains_role(
-            token=t,
-            role=AdRole.Execute
-        ))
+    for policy in AuthPolicyRoles:
+        azure_ad.add_authorization_policy(
+            name=policy,
+            func=lambda t, policy=policy: is_authorized(
+                claims=t,
+                policy=policy))
 
     return azure_ad
@@ -2,11 +2,23 @@ import uuid
 from datetime import datetime
 from typing import Dict
 
+from domain.common import SlottedSerializable
 from domain.rest import UpdateClientResponseRequest
-from framework.serialization import Serializable
 
 
-class KasaClientResponse(Serializable):
+class KasaClientResponse(SlottedSerializable):
+    __slots__ = (
+        'client_response_id',
+        'device_id',
+        'preset_id',
+        'client_response',
+        'state_key',
+        'created_date',
+        'modified_date',
+        'sync_status',
+        'sync_reason'
+    )
+
     @property
     def is_error(
         self
@@ -31,6 +43,26 @@ class KasaClientResponse(Serializable):
         self.created_date = created_date
         self.modified_date = modified_date
 
+    def to_dict(
+        self
+    ) -> dict:
+        data = {
+            'client_response_id': self.client_response_id,
+            'device_id': self.device_id,
+            'preset_id': self.preset_id,
+            'client_response': self.client_response,
+            'state_key': self.state_key,
+            'created_date': self.created_date,
+            'modified_date': self.modified_date
+        }
+
+        # Sync status is only present once it's been set
+        for field in ['sync_status', 'sync_reason']:
+            if hasattr(self, field):
+                data[field] = getattr(self, field)
+
+        return data
+
     @staticmethod
     def from_entity(
         data: dict
@@ -70,6 +102,30 @@ class KasaClientResponse(Serializable):
 
         self.modified_date = datetime.now()
 
+    @staticmethod
+    def get_upsert(
+        request: UpdateClientResponseRequest
+    ) -> dict:
+        '''
+        Update document that creates the client response
+        for the device if one doesn't exist
+        '''
+
+        now = datetime.now()
+
+        return {
+            '$set': {
+                'preset_id': request.preset_id,
+                'client_response': request.client_response,
+                'state_key': request.state_key,
+                'modified_date': now
+            },
+            '$setOnInsert': {
+                'client_response_id': str(uuid.uuid4()),
+                'created_date': now
+            }
+        }
+
     def update_sync_status(
         self,
         sync_status: str,
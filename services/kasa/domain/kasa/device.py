@@ -1,6 +1,8 @@
+import datetime
 from abc import abstractmethod
 from typing import Literal
 
+from domain.common import SlottedSerializable
 from domain.constants import KasaDeviceType
 from domain.exceptions import InvalidDeviceTypeException
 from domain.rest import KasaApiRequest
@@ -8,7 +10,15 @@ from framework.exceptions.nulls import ArgumentNullException
 from framework.serialization import Serializable
 
 
-class KasaDevice(Serializable):
+class KasaDevice(SlottedSerializable):
+    __slots__ = (
+        'device_id',
+        'device_name',
+        'device_type',
+        'device_sync',
+        'region_id'
+    )
+
     def __init__(
         self,
         data: dict
@@ -19,6 +29,11 @@ class KasaDevice(Serializable):
         self.device_sync = data.get('device_sync')
         self.region_id = data.get('region_id')
 
+        self._validate()
+
+    def _validate(
+        self
+    ) -> None:
         ArgumentNullException.if_none_or_whitespace(
             self.device_id, 'device_id')
         ArgumentNullException.if_none_or_whitespace(
@@ -27,6 +42,36 @@ class KasaDevice(Serializable):
         self._validate_device_type(
             device_type=self.device_type)
 
+    def to_dict(
+        self
+    ) -> dict:
+        return {
+            'device_id': self.device_id,
+            'device_name': self.device_name,
+            'device_type': self.device_type,
+            'device_sync': self.device_sync,
+            'region_id': self.region_id
+        }
+
+    @classmethod
+    def from_entity(
+        cls,
+        data: dict
+    ) -> 'KasaDevice':
+        '''
+        Construct a device from a stored document, which
+        was validated when it was written
+        '''
+
+        device = cls.__new__(cls)
+        device.device_id = data.get('device_id')
+        device.device_name = data.get('device_name')
+        device.device_type = data.get('device_type')
+        device.device_sync = data.get('device_sync')
+        device.region_id = data.get('region_id')
+
+        return device
+
     def get_selector(
         self
     ) -> dict:
@@ -124,7 +169,20 @@ class KasaDevice(Serializable):
         self.region_id = region_id
 
 
-class DeviceLog(Serializable):
+class DeviceLog(SlottedSerializable):
+    __slots__ = (
+        'log_id',
+        'timestamp',
+        'level',
+        'device_id',
+        'device_name',
+        'preset_id',
+        'preset_name',
+        'state_key',
+        'message',
+        'latency'
+    )
+
     def __init__(
         self,
         log_id: str,
@@ -135,7 +193,8 @@ class DeviceLog(Serializable):
         preset_id: str,
         preset_name: str,
         state_key: str,
-        message: str
+        message: str,
+        latency: float = None
     ):
         self.log_id = log_id
         self.timestamp = timestamp
@@ -146,18 +205,114 @@ class DeviceLog(Serializable):
         self.preset_name = preset_name
         self.state_key = state_key
         self.message = message
+        self.latency = latency
+
+    def to_dict(
+        self
+    ) -> dict:
+        return {
+            'log_id': self.log_id,
+            'timestamp': self.timestamp,
+            'level': self.level,
+            'device_id': self.device_id,
+            'device_name': self.device_name,
+            'preset_id': self.preset_id,
+            'preset_name': self.preset_name,
+            'state_key': self.state_key,
+            'message': self.message,
+            'latency': self.latency
+        }
+
+    def to_entity(
+        self
+    ) -> dict:
+        '''
+        Time-series document for the log, device details
+        are stored as the series metadata
+        '''
+
+        return {
+            'log_id': self.log_id,
+            'timestamp': datetime.datetime.fromtimestamp(
+                self.timestamp, tz=datetime.UTC),
+            'metadata': {
+                'device_id': self.device_id,
+                'device_name': self.device_name
+            },
+            'level': self.level,
+            'preset_id': self.preset_id,
+            'preset_name': self.preset_name,
+            'state_key': self.state_key,
+            'message': self.message,
+            'latency': self.latency
+        }
 
     @staticmethod
     def from_entity(
         data: dict
     ):
+        # Legacy log documents are flat w/ an epoch timestamp
+        metadata = data.get('metadata') or data
+        timestamp = data.get('timestamp')
+
+        if isinstance(timestamp, datetime.datetime):
+            timestamp = int(timestamp.replace(
+                tzinfo=timestamp.tzinfo or datetime.UTC).timestamp())
+
         return DeviceLog(
             log_id=data.get('log_id'),
-            timestamp=data.get('timestamp'),
+            timestamp=timestamp,
             level=data.get('level'),
-            device_id=data.get('device_id'),
-            device_name=data.get('device_name'),
+            device_id=metadata.get('device_id'),
+            device_name=metadata.get('device_name'),
             preset_id=data.get('preset_id'),
             preset_name=data.get('preset_name'),
             state_key=data.get('state_key'),
-            message=data.get('message'))
+            message=data.get('message'),
+            latency=data.get('latency'))
+
+
+class DeviceLogAnalyticsRow(Serializable):
+    def __init__(
+        self,
+        key_type: str,
+        key: str,
+        name: str,
+        bucket: datetime.datetime,
+        count: int,
+        errors: int,
+        error_rate: float,
+        latency: dict
+    ):
+        self.key_type = key_type
+        self.key = key
+        self.name = name
+        self.bucket = bucket
+        self.count = count
+        self.errors = errors
+        self.error_rate = error_rate
+        self.latency = latency
+
+    @staticmethod
+    def from_entity(
+        data: dict
+    ):
+        group = data.get('_id')
+
+        # Percentiles are null for buckets w/o any
+        # latency recorded
+        p50, p95, p99 = data.get('latency') or [None, None, None]
+
+        return DeviceLogAnalyticsRow(
+            key_type=group.get('key_type'),
+            key=group.get('key'),
+            name=data.get('name'),
+            bucket=group.get('bucket'),
+            count=data.get('count'),
+            errors=data.get('errors'),
+            error_rate=data.get('error_rate'),
+            latency={
+                'p50': p50,
+                'p95': p95,
+                'p99': p99
+            })
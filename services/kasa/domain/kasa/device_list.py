@@ -0,0 +1,96 @@
+import time
+from typing import Dict, List
+
+from domain.common import SlottedSerializable
+from domain.kasa.device import KasaDevice
+from framework.exceptions.nulls import ArgumentNullException
+from utils.helpers import generate_key
+
+# Device list fields that sync, status and routing
+# depend on, other fields don't change the fingerprint
+FINGERPRINT_FIELDS = (
+    'deviceId',
+    'alias',
+    'deviceType',
+    'status',
+    'appServerUrl'
+)
+
+
+class KasaDeviceStatus:
+    Offline = 0
+    Online = 1
+
+
+class KasaDeviceList(SlottedSerializable):
+    '''
+    Kasa cloud device list fingerprinted by the fields
+    downstream work depends on
+    '''
+
+    __slots__ = (
+        'devices',
+        'fingerprint',
+        'fetched_at'
+    )
+
+    def __init__(
+        self,
+        devices: List[dict],
+        fetched_at: float = None
+    ):
+        ArgumentNullException.if_none(devices, 'devices')
+
+        self.devices = devices
+        self.fingerprint = KasaDeviceList.get_fingerprint(
+            devices=devices)
+        self.fetched_at = fetched_at or time.time()
+
+    @staticmethod
+    def get_fingerprint(
+        devices: List[dict]
+    ) -> str:
+        '''
+        Hash of the relevant fields of every device, the
+        fingerprint doesn't depend on list order
+        '''
+
+        rows = sorted(
+            [[device.get(field) for field in FINGERPRINT_FIELDS]
+             for device in devices],
+            key=lambda row: str(row[0]))
+
+        return generate_key(
+            items=rows)
+
+    def get_age(
+        self
+    ) -> float:
+        return time.time() - self.fetched_at
+
+    def get_statuses(
+        self
+    ) -> Dict[str, bool]:
+        '''
+        Online status for each device ID
+        '''
+
+        return {
+            device.get('deviceId'): device.get('status') == KasaDeviceStatus.Online
+            for device in self.devices
+        }
+
+    def to_devices(
+        self
+    ) -> List[KasaDevice]:
+        return [KasaDevice.from_device_json_object(kasa_device=device)
+                for device in self.devices]
+
+    def to_dict(
+        self
+    ) -> dict:
+        return {
+            'devices': self.devices,
+            'fingerprint': self.fingerprint,
+            'fetched_at': self.fetched_at
+        }
@@ -3,10 +3,18 @@ from framework.exceptions.nulls import ArgumentNullException
 from domain.constants import KasaDeviceType
 from domain.kasa.device import KasaDevice
 from domain.rest import KasaResponse
-from utils.helpers import generate_key
+from utils.helpers import generate_state_key
 
 
 class KasaLight(KasaDevice):
+    __slots__ = (
+        'state',
+        'brightness',
+        'hue',
+        'saturation',
+        'temperature'
+    )
+
     def __init__(
         self,
         device_id: str,
@@ -18,27 +26,21 @@ class KasaLight(KasaDevice):
         temperature: int | float = 0,
         **kwargs
     ):
-
-        self.state = state
+        # Set the base device fields directly rather than
+        # building them into a dict for the base class
         self.device_id = device_id
         self.device_name = device_name
+        self.device_type = KasaDeviceType.KasaLight
+        self.device_sync = None
+        self.region_id = None
+
+        self.state = state
         self.brightness = brightness
         self.hue = hue
         self.saturation = saturation
         self.temperature = temperature
 
-        super().__init__({
-            'device_id': device_id,
-            'device_name': device_name,
-            'device_type': KasaDeviceType.KasaLight
-        })
-
-        ArgumentNullException.if_none_or_whitespace(
-            self.device_id, 'device_id')
-        ArgumentNullException.if_none_or_whitespace(
-            self.device_name, 'device_name')
-        ArgumentNullException.if_none_or_whitespace(
-            self.device_type, 'device_type')
+        self._validate()
 
         ArgumentNullException.if_none_or_whitespace(self.state, 'state')
 
@@ -46,17 +48,44 @@ class KasaLight(KasaDevice):
         ArgumentNullException.if_none(self.hue, 'hue')
         ArgumentNullException.if_none(self.saturation, 'saturation')
 
+    def to_dict(
+        self
+    ) -> dict:
+        return super().to_dict() | {
+            'state': self.state,
+            'brightness': self.brightness,
+            'hue': self.hue,
+            'saturation': self.saturation,
+            'temperature': self.temperature
+        }
+
     def state_key(
         self
     ) -> str:
-        params = [self.state,
-                  self.saturation,
-                  self.brightness,
-                  self.hue,
-                  self.temperature]
+        return generate_state_key(
+            device_type=KasaDeviceType.KasaLight,
+            params=(self.state,
+                    self.saturation,
+                    self.brightness,
+                    self.hue,
+                    self.temperature))
 
-        return generate_key(
-            items=params)
+    @staticmethod
+    def get_state_key(
+        definition: dict
+    ) -> str:
+        '''
+        State key for a preset definition without building
+        the device model
+        '''
+
+        return generate_state_key(
+            device_type=KasaDeviceType.KasaLight,
+            params=(definition.get('state'),
+                    definition.get('saturation'),
+                    definition.get('brightness'),
+                    definition.get('hue'),
+                    definition.get('temperature', 0)))
 
     @staticmethod
     def from_kasa_response(
@@ -73,16 +102,30 @@ class KasaLight(KasaDevice):
         if not kasa_response.has_result:
             return
 
+        return KasaLight.from_device_object(
+            device_object=kasa_response.device_object)
+
+    @staticmethod
+    def from_device_object(
+        device_object: dict
+    ) -> 'KasaLight':
+        '''
+        Construct a `KasaLight` instance from the device
+        sysinfo object
+        '''
+
+        ArgumentNullException.if_none(device_object, 'device_object')
+
         # Base device object
         device = KasaDevice.from_device_json_object(
-            kasa_device=kasa_response.device_object)
+            kasa_device=device_object)
 
         # Light on/off
-        light_power_state = kasa_response.device_object.get(
+        light_power_state = device_object.get(
             'light_state').get('on_off')
 
         # Get the light device parameters
-        light_params = kasa_response.device_object.get(
+        light_params = device_object.get(
             'light_state')
 
         # Get the nested default light params if they're present
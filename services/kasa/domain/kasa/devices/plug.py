@@ -2,10 +2,14 @@ from domain.constants import KasaDeviceType
 from domain.kasa.device import KasaDevice
 from domain.rest import KasaResponse
 from framework.exceptions.nulls import ArgumentNullException
-from utils.helpers import generate_key
+from utils.helpers import generate_state_key
 
 
 class KasaPlug(KasaDevice):
+    __slots__ = (
+        'state',
+    )
+
     def __init__(
         self,
         device_id: str,
@@ -13,22 +17,42 @@ class KasaPlug(KasaDevice):
         state: bool,
         **kwargs
     ):
+        self.device_id = device_id
+        self.device_name = device_name
+        self.device_type = KasaDeviceType.KasaPlug
+        self.device_sync = None
+        self.region_id = None
 
         self.state = state
 
-        super().__init__({
-            'device_id': device_id,
-            'device_name': device_name,
-            'device_type': KasaDeviceType.KasaPlug
-        })
+        self._validate()
+
+    def to_dict(
+        self
+    ) -> dict:
+        return super().to_dict() | {
+            'state': self.state
+        }
 
     def state_key(
         self
     ) -> str:
-        params = [self.state]
+        return generate_state_key(
+            device_type=KasaDeviceType.KasaPlug,
+            params=(self.state,))
 
-        return generate_key(
-            items=params)
+    @staticmethod
+    def get_state_key(
+        definition: dict
+    ) -> str:
+        '''
+        State key for a preset definition without building
+        the device model
+        '''
+
+        return generate_state_key(
+            device_type=KasaDeviceType.KasaPlug,
+            params=(definition.get('state'),))
 
     @staticmethod
     def from_kasa_response(
@@ -40,12 +64,26 @@ class KasaPlug(KasaDevice):
         if not kasa_response.has_result:
             return
 
+        return KasaPlug.from_device_object(
+            device_object=kasa_response.device_object)
+
+    @staticmethod
+    def from_device_object(
+        device_object: dict
+    ) -> 'KasaPlug':
+        '''
+        Construct a `KasaPlug` instance from the device
+        sysinfo object
+        '''
+
+        ArgumentNullException.if_none(device_object, 'device_object')
+
         # Create the base Kasa device
         device = KasaDevice.from_device_json_object(
-            kasa_device=kasa_response.device_object)
+            kasa_device=device_object)
 
         # Get the power state (on/off)
-        power_state = kasa_response.device_object.get('relay_state')
+        power_state = device_object.get('relay_state')
 
         return KasaPlug(
             device_id=device.device_id,
@@ -0,0 +1,77 @@
+import time
+
+from domain.common import SlottedSerializable
+
+
+class DiscoveredDevice(SlottedSerializable):
+    '''
+    Device that answered a LAN discovery probe and the
+    address it answered from
+    '''
+
+    __slots__ = (
+        'device_id',
+        'ip',
+        'alias',
+        'device_type',
+        'last_seen'
+    )
+
+    def __init__(
+        self,
+        device_id: str,
+        ip: str,
+        alias: str = None,
+        device_type: str = None,
+        last_seen: float = None
+    ):
+        self.device_id = device_id
+        self.ip = ip
+        self.alias = alias
+        self.device_type = device_type
+        self.last_seen = last_seen or time.time()
+
+    def get_age(
+        self
+    ) -> float:
+        return time.time() - self.last_seen
+
+    def is_expired(
+        self,
+        max_age: float
+    ) -> bool:
+        return self.get_age() > max_age
+
+    def to_dict(
+        self
+    ) -> dict:
+        return {
+            'device_id': self.device_id,
+            'ip': self.ip,
+            'alias': self.alias,
+            'device_type': self.device_type,
+            'last_seen': self.last_seen
+        }
+
+    @staticmethod
+    def from_sysinfo(
+        ip: str,
+        sysinfo: dict
+    ) -> 'DiscoveredDevice':
+        return DiscoveredDevice(
+            device_id=sysinfo.get('deviceId'),
+            ip=ip,
+            alias=sysinfo.get('alias'),
+            device_type=(sysinfo.get('mic_type')
+                         or sysinfo.get('type')))
+
+    @staticmethod
+    def from_entity(
+        data: dict
+    ) -> 'DiscoveredDevice':
+        return DiscoveredDevice(
+            device_id=data.get('device_id'),
+            ip=data.get('ip'),
+            alias=data.get('alias'),
+            device_type=data.get('device_type'),
+            last_seen=data.get('last_seen'))
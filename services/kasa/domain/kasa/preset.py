@@ -1,13 +1,13 @@
 import uuid
 from typing import Dict
 
+from domain.common import SlottedSerializable
 from domain.constants import KasaDeviceType
 from domain.kasa.device import KasaDevice
 from domain.kasa.devices.light import KasaLight
 from domain.kasa.devices.plug import KasaPlug
 from domain.rest import KasaRequest
 from framework.exceptions.nulls import ArgumentNullException
-from framework.serialization import Serializable
 from utils.helpers import DateTimeUtil
 
 
@@ -43,7 +43,16 @@ class KasaDeviceHandler:
             return KasaLight(**params)
 
 
-class KasaPreset(Serializable):
+class KasaPreset(SlottedSerializable):
+    __slots__ = (
+        'preset_id',
+        'preset_name',
+        'device_type',
+        'definition',
+        'created_date',
+        'modified_date'
+    )
+
     def __init__(
         self,
         preset_id: str,
@@ -67,6 +76,37 @@ class KasaPreset(Serializable):
         ArgumentNullException.if_none(
             self.definition, 'definition')
 
+    def to_dict(
+        self
+    ) -> dict:
+        return {
+            'preset_id': self.preset_id,
+            'preset_name': self.preset_name,
+            'device_type': self.device_type,
+            'definition': self.definition,
+            'created_date': self.created_date,
+            'modified_date': self.modified_date
+        }
+
+    @staticmethod
+    def from_entity(
+        data: dict
+    ) -> 'KasaPreset':
+        '''
+        Construct a preset from a stored document, which
+        was validated when it was written
+        '''
+
+        preset = KasaPreset.__new__(KasaPreset)
+        preset.preset_id = data.get('preset_id')
+        preset.preset_name = data.get('preset_name')
+        preset.device_type = data.get('device_type')
+        preset.definition = data.get('definition')
+        preset.created_date = data.get('created_date')
+        preset.modified_date = data.get('modified_date')
+
+        return preset
+
     @staticmethod
     def from_dict(
         data: dict
@@ -146,6 +186,23 @@ class KasaPreset(Serializable):
         if self.device_type == KasaDeviceType.KasaLight:
             return KasaLight(**params)
 
+    def get_state_key(
+        self
+    ) -> str:
+        '''
+        State key for the preset, the key only depends on
+        the device type and definition so it's shared by
+        every device the preset is applied to
+        '''
+
+        if self.device_type == KasaDeviceType.KasaPlug:
+            return KasaPlug.get_state_key(
+                definition=self.definition)
+
+        if self.device_type == KasaDeviceType.KasaLight:
+            return KasaLight.get_state_key(
+                definition=self.definition)
+
     def to_request(
         self,
         device: KasaDevice
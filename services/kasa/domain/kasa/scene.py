@@ -1,6 +1,7 @@
 import uuid
 from datetime import datetime
 
+from domain.common import SlottedSerializable
 from domain.exceptions import NullArgumentException
 from framework.serialization import Serializable
 from utils.helpers import DateTimeUtil
@@ -86,7 +87,17 @@ class KasaPresetDeviceMapping:
         self.devices = mapping.get('devices')
 
 
-class KasaScene(Serializable):
+class KasaScene(SlottedSerializable):
+    __slots__ = (
+        'scene_id',
+        'scene_name',
+        'scene_category_id',
+        'mapping',
+        'flow',
+        'modified_date',
+        'created_date'
+    )
+
     def __init__(
         self,
         scene_id: str,
@@ -111,6 +122,39 @@ class KasaScene(Serializable):
         NullArgumentException.if_none_or_whitespace(
             self.scene_name, 'scene_name')
 
+    def to_dict(
+        self
+    ) -> dict:
+        return {
+            'scene_id': self.scene_id,
+            'scene_name': self.scene_name,
+            'scene_category_id': self.scene_category_id,
+            'mapping': self.mapping,
+            'flow': self.flow,
+            'modified_date': self.modified_date,
+            'created_date': self.created_date
+        }
+
+    @staticmethod
+    def from_entity(
+        data: dict
+    ) -> 'KasaScene':
+        '''
+        Construct a scene from a stored document, which
+        was validated when it was written
+        '''
+
+        scene = KasaScene.__new__(KasaScene)
+        scene.scene_id = data.get('scene_id')
+        scene.scene_name = data.get('scene_name')
+        scene.scene_category_id = data.get('scene_category_id')
+        scene.mapping = data.get('mapping')
+        scene.flow = data.get('flow')
+        scene.modified_date = data.get('modified_date')
+        scene.created_date = data.get('created_date')
+
+        return scene
+
     @staticmethod
     def from_dict(
         data: dict
@@ -0,0 +1,195 @@
+import time
+
+from domain.common import SlottedSerializable
+from domain.constants import KasaDeviceType
+from domain.kasa.devices.light import KasaLight
+from domain.kasa.devices.plug import KasaPlug
+
+
+class DeviceShadow(SlottedSerializable):
+    '''
+    Last known (reported) and requested (desired) state
+    of a device
+    '''
+
+    __slots__ = (
+        'device_id',
+        'reported',
+        'reported_at',
+        'reported_source',
+        'desired',
+        'desired_at',
+        'preset_id',
+        'state_key',
+        'last_error',
+        'online',
+        'online_at'
+    )
+
+    def __init__(
+        self,
+        device_id: str,
+        reported: dict = None,
+        reported_at: float = None,
+        reported_source: str = None,
+        desired: dict = None,
+        desired_at: float = None,
+        preset_id: str = None,
+        state_key: str = None,
+        last_error: str = None,
+        online: bool = None,
+        online_at: float = None
+    ):
+        self.device_id = device_id
+        self.reported = reported
+        self.reported_at = reported_at
+        self.reported_source = reported_source
+        self.desired = desired
+        self.desired_at = desired_at
+        self.preset_id = preset_id
+        self.state_key = state_key
+        self.last_error = last_error
+        self.online = online
+        self.online_at = online_at
+
+    @property
+    def in_sync(
+        self
+    ) -> bool:
+        '''
+        Whether the reported state was captured after the
+        last desired state was applied
+        '''
+
+        if self.desired_at is None:
+            return True
+        if self.reported_at is None:
+            return False
+
+        return self.reported_at >= self.desired_at
+
+    def get_reported_device(
+        self
+    ) -> KasaLight | KasaPlug | None:
+        '''
+        Parse the reported sysinfo into the typed device
+        model, None if there's no reported state or the
+        device type isn't supported
+        '''
+
+        if self.reported is None:
+            return None
+
+        device_type = (self.reported.get('deviceType')
+                       or self.reported.get('mic_type'))
+
+        if device_type == KasaDeviceType.KasaLight:
+            return KasaLight.from_device_object(
+                device_object=self.reported)
+
+        if device_type == KasaDeviceType.KasaPlug:
+            return KasaPlug.from_device_object(
+                device_object=self.reported)
+
+    def get_age(
+        self
+    ) -> float | None:
+        if self.reported_at is None:
+            return None
+
+        return time.time() - self.reported_at
+
+    def is_stale(
+        self,
+        max_age: float
+    ) -> bool:
+        '''
+        Whether the reported state can't be served within
+        the staleness bound `max_age` seconds
+        '''
+
+        age = self.get_age()
+
+        if age is None or not self.in_sync:
+            return True
+
+        return age > max_age
+
+    def report(
+        self,
+        reported: dict,
+        source: str
+    ) -> None:
+        self.reported = reported
+        self.reported_at = time.time()
+        self.reported_source = source
+        self.last_error = None
+
+    def desire(
+        self,
+        desired: dict,
+        preset_id: str,
+        state_key: str,
+        error: str = None
+    ) -> None:
+        self.desired = desired
+        self.desired_at = time.time()
+        self.preset_id = preset_id
+        self.state_key = state_key
+        self.last_error = error
+
+    def set_online(
+        self,
+        online: bool
+    ) -> None:
+        self.online = online
+        self.online_at = time.time()
+
+    def get_freshness(
+        self,
+        max_age: float
+    ) -> dict:
+        age = self.get_age()
+
+        return {
+            'age_seconds': round(age, 3) if age is not None else None,
+            'max_age_seconds': max_age,
+            'stale': self.is_stale(max_age=max_age),
+            'in_sync': self.in_sync,
+            'online': self.online,
+            'source': self.reported_source
+        }
+
+    def to_dict(
+        self
+    ) -> dict:
+        return {
+            'device_id': self.device_id,
+            'reported': self.reported,
+            'reported_at': self.reported_at,
+            'reported_source': self.reported_source,
+            'desired': self.desired,
+            'desired_at': self.desired_at,
+            'preset_id': self.preset_id,
+            'state_key': self.state_key,
+            'last_error': self.last_error,
+            'online': self.online,
+            'online_at': self.online_at
+        }
+
+    @staticmethod
+    def from_entity(
+        data: dict
+    ) -> 'DeviceShadow':
+        return DeviceShadow(
+            device_id=data.get('device_id'),
+            reported=data.get('reported'),
+            reported_at=data.get('reported_at'),
+            reported_source=data.get('reported_source'),
+            desired=data.get('desired'),
+            desired_at=data.get('desired_at'),
+            preset_id=data.get('preset_id'),
+            state_key=data.get('state_key'),
+            last_error=data.get('last_error'),
+            online=data.get('online'),
+            online_at=data.get('online_at'))
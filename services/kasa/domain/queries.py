@@ -1,6 +1,11 @@
+import base64
+import datetime
+import json
 from abc import abstractmethod
 from typing import Dict, List
 
+from data.constants import DeviceLogConstants
+from domain.exceptions import InvalidCursorException
 from framework.serialization import Serializable
 from framework.validators.nulls import none_or_whitespace
 
@@ -98,21 +103,249 @@ class GetPresetsByPresetIdsQuery(Queryable):
         }
 
 
+class DeviceLogCursor:
+    '''
+    Opaque position in the device log sort order
+    (timestamp, log ID) for cursor pagination
+    '''
+
+    def __init__(
+        self,
+        timestamp: int,
+        log_id: str
+    ):
+        self.timestamp = timestamp
+        self.log_id = log_id
+
+    def encode(
+        self
+    ) -> str:
+        value = json.dumps([self.timestamp, self.log_id])
+
+        return base64.urlsafe_b64encode(
+            value.encode()).decode()
+
+    @staticmethod
+    def decode(
+        cursor: str
+    ) -> 'DeviceLogCursor':
+        try:
+            timestamp, log_id = json.loads(
+                base64.urlsafe_b64decode(cursor.encode()))
+        except Exception:
+            raise InvalidCursorException(cursor)
+
+        return DeviceLogCursor(
+            timestamp=timestamp,
+            log_id=log_id)
+
+
 class GetDeviceLogsByTimestampRangeQuery(Queryable):
     def __init__(
         self,
         start_timestamp: int,
-        end_timestamp: int
+        end_timestamp: int,
+        device_id: str = None,
+        preset_id: str = None,
+        level: str = None,
+        cursor: DeviceLogCursor = None
+    ):
+        self.start_timestamp = start_timestamp
+        self.end_timestamp = end_timestamp
+        self.device_id = device_id
+        self.preset_id = preset_id
+        self.level = level
+        self.cursor = cursor
+
+    def _to_date(
+        self,
+        timestamp: int
+    ) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(
+            timestamp, tz=datetime.UTC)
+
+    def _get_cursor_filter(
+        self
+    ) -> dict:
+        # Resume after the last log on the previous page,
+        # log ID breaks ties between equal timestamps
+        timestamp = self._to_date(self.cursor.timestamp)
+
+        return {
+            '$or': [
+                {'timestamp': {'$gt': timestamp}},
+                {'timestamp': timestamp,
+                 'log_id': {'$gt': self.cursor.log_id}}
+            ]
+        }
+
+    def get_query(
+        self
+    ) -> dict:
+        # The time-series time field is a date
+        query = {
+            'timestamp': {
+                '$gte': self._to_date(self.start_timestamp),
+                '$lte': self._to_date(self.end_timestamp)
+            }
+        }
+
+        if not none_or_whitespace(self.device_id):
+            query['metadata.device_id'] = self.device_id
+
+        if not none_or_whitespace(self.preset_id):
+            query['preset_id'] = self.preset_id
+
+        if not none_or_whitespace(self.level):
+            query['level'] = self.level
+
+        if self.cursor is not None:
+            query |= self._get_cursor_filter()
+
+        return query
+
+    def get_sort(
+        self
+    ) -> list:
+        return [('timestamp', 1),
+                ('log_id', 1)]
+
+
+class DeviceLogAnalyticsKey:
+    Device = 'device'
+    Preset = 'preset'
+
+
+class GetDeviceLogAnalyticsQuery(Queryable):
+    '''
+    Device log analytics aggregation, the latency
+    percentiles use `$percentile` which needs MongoDB
+    7.0 or later
+    '''
+
+    # Group key and display name fields by key type
+    _key_fields = {
+        DeviceLogAnalyticsKey.Device: (
+            '$metadata.device_id', '$metadata.device_name'),
+        DeviceLogAnalyticsKey.Preset: (
+            '$preset_id', '$preset_name')
+    }
+
+    def __init__(
+        self,
+        start_timestamp: int,
+        end_timestamp: int,
+        bucket: str = DeviceLogConstants.DefaultAnalyticsBucket
     ):
         self.start_timestamp = start_timestamp
         self.end_timestamp = end_timestamp
+        self.bucket = bucket
+
+    def _to_date(
+        self,
+        timestamp: int
+    ) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(
+            timestamp, tz=datetime.UTC)
 
     def get_query(
         self
     ) -> dict:
         return {
             'timestamp': {
-                '$gte': self.start_timestamp,
-                '$lte': self.end_timestamp
+                '$gte': self._to_date(self.start_timestamp),
+                '$lte': self._to_date(self.end_timestamp)
+            }
+        }
+
+    def get_group_stages(
+        self,
+        key_type: str
+    ) -> list:
+        '''
+        Command counts, errors and latency percentiles
+        per key per time bucket
+        '''
+
+        key, name = self._key_fields.get(key_type)
+
+        return [
+            {'$group': {
+                '_id': {
+                    'key_type': key_type,
+                    'key': key,
+                    'bucket': {'$dateTrunc': {
+                        'date': '$timestamp',
+                        'unit': self.bucket
+                    }}
+                },
+                'name': {'$last': name},
+                'count': {'$sum': 1},
+                'errors': {'$sum': {
+                    '$cond': [{'$eq': ['$level', 'ERROR']}, 1, 0]
+                }},
+                'latency': {'$percentile': {
+                    'input': '$latency',
+                    'p': DeviceLogConstants.LatencyPercentiles,
+                    'method': 'approximate'
+                }}
+            }},
+            {'$set': {
+                'error_rate': {'$divide': ['$errors', '$count']}
+            }},
+            {'$sort': {
+                '_id.bucket': 1,
+                'errors': -1
+            }}
+        ]
+
+    def get_pipeline(
+        self
+    ) -> list:
+        return [
+            {'$match': self.get_query()},
+            {'$facet': {
+                'devices': self.get_group_stages(
+                    key_type=DeviceLogAnalyticsKey.Device),
+                'presets': self.get_group_stages(
+                    key_type=DeviceLogAnalyticsKey.Preset)
+            }}
+        ]
+
+    def get_rollup_pipeline(
+        self,
+        key_type: str,
+        collection: str
+    ) -> list:
+        '''
+        Aggregate the range and merge the results into
+        the rollup collection, reruns replace the
+        existing rollups
+        '''
+
+        return [
+            {'$match': self.get_query()},
+            *self.get_group_stages(key_type=key_type),
+            {'$merge': {
+                'into': collection,
+                'on': '_id',
+                'whenMatched': 'replace',
+                'whenNotMatched': 'insert'
+            }}
+        ]
+
+    def get_rollup_query(
+        self,
+        key_type: str
+    ) -> dict:
+        # Rollup buckets are truncated to the day
+        start = self._to_date(self.start_timestamp).replace(
+            hour=0, minute=0, second=0, microsecond=0)
+
+        return {
+            '_id.key_type': key_type,
+            '_id.bucket': {
+                '$gte': start,
+                '$lte': self._to_date(self.end_timestamp)
             }
         }
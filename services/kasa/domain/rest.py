@@ -1,5 +1,5 @@
 import json
-from typing import Dict
+from typing import Dict, List
 
 from domain.constants import KasaRest
 from domain.exceptions import RequiredFieldException
@@ -62,6 +62,21 @@ class KasaResponse(Serializable):
                 'system').get(
                     'get_sysinfo')
 
+    @property
+    def latency(
+        self
+    ) -> float | None:
+        '''
+        Request duration in milliseconds, if the
+        request completed
+        '''
+
+        try:
+            return round(
+                self.response.elapsed.total_seconds() * 1000, 2)
+        except RuntimeError:
+            return None
+
     @property
     def result(
         self
@@ -381,6 +396,20 @@ class UpdateClientResponseRequest:
         self.state_key = data.get('state_key')
 
 
+class ClientResponseBatchResponse(Serializable):
+    def __init__(
+        self,
+        received: int,
+        upserted: int,
+        modified: int,
+        rejected: list
+    ):
+        self.received = received
+        self.upserted = upserted
+        self.modified = modified
+        self.rejected = rejected
+
+
 class SetDeviceStateRequest(Serializable):
     def __init__(
         self,
@@ -408,11 +437,91 @@ class DeviceSyncResponse(Serializable):
         self,
         destructive,
         created,
-        removed=None
+        removed=None,
+        updated=None,
+        duration=None,
+        fingerprint=None,
+        unchanged=False
     ):
         self.destructive = destructive
         self.created = created
         self.removed = removed
+        self.updated = updated
+        self.duration = duration
+        self.fingerprint = fingerprint
+        self.unchanged = unchanged
+
+
+class GetDeviceLogsRequest(Validatable, Serializable):
+    def __init__(
+        self,
+        data: Dict
+    ):
+        self.start_date = data.get('start_date')
+        self.end_date = data.get('end_date')
+        self.device_id = data.get('device_id')
+        self.preset_id = data.get('preset_id')
+        self.level = data.get('level')
+        self.limit = data.get('limit')
+        self.cursor = data.get('cursor')
+        self.validate()
+
+    def required_fields(
+        self
+    ):
+        return ['start_date']
+
+
+class DeviceLogPage(Serializable):
+    def __init__(
+        self,
+        logs: list,
+        cursor: str = None
+    ):
+        self.logs = logs
+        self.count = len(logs)
+        self.cursor = cursor
+
+
+class GetDeviceLogAnalyticsRequest(Validatable, Serializable):
+    def __init__(
+        self,
+        data: Dict
+    ):
+        self.start_date = data.get('start_date')
+        self.end_date = data.get('end_date')
+        self.bucket = data.get('bucket')
+        self.source = data.get('source')
+        self.validate()
+
+    def required_fields(
+        self
+    ):
+        return ['start_date']
+
+
+class DeviceLogAnalyticsResponse(Serializable):
+    def __init__(
+        self,
+        bucket: str,
+        source: str,
+        devices: list,
+        presets: list
+    ):
+        self.bucket = bucket
+        self.source = source
+        self.devices = devices
+        self.presets = presets
+
+
+class DeviceLogRollupResponse(Serializable):
+    def __init__(
+        self,
+        date: str,
+        duration: str
+    ):
+        self.date = date
+        self.duration = duration
 
 
 class DeleteKasaSceneResponse(Serializable):
@@ -422,3 +531,84 @@ class DeleteKasaSceneResponse(Serializable):
     ):
 
         self.modified_count = modified_count
+
+
+class GetDeviceStatesRequest(Serializable):
+    def __init__(
+        self,
+        data: Dict
+    ):
+        self.device_ids = data.get('device_ids') or list()
+        self.region_id = data.get('region_id')
+        self.max_age = data.get('max_age')
+
+    @property
+    def is_region_request(
+        self
+    ) -> bool:
+        return not none_or_whitespace(
+            self.region_id)
+
+
+class DeviceStateResult(Serializable):
+    def __init__(
+        self,
+        device_id: str,
+        device_type: str = None,
+        state: Dict = None,
+        error: str = None
+    ):
+        self.device_id = device_id
+        self.device_type = device_type
+        self.state = state
+        self.error = error
+
+
+class DeviceStateBatchResponse(Serializable):
+    def __init__(
+        self,
+        states: List[DeviceStateResult],
+        duration: str = None
+    ):
+        self.states = states
+        self.count = len(states)
+        self.errors = len([state for state in states
+                           if state.error is not None])
+        self.duration = duration
+
+    def to_dict(
+        self
+    ) -> Dict:
+        return {
+            'states': [state.to_dict() for state in self.states],
+            'count': self.count,
+            'errors': self.errors,
+            'duration': self.duration
+        }
+
+
+class DeviceStatusResponse(Serializable):
+    def __init__(
+        self,
+        devices: List[Dict],
+        fingerprint: str,
+        fetched_at: float
+    ):
+        self.devices = devices
+        self.fingerprint = fingerprint
+        self.fetched_at = fetched_at
+        self.count = len(devices)
+        self.online = len([device for device in devices
+                           if device.get('online')])
+        self.offline = self.count - self.online
+
+
+class DeviceDiscoveryResponse(Serializable):
+    def __init__(
+        self,
+        devices: List[Dict],
+        max_age: float
+    ):
+        self.devices = devices
+        self.count = len(devices)
+        self.max_age = max_age
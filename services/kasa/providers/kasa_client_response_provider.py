@@ -1,10 +1,12 @@
-from typing import Dict
+from typing import Dict, List
 
 from framework.exceptions.nulls import ArgumentNullException
 from framework.logger import get_logger
 
+from domain.exceptions import InvalidClientResponseRequestException
 from domain.kasa.client_response import KasaClientResponse
-from domain.rest import UpdateClientResponseRequest
+from domain.rest import (ClientResponseBatchResponse,
+                         UpdateClientResponseRequest)
 from services.kasa_client_response_service import KasaClientResponseService
 
 logger = get_logger(__name__)
@@ -20,7 +22,7 @@ class KasaClientResponseProvider:
     async def update_client_response(
         self,
         body: Dict
-    ) -> Dict:
+    ) -> KasaClientResponse:
 
         ArgumentNullException.if_none(body, 'body')
         request = UpdateClientResponseRequest(
@@ -33,6 +35,29 @@ class KasaClientResponseProvider:
 
         return result
 
+    async def update_client_responses(
+        self,
+        body: List[Dict]
+    ) -> ClientResponseBatchResponse:
+
+        ArgumentNullException.if_none(body, 'body')
+
+        if not isinstance(body, list):
+            raise InvalidClientResponseRequestException(
+                'Request body must be a list of client responses')
+
+        if not all(isinstance(data, dict) for data in body):
+            raise InvalidClientResponseRequestException(
+                'Each client response must be an object')
+
+        requests = [UpdateClientResponseRequest(data=data)
+                    for data in body]
+
+        logger.info(f'Update client responses: {len(requests)}')
+
+        return await self.__kasa_client_response_service.update_client_responses(
+            requests=requests)
+
     async def get_client_response(
         self,
         device_id: str
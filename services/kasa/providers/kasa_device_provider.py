@@ -1,10 +1,28 @@
-from typing import Dict
-
-from domain.rest import SetDevicePresetResponse, UpdateDeviceRequest
+import datetime
+import time
+from typing import AsyncIterator, Dict
+
+from data.constants import DeviceLogConstants
+from domain.exceptions import (InvalidDeviceLogRequestException,
+                               InvalidDeviceRequestException)
+from domain.queries import (DeviceLogCursor, GetDeviceLogAnalyticsQuery,
+                            GetDeviceLogsByTimestampRangeQuery)
+from domain.rest import (DeviceDiscoveryResponse, DeviceLogAnalyticsResponse,
+                         DeviceLogPage, DeviceLogRollupResponse,
+                         DeviceStateBatchResponse, DeviceStateResult,
+                         DeviceStatusResponse,
+                         GetDeviceLogAnalyticsRequest,
+                         GetDeviceLogsRequest, GetDeviceStatesRequest,
+                         SetDevicePresetResponse, UpdateDeviceRequest)
 from framework.concurrency import TaskCollection
 from framework.exceptions.nulls import ArgumentNullException
 from framework.logger import get_logger
+from framework.serialization.utilities import serialize
+from framework.validators.nulls import none_or_whitespace
+from services.kasa_device_log_service import KasaDeviceLogService
 from services.kasa_device_service import KasaDeviceService
+from services.kasa_device_shadow_service import KasaDeviceShadowService
+from services.kasa_discovery_service import KasaDiscoveryService
 from services.kasa_preset_service import KasaPresetSevice
 from framework.exceptions.nulls import ArgumentNullException
 
@@ -16,39 +34,171 @@ logger = get_logger(__name__)
 class KasaDeviceProvider:
     def __init__(
         self,
-        device_service: KasaDeviceService
+        device_service: KasaDeviceService,
+        device_log_service: KasaDeviceLogService,
+        shadow_service: KasaDeviceShadowService,
+        discovery_service: KasaDiscoveryService
     ):
         self._device_service = device_service
+        self._device_log_service = device_log_service
+        self._shadow_service = shadow_service
+        self._discovery_service = discovery_service
+
+        # Last status response, reused until the device
+        # list fingerprint changes
+        self._status_response: DeviceStatusResponse = None
+
+    def _get_device_logs_query(
+        self,
+        request: GetDeviceLogsRequest
+    ) -> GetDeviceLogsByTimestampRangeQuery:
+
+        logger.info(f'Start date: {request.start_date}')
+        logger.info(f'End date: {request.end_date}')
+
+        parsed_start_date = DateTimeUtil.parse(request.start_date)
+
+        # Use the current date if end date is not provided
+        parsed_end_date = (
+            DateTimeUtil.parse(request.end_date)
+            if request.end_date is not None
+            else DateTimeUtil.now()
+        )
+
+        logger.info(f'Parsed start date: {parsed_start_date}')
+        logger.info(f'Parsed end date: {parsed_end_date}')
+
+        cursor = (
+            DeviceLogCursor.decode(request.cursor)
+            if not none_or_whitespace(request.cursor)
+            else None
+        )
+
+        return GetDeviceLogsByTimestampRangeQuery(
+            start_timestamp=int(parsed_start_date.timestamp()),
+            end_timestamp=int(parsed_end_date.timestamp()),
+            device_id=request.device_id,
+            preset_id=request.preset_id,
+            level=request.level,
+            cursor=cursor)
+
+    def _get_page_size(
+        self,
+        limit: str
+    ) -> int:
+        if none_or_whitespace(limit):
+            return DeviceLogConstants.DefaultPageSize
+
+        if not limit.isdigit() or int(limit) <= 0:
+            raise InvalidDeviceLogRequestException(
+                f"Limit '{limit}' must be a positive integer")
+
+        return min(int(limit), DeviceLogConstants.MaxPageSize)
 
     async def get_device_logs(
         self,
-        start_date: str,
-        end_date: str
-    ):
+        args: Dict
+    ) -> DeviceLogPage:
         '''
         Handle get device logs request
         '''
 
-        ArgumentNullException.if_none_or_whitespace(start_date, 'start_date')
+        ArgumentNullException.if_none(args, 'args')
 
-        logger.info(f'Start date: {start_date}')
-        logger.info(f'End date: {end_date}')
+        request = GetDeviceLogsRequest(
+            data=args)
 
-        parsed_start_date = DateTimeUtil.parse(start_date)
+        query = self._get_device_logs_query(
+            request=request)
 
-        # Use the current date if end date is not provided
+        return await self._device_log_service.get_device_logs(
+            query=query,
+            limit=self._get_page_size(request.limit))
+
+    async def stream_device_logs(
+        self,
+        args: Dict
+    ) -> AsyncIterator[str]:
+        '''
+        Handle stream device logs request, returns
+        the logs as newline delimited JSON
+        '''
+
+        ArgumentNullException.if_none(args, 'args')
+
+        # Validate the request before the response
+        # starts streaming
+        query = self._get_device_logs_query(
+            request=GetDeviceLogsRequest(
+                data=args))
+
+        async def get_lines():
+            async for log in self._device_log_service.stream_device_logs(
+                    query=query):
+                yield f'{serialize(log.to_dict())}\n'
+
+        return get_lines()
+
+    async def get_device_log_analytics(
+        self,
+        args: Dict
+    ) -> DeviceLogAnalyticsResponse:
+        '''
+        Handle get device log analytics request
+        '''
+
+        ArgumentNullException.if_none(args, 'args')
+
+        request = GetDeviceLogAnalyticsRequest(
+            data=args)
+
+        use_rollups = request.source == 'rollup'
+
+        # Rollups are only available by day
+        bucket = (
+            'day' if use_rollups
+            else request.bucket or DeviceLogConstants.DefaultAnalyticsBucket
+        )
+
+        if bucket not in DeviceLogConstants.AnalyticsBuckets:
+            raise InvalidDeviceLogRequestException(
+                f"Bucket '{bucket}' is not valid")
+
+        parsed_start_date = DateTimeUtil.parse(request.start_date)
         parsed_end_date = (
-            DateTimeUtil.parse(end_date)
-            if end_date is not None
+            DateTimeUtil.parse(request.end_date)
+            if request.end_date is not None
             else DateTimeUtil.now()
         )
 
-        logger.info(f'Parsed start date: {parsed_start_date}')
-        logger.info(f'Parsed end date: {parsed_end_date}')
-
-        return await self._device_service.get_device_logs(
+        query = GetDeviceLogAnalyticsQuery(
             start_timestamp=int(parsed_start_date.timestamp()),
-            end_timestamp=int(parsed_end_date.timestamp()))
+            end_timestamp=int(parsed_end_date.timestamp()),
+            bucket=bucket)
+
+        return await self._device_log_service.get_device_log_analytics(
+            query=query,
+            use_rollups=use_rollups)
+
+    async def rollup_device_logs(
+        self,
+        date: str
+    ) -> DeviceLogRollupResponse:
+        '''
+        Handle device log rollup request, defaults
+        to the previous day
+        '''
+
+        parsed_date = (
+            DateTimeUtil.parse(date).replace(tzinfo=datetime.UTC)
+            if not none_or_whitespace(date)
+            else DateTimeUtil.now() - datetime.timedelta(days=1)
+        )
+
+        logger.info(f'Rollup date: {parsed_date}')
+
+        return await self._device_log_service.rollup_device_logs(
+            date=parsed_date)
 
     async def get_all_devices(
         self
@@ -98,12 +248,64 @@ class KasaDeviceProvider:
 
     async def sync_devices(
         self,
-        destructive: str
+        destructive: str,
+        force: str = None
     ):
         is_destructive = destructive == 'true'
 
         return await self._device_service.sync_devices(
-            destructive=is_destructive)
+            destructive=is_destructive,
+            force=force == 'true')
+
+    async def get_device_statuses(
+        self,
+        refresh: str = None
+    ) -> dict:
+        '''
+        Handle get device status request, the response is
+        only rebuilt when the device list changes
+        '''
+
+        device_list = await self._device_service.get_device_statuses(
+            refresh=refresh == 'true')
+
+        if (self._status_response is None
+                or self._status_response.fingerprint != device_list.fingerprint):
+            statuses = device_list.get_statuses()
+
+            self._status_response = DeviceStatusResponse(
+                devices=[{
+                    'device_id': device.device_id,
+                    'device_name': device.device_name,
+                    'device_type': device.device_type,
+                    'online': statuses.get(device.device_id)
+                } for device in device_list.to_devices()],
+                fingerprint=device_list.fingerprint,
+                fetched_at=device_list.fetched_at)
+
+        return self._status_response.to_dict() | {
+            'fetched_at': device_list.fetched_at
+        }
+
+    async def get_discovered_devices(
+        self,
+        refresh: str = None
+    ) -> dict:
+        '''
+        Handle get discovered devices request, devices that
+        answered the LAN discovery probe
+        '''
+
+        devices = await self._discovery_service.get_devices(
+            refresh=refresh == 'true')
+
+        response = DeviceDiscoveryResponse(
+            devices=[device.to_dict() | {
+                'age_seconds': round(device.get_age(), 3)
+            } for device in devices],
+            max_age=self._discovery_service.get_metrics().get('evict_after_seconds'))
+
+        return response.to_dict()
 
     async def get_device_client_response(
         self,
@@ -116,14 +318,132 @@ class KasaDeviceProvider:
 
     async def get_device_state(
         self,
-        device_id
+        device_id: str,
+        max_age: str = None
     ):
+        '''
+        Handle get device state request, served from the
+        device shadow within the staleness bound
+        '''
+
         ArgumentNullException.if_none_or_whitespace(device_id, 'device_id')
 
-        device = await self._device_service.get_device_state(
-            device_id=device_id)
+        shadow = await self._device_service.get_device_state(
+            device_id=device_id,
+            max_age=self._get_max_age(max_age))
+
+        return shadow.reported
 
-        return device.device_object
+    async def get_device_shadow(
+        self,
+        device_id: str,
+        max_age: str = None
+    ):
+        '''
+        Handle get device shadow request, the shadow is
+        returned with its freshness
+        '''
+
+        ArgumentNullException.if_none_or_whitespace(device_id, 'device_id')
+
+        max_age = self._get_max_age(max_age)
+
+        shadow = await self._device_service.get_device_state(
+            device_id=device_id,
+            max_age=max_age)
+
+        return shadow.to_dict() | {
+            'freshness': shadow.get_freshness(
+                max_age=(max_age if max_age is not None
+                         else self._shadow_service.max_age))
+        }
+
+    async def get_device_states(
+        self,
+        body: dict
+    ):
+        '''
+        Handle batch get device state request for a list
+        of devices or every device in a region
+        '''
+
+        ArgumentNullException.if_none(body, 'body')
+
+        request = GetDeviceStatesRequest(
+            data=body)
+
+        if request.is_region_request:
+            device_ids = await self._device_service.get_device_ids_by_region(
+                region_id=request.region_id)
+        else:
+            device_ids = request.device_ids
+
+        if not isinstance(device_ids, list) or not any(device_ids):
+            raise InvalidDeviceRequestException(
+                'A list of device IDs or a region ID is required')
+
+        started = time.perf_counter()
+
+        results = await self._device_service.get_device_states(
+            device_ids=device_ids,
+            max_age=self._get_max_age(
+                str(request.max_age) if request.max_age is not None else None))
+
+        states = [self._get_state_result(
+            device_id=device_id,
+            result=result)
+            for device_id, result in results.items()]
+
+        response = DeviceStateBatchResponse(
+            states=states,
+            duration=f'{round(time.perf_counter() - started, 3)}s')
+
+        return response.to_dict()
+
+    def _get_state_result(
+        self,
+        device_id: str,
+        result
+    ) -> DeviceStateResult:
+        if isinstance(result, Exception):
+            return DeviceStateResult(
+                device_id=device_id,
+                error=str(result))
+
+        reported = result.reported or dict()
+        device_type = reported.get('deviceType') or reported.get('mic_type')
+
+        try:
+            state = result.get_reported_device()
+        except Exception as ex:
+            return DeviceStateResult(
+                device_id=device_id,
+                device_type=device_type,
+                error=f'Failed to parse device state: {str(ex)}')
+
+        if state is None:
+            return DeviceStateResult(
+                device_id=device_id,
+                device_type=device_type,
+                error=f"'{device_type}' is not a supported device type")
+
+        return DeviceStateResult(
+            device_id=device_id,
+            device_type=device_type,
+            state=state.to_dict())
+
+    def _get_max_age(
+        self,
+        max_age: str
+    ) -> float | None:
+        if none_or_whitespace(max_age):
+            return None
+
+        try:
+            return max(float(max_age), 0)
+        except ValueError:
+            raise InvalidDeviceRequestException(
+                f"Invalid max age '{max_age}'")
 
     async def set_device_preset(
         self,
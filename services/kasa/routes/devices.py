@@ -1,16 +1,16 @@
-import time
 from framework.logger.providers import get_logger
-from framework.rest.blueprints.meta import MetaBlueprint
-from quart import request
+from quart import Response, request
 
 from domain.kasa.auth import AuthPolicy
 from providers.kasa_device_provider import KasaDeviceProvider
+from utils.meta import MetaBlueprint
+from utils.serialization import json_response
 
 logger = get_logger(__name__)
 devices_bp = MetaBlueprint('devices_bp', __name__)
 
 
-@devices_bp.configure('/api/device', methods=['GET'], auth_scheme=AuthPolicy.Read)
+@devices_bp.json('/api/device', methods=['GET'], auth_scheme=AuthPolicy.Read)
 async def get_devices(container):
     kasa_device_provider: KasaDeviceProvider = container.resolve(
         KasaDeviceProvider)
@@ -44,7 +44,29 @@ async def get_device_state(container, device_id):
         KasaDeviceProvider)
 
     return await kasa_device_provider.get_device_state(
-        device_id=device_id)
+        device_id=device_id,
+        max_age=request.args.get('max_age'))
+
+
+@devices_bp.json('/api/device/state/batch', methods=['POST'], auth_scheme=AuthPolicy.Read)
+async def get_device_states(container):
+    kasa_device_provider: KasaDeviceProvider = container.resolve(
+        KasaDeviceProvider)
+
+    body = await request.get_json()
+
+    return await kasa_device_provider.get_device_states(
+        body=body)
+
+
+@devices_bp.configure('/api/device/<device_id>/shadow', methods=['GET'], auth_scheme=AuthPolicy.Read)
+async def get_device_shadow(container, device_id):
+    kasa_device_provider: KasaDeviceProvider = container.resolve(
+        KasaDeviceProvider)
+
+    return await kasa_device_provider.get_device_shadow(
+        device_id=device_id,
+        max_age=request.args.get('max_age'))
 
 
 @devices_bp.configure('/api/device/sync', methods=['POST'], auth_scheme=AuthPolicy.Write)
@@ -55,7 +77,42 @@ async def sync_devices(container):
     destructive = request.args.get('destructive')
 
     return await kasa_device_provider.sync_devices(
-        destructive=destructive)
+        destructive=destructive,
+        force=request.args.get('force'))
+
+
+@devices_bp.json('/api/device/status', methods=['GET'], auth_scheme=AuthPolicy.Read)
+async def get_device_statuses(container):
+    kasa_device_provider: KasaDeviceProvider = container.resolve(
+        KasaDeviceProvider)
+
+    result = await kasa_device_provider.get_device_statuses(
+        refresh=request.args.get('refresh'))
+
+    # The device list fingerprint doubles as the ETag so
+    # pollers can skip unchanged responses
+    etag = f'"{result.get("fingerprint")}"'
+
+    if request.headers.get('If-None-Match') == etag:
+        return Response(
+            status=304,
+            headers={'ETag': etag})
+
+    response = json_response(
+        value=result,
+        headers=request.headers)
+    response.headers['ETag'] = etag
+
+    return response
+
+
+@devices_bp.configure('/api/device/discovery', methods=['GET'], auth_scheme=AuthPolicy.Read)
+async def get_discovered_devices(container):
+    kasa_device_provider: KasaDeviceProvider = container.resolve(
+        KasaDeviceProvider)
+
+    return await kasa_device_provider.get_discovered_devices(
+        refresh=request.args.get('refresh'))
 
 
 @devices_bp.configure('/api/device/<device_id>/preset/<preset_id>', methods=['POST'], auth_scheme=AuthPolicy.Write)
@@ -87,14 +144,45 @@ async def get_device_client_response(container, device_id: str):
         device_id=device_id)
 
 
-@devices_bp.configure('/api/device/logs', methods=['GET'], auth_scheme=AuthPolicy.Read)
+@devices_bp.json('/api/device/logs', methods=['GET'], auth_scheme=AuthPolicy.Read)
 async def get_device_logs(container):
     kasa_device_provider: KasaDeviceProvider = container.resolve(
         KasaDeviceProvider)
 
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-
     return await kasa_device_provider.get_device_logs(
-        start_date=start_date,
-        end_date=end_date)
+        args=request.args)
+
+
+@devices_bp.stream('/api/device/logs/stream', methods=['GET'], auth_scheme=AuthPolicy.Read)
+async def stream_device_logs(container):
+    kasa_device_provider: KasaDeviceProvider = container.resolve(
+        KasaDeviceProvider)
+
+    lines = await kasa_device_provider.stream_device_logs(
+        args=request.args)
+
+    return Response(
+        lines,
+        mimetype='application/x-ndjson')
+
+
+@devices_bp.configure('/api/device/logs/analytics', methods=['GET'], auth_scheme=AuthPolicy.Read)
+async def get_device_log_analytics(container):
+    kasa_device_provider: KasaDeviceProvider = container.resolve(
+        KasaDeviceProvider)
+
+    return await kasa_device_provider.get_device_log_analytics(
+        args=request.args)
+
+
+# Not scheduled by the service, run daily from a job
+# for rollup analytics to stay current
+@devices_bp.configure('/api/device/logs/rollup', methods=['POST'], auth_scheme=AuthPolicy.Write)
+async def rollup_device_logs(container):
+    kasa_device_provider: KasaDeviceProvider = container.resolve(
+        KasaDeviceProvider)
+
+    date = request.args.get('date')
+
+    return await kasa_device_provider.rollup_device_logs(
+        date=date)
@@ -0,0 +1,16 @@
+from framework.logger.providers import get_logger
+
+from domain.kasa.auth import AuthPolicy
+from services.kasa_diagnostics_service import KasaDiagnosticsService
+from utils.meta import MetaBlueprint
+
+logger = get_logger(__name__)
+diagnostics_bp = MetaBlueprint('diagnostics_bp', __name__)
+
+
+@diagnostics_bp.configure('/api/diagnostics', methods=['GET'], auth_scheme=AuthPolicy.Read)
+async def get_diagnostics(container):
+    diagnostics_service: KasaDiagnosticsService = container.resolve(
+        KasaDiagnosticsService)
+
+    return await diagnostics_service.get_diagnostics()
@@ -1,8 +1,8 @@
-from framework.rest.blueprints.meta import MetaBlueprint
 from quart import request
 
 from domain.kasa.auth import AuthPolicy
 from providers.kasa_client_response_provider import KasaClientResponseProvider
+from utils.meta import MetaBlueprint
 
 events_bp = MetaBlueprint('events_bp', __name__)
 
@@ -16,3 +16,14 @@ async def post_event_device_response(container):
 
     return await provider.update_client_response(
         body=body)
+
+
+@events_bp.configure('/api/event/device/response/batch', methods=['POST'], auth_scheme=AuthPolicy.Execute)
+async def post_event_device_responses(container):
+    provider: KasaClientResponseProvider = container.resolve(
+        KasaClientResponseProvider)
+
+    body = await request.get_json()
+
+    return await provider.update_client_responses(
+        body=body)
@@ -1,11 +1,11 @@
 from framework.logger.providers import get_logger
-from framework.rest.blueprints.meta import MetaBlueprint
 from quart import request
 
 from domain.kasa.auth import AuthPolicy
 from services.kasa_preset_service import (CreatePresetRequest,
                                           KasaPresetSevice,
                                           UpdatePresetRequest)
+from utils.meta import MetaBlueprint
 
 logger = get_logger(__name__)
 
@@ -30,7 +30,7 @@ async def delete_preset(container, preset_id):
         preset_id=preset_id)
 
 
-@preset_bp.configure('/api/preset', methods=['GET'],  auth_scheme=AuthPolicy.Read)
+@preset_bp.json('/api/preset', methods=['GET'],  auth_scheme=AuthPolicy.Read)
 async def get_all(container):
     kasa_preset_service: KasaPresetSevice = container.resolve(
         KasaPresetSevice)
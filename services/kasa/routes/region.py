@@ -1,9 +1,9 @@
 from framework.logger.providers import get_logger
-from framework.rest.blueprints.meta import MetaBlueprint
 from quart import request
 
 from domain.rest import CreateRegionRequest
 from services.kasa_region_service import KasaRegionService
+from utils.meta import MetaBlueprint
 
 logger = get_logger(__name__)
 region_bp = MetaBlueprint('region_bp', __name__)
@@ -29,7 +29,7 @@ async def delete_scene(container, id: str):
         scene_id=id)
 
 
-@scene_bp.configure('/api/scene', methods=['GET'], auth_scheme=AuthPolicy.Read)
+@scene_bp.json('/api/scene', methods=['GET'], auth_scheme=AuthPolicy.Read)
 async def get_scenes(container):
     kasa_scene_service: KasaSceneService = container.resolve(
         KasaSceneService)
@@ -0,0 +1,131 @@
+import hashlib
+
+import jwt
+from framework.auth.configuration import AzureAdConfiguration
+from framework.configuration import Configuration
+from framework.logger.providers import get_logger
+from framework.validators.nulls import none_or_whitespace
+
+from clients.jwks_client import JwksClient
+from domain.exceptions import ForbiddenException, UnauthorizedException
+from domain.kasa.auth import is_authorized
+from utils.cache import BoundedTtlCache
+from utils.helpers import get_config_section
+
+logger = get_logger(__name__)
+
+
+class KasaAuthService:
+    def __init__(
+        self,
+        configuration: Configuration,
+        jwks_client: JwksClient
+    ):
+        self._jwks_client = jwks_client
+
+        ad_auth: AzureAdConfiguration = configuration.ad_auth
+        self._audiences = ad_auth.audiences
+        self._issuer = ad_auth.issuer
+
+        settings = get_config_section(
+            configuration, 'auth')
+
+        self._algorithms = settings.get(
+            'algorithms', ['RS256'])
+
+        # Verified claims keyed on the token hash, each
+        # entry expires with the token
+        self._claims_cache = BoundedTtlCache(
+            name='validated-tokens',
+            max_size=settings.get('token_cache_size', 1024))
+
+    async def authorize(
+        self,
+        token: str,
+        policy: str
+    ) -> dict:
+        '''
+        Verify a bearer token and evaluate the policy,
+        returns the token claims
+        '''
+
+        if none_or_whitespace(token):
+            raise UnauthorizedException('No bearer token provided')
+
+        claims = await self.get_claims(
+            token=token)
+
+        if not is_authorized(
+                claims=claims,
+                policy=policy):
+            raise ForbiddenException(policy)
+
+        return claims
+
+    async def get_claims(
+        self,
+        token: str
+    ) -> dict:
+        '''
+        Get the verified claims for a token, the
+        signature is only verified on a cache miss
+        '''
+
+        token_hash = hashlib.sha256(
+            token.encode()).hexdigest()
+
+        claims = self._claims_cache.get(token_hash)
+        if claims is not None:
+            return claims
+
+        claims = await self._verify_token(
+            token=token)
+
+        self._claims_cache.set(
+            key=token_hash,
+            value=claims,
+            expires_at=claims.get('exp'))
+
+        return claims
+
+    def start(
+        self
+    ) -> None:
+        self._jwks_client.start()
+
+    async def stop(
+        self
+    ) -> None:
+        await self._jwks_client.stop()
+
+    def get_metrics(
+        self
+    ) -> dict:
+        return {
+            'tokens': self._claims_cache.get_metrics(),
+            'jwks': self._jwks_client.get_metrics()
+        }
+
+    async def _verify_token(
+        self,
+        token: str
+    ) -> dict:
+        logger.info('Verifying bearer token')
+
+        try:
+            header = jwt.get_unverified_header(token)
+
+            signing_key = await self._jwks_client.get_signing_key(
+                kid=header.get('kid'))
+
+            return jwt.decode(
+                token,
+                key=signing_key.key,
+                algorithms=self._algorithms,
+                audience=self._audiences,
+                issuer=self._issuer,
+                options={'require': ['exp']})
+
+        except Exception as ex:
+            logger.info(f'Token verification failed: {str(ex)}')
+            raise UnauthorizedException(str(ex))
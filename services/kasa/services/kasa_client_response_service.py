@@ -1,11 +1,16 @@
-from typing import Dict
+from typing import Dict, List
 
 from data.repositories.kasa_client_response_repository import \
     KasaClientResponseRepository
 from domain.exceptions import NullArgumentException
 from domain.kasa.client_response import KasaClientResponse
-from domain.rest import UpdateClientResponseRequest
+from domain.rest import (ClientResponseBatchResponse,
+                         UpdateClientResponseRequest)
+from framework.configuration import Configuration
 from framework.logger import get_logger
+from framework.validators.nulls import none_or_whitespace
+from utils.concurrency import BatchProcessor
+from utils.helpers import get_config_section
 
 logger = get_logger(__name__)
 
@@ -13,17 +18,31 @@ logger = get_logger(__name__)
 class KasaClientResponseService:
     def __init__(
         self,
+        configuration: Configuration,
         client_response_repository: KasaClientResponseRepository
     ):
         self._client_response_repository = client_response_repository
 
+        settings = get_config_section(
+            configuration, 'client_responses')
+
+        # Local writer for client responses handed over
+        # in-process rather than through the event queue
+        self._buffer = BatchProcessor(
+            name='client-response-writer',
+            handler=self.update_client_responses,
+            max_batch_size=settings.get('batch_size', 100),
+            max_queue_size=settings.get('max_queue_size', 5000),
+            flush_interval=settings.get('flush_interval_seconds', 1))
+
     async def update_client_response(
         self,
         request: UpdateClientResponseRequest
-    ) -> Dict:
+    ) -> KasaClientResponse:
         '''
         Update client response record for a given
-        device
+        device, the record is created if it doesn't
+        exist
         '''
 
         NullArgumentException.if_none_or_whitespace(
@@ -33,30 +52,94 @@ class KasaClientResponseService:
 
         logger.info(f'Update client response for device: {request.device_id}')
 
-        entity = await self._client_response_repository.get({
-            'device_id': request.device_id
-        })
+        # Single atomic round trip, no read before the write
+        entity = await self._client_response_repository.upsert_client_response(
+            device_id=request.device_id,
+            update=KasaClientResponse.get_upsert(
+                request=request))
 
-        if entity is None:
-            return await self.create_client_response(
-                device_id=request.device_id,
-                preset_id=request.preset_id,
-                client_response=request.client_response,
-                state_key=request.state_key)
+        return KasaClientResponse.from_entity(
+            data=entity)
+
+    async def update_client_responses(
+        self,
+        requests: List[UpdateClientResponseRequest]
+    ) -> ClientResponseBatchResponse:
+        '''
+        Update client response records for many devices
+        in a single bulk write
+        '''
 
-        model = KasaClientResponse.from_entity(data=entity)
+        NullArgumentException.if_none(requests, 'requests')
 
-        # Update the client response
-        model.update_client_response(
-            request=request)
+        logger.info(f'Update client responses: {len(requests)}')
 
-        # Update the record
-        result = await self._client_response_repository.update(
-            model.get_selector(),
-            model.to_dict())
+        # Keyed by device so only the last response for
+        # a device in the batch is applied
+        updates = dict()
+        rejected = list()
+
+        for request in requests:
+            if (none_or_whitespace(request.device_id)
+                    or request.client_response is None):
+                rejected.append(request.device_id)
+                continue
+
+            updates[request.device_id] = KasaClientResponse.get_upsert(
+                request=request)
+
+        if any(rejected):
+            logger.info(f'Rejected client responses: {rejected}')
+
+        result = await self._client_response_repository.upsert_client_responses(
+            updates=updates)
+
+        return ClientResponseBatchResponse(
+            received=len(requests),
+            upserted=result.upserted_count if result is not None else 0,
+            modified=result.modified_count if result is not None else 0,
+            rejected=rejected)
+
+    def queue_client_response(
+        self,
+        request: UpdateClientResponseRequest
+    ) -> bool:
+        '''
+        Queue a client response for the local batch
+        writer
+        '''
+
+        NullArgumentException.if_none(request, 'request')
+
+        logger.info(f'Queue client response for device: {request.device_id}')
+
+        return self._buffer.enqueue(
+            item=request)
+
+    async def initialize(
+        self
+    ) -> None:
+        try:
+            await self._client_response_repository.ensure_indexes()
+        except Exception as ex:
+            logger.exception(
+                f'Failed to create client response indexes: {str(ex)}')
+
+        self._buffer.start()
+
+    async def stop(
+        self
+    ) -> None:
+        '''
+        Write any queued client responses on shutdown
+        '''
+
+        await self._buffer.stop()
 
-        logger.info(f'Updated records: {result.acknowledged}')
-        return model
+    def get_metrics(
+        self
+    ) -> dict:
+        return self._buffer.get_metrics()
 
     async def create_client_response(
         self,
@@ -101,3 +184,19 @@ class KasaClientResponseService:
 
         return KasaClientResponse.from_entity(
             data=entity)
+
+    async def get_client_responses(
+        self,
+        device_ids: List[str]
+    ) -> List[KasaClientResponse]:
+        '''
+        Get the client responses for a list of devices
+        '''
+
+        NullArgumentException.if_none(device_ids, 'device_ids')
+
+        entities = await self._client_response_repository.get_client_responses(
+            device_ids=device_ids)
+
+        return [KasaClientResponse.from_entity(data=entity)
+                for entity in entities]
@@ -0,0 +1,246 @@
+import datetime
+import time
+from typing import AsyncIterator, List
+
+from data.constants import DeviceLogConstants
+from data.repositories.kasa_device_repository import (
+    KasaDeviceLogRepository, KasaDeviceLogRollupRepository)
+from domain.kasa.device import DeviceLog, DeviceLogAnalyticsRow
+from domain.queries import (DeviceLogAnalyticsKey, DeviceLogCursor,
+                            GetDeviceLogAnalyticsQuery,
+                            GetDeviceLogsByTimestampRangeQuery)
+from domain.rest import (DeviceLogAnalyticsResponse, DeviceLogPage,
+                         DeviceLogRollupResponse)
+from framework.concurrency import TaskCollection
+from framework.configuration import Configuration
+from framework.exceptions.nulls import ArgumentNullException
+from framework.logger.providers import get_logger
+from utils.concurrency import BatchProcessor
+from utils.helpers import get_config_section
+
+logger = get_logger(__name__)
+
+
+class KasaDeviceLogService:
+    def __init__(
+        self,
+        configuration: Configuration,
+        device_log_repository: KasaDeviceLogRepository,
+        device_log_rollup_repository: KasaDeviceLogRollupRepository
+    ):
+        self._device_log_repository = device_log_repository
+        self._device_log_rollup_repository = device_log_rollup_repository
+
+        settings = get_config_section(
+            configuration, 'device_logs')
+
+        self._retention_days = settings.get(
+            'retention_days', DeviceLogConstants.DefaultRetentionDays)
+
+        # Buffer device logs and write them behind the
+        # device state requests in batches
+        self._buffer = BatchProcessor(
+            name='device-log-buffer',
+            handler=self._write_logs,
+            max_batch_size=settings.get('batch_size', 100),
+            max_queue_size=settings.get('max_queue_size', 5000),
+            flush_interval=settings.get('flush_interval_seconds', 5),
+            block_timeout=settings.get('block_timeout_seconds', 0))
+
+    async def capture_device_log(
+        self,
+        log: DeviceLog
+    ) -> bool:
+        '''
+        Buffer a device log to be written in the
+        next batch
+        '''
+
+        ArgumentNullException.if_none(log, 'log')
+
+        return await self._buffer.put(
+            item=log.to_entity())
+
+    async def get_device_logs(
+        self,
+        query: GetDeviceLogsByTimestampRangeQuery,
+        limit: int = DeviceLogConstants.DefaultPageSize
+    ) -> DeviceLogPage:
+        '''
+        Get a page of device logs, the page cursor is
+        set when more logs may follow
+        '''
+
+        ArgumentNullException.if_none(query, 'query')
+
+        logger.info(f'Get device logs: {query.get_query()}: {limit}')
+
+        entities = await self._device_log_repository.get_device_logs(
+            query=query,
+            limit=limit)
+
+        logs = [DeviceLog.from_entity(data=entity)
+                for entity in entities]
+
+        logger.info(f'Fetched {len(logs)} logs')
+
+        # A full page means there may be more logs to fetch
+        cursor = None
+        if len(logs) == limit:
+            last = logs[-1]
+            cursor = DeviceLogCursor(
+                timestamp=last.timestamp,
+                log_id=last.log_id).encode()
+
+        return DeviceLogPage(
+            logs=logs,
+            cursor=cursor)
+
+    async def stream_device_logs(
+        self,
+        query: GetDeviceLogsByTimestampRangeQuery
+    ) -> AsyncIterator[DeviceLog]:
+        '''
+        Stream device logs without loading the
+        range into memory
+        '''
+
+        ArgumentNullException.if_none(query, 'query')
+
+        logger.info(f'Stream device logs: {query.get_query()}')
+
+        async for entity in self._device_log_repository.stream_device_logs(
+                query=query,
+                batch_size=DeviceLogConstants.StreamBatchSize):
+            yield DeviceLog.from_entity(data=entity)
+
+    async def get_device_log_analytics(
+        self,
+        query: GetDeviceLogAnalyticsQuery,
+        use_rollups: bool = False
+    ) -> DeviceLogAnalyticsResponse:
+        '''
+        Get command counts, error rates and latency
+        percentiles per device and preset, from the
+        daily rollups if `use_rollups` is set, days that
+        haven't been rolled up are missing from those
+        '''
+
+        ArgumentNullException.if_none(query, 'query')
+
+        logger.info(
+            f'Get device log analytics: {query.get_query()}: {query.bucket}: rollups: {use_rollups}')
+
+        if use_rollups:
+            devices, presets = await TaskCollection(
+                self._device_log_rollup_repository.get_rollups(
+                    query=query,
+                    key_type=DeviceLogAnalyticsKey.Device),
+                self._device_log_rollup_repository.get_rollups(
+                    query=query,
+                    key_type=DeviceLogAnalyticsKey.Preset)).run()
+        else:
+            result = await self._device_log_repository.get_device_log_analytics(
+                query=query)
+
+            devices = result.get('devices', list())
+            presets = result.get('presets', list())
+
+        return DeviceLogAnalyticsResponse(
+            bucket=query.bucket,
+            source='rollup' if use_rollups else 'raw',
+            devices=[DeviceLogAnalyticsRow.from_entity(data=entity)
+                     for entity in devices],
+            presets=[DeviceLogAnalyticsRow.from_entity(data=entity)
+                     for entity in presets])
+
+    async def rollup_device_logs(
+        self,
+        date: datetime.datetime
+    ) -> DeviceLogRollupResponse:
+        '''
+        Pre-compute the daily device and preset log
+        rollups for the day of `date`
+
+        Rollups aren't scheduled by the service, callers
+        must trigger them for each day, e.g. a daily job
+        calling `POST /api/device/logs/rollup`
+        '''
+
+        ArgumentNullException.if_none(date, 'date')
+
+        start = date.replace(
+            hour=0, minute=0, second=0, microsecond=0)
+        end = start + datetime.timedelta(days=1)
+
+        logger.info(f'Rollup device logs: {start} -> {end}')
+
+        started = time.perf_counter()
+
+        query = GetDeviceLogAnalyticsQuery(
+            start_timestamp=int(start.timestamp()),
+            end_timestamp=int(end.timestamp()) - 1,
+            bucket='day')
+
+        await TaskCollection(
+            self._device_log_repository.rollup_device_logs(
+                query=query,
+                key_type=DeviceLogAnalyticsKey.Device),
+            self._device_log_repository.rollup_device_logs(
+                query=query,
+                key_type=DeviceLogAnalyticsKey.Preset)).run()
+
+        duration = time.perf_counter() - started
+        logger.info(f'Rollup completed in {duration}s')
+
+        return DeviceLogRollupResponse(
+            date=start.date().isoformat(),
+            duration=f'{round(duration, 3)}s')
+
+    async def initialize(
+        self
+    ) -> None:
+        '''
+        Provision log storage and start the log
+        buffer
+        '''
+
+        # Retention of zero or less disables the TTL
+        expire_after_seconds = (
+            int(self._retention_days * 24 * 60 * 60)
+            if self._retention_days and self._retention_days > 0
+            else None)
+
+        try:
+            await self._device_log_repository.ensure_time_series(
+                expire_after_seconds=expire_after_seconds)
+            await self._device_log_repository.ensure_indexes()
+        except Exception as ex:
+            logger.exception(f'Failed to provision device log storage: {str(ex)}')
+
+        self._buffer.start()
+
+    async def stop(
+        self
+    ) -> None:
+        '''
+        Flush any buffered logs on shutdown
+        '''
+
+        await self._buffer.stop()
+
+    def get_metrics(
+        self
+    ) -> dict:
+        return self._buffer.get_metrics()
+
+    async def _write_logs(
+        self,
+        documents: List[dict]
+    ) -> None:
+        logger.info(f'Writing batch of {len(documents)} device logs')
+
+        result = await self._device_log_repository.insert_logs(
+            documents=documents)
+
+        logger.info(f'Inserted logs: {len(result.inserted_ids)}')
@@ -1,28 +1,35 @@
 import asyncio
+import time
 import uuid
-from typing import List, Literal, Tuple
+from typing import Dict, List, Literal, Tuple
 
 from clients.kasa_client import KasaClient
-from data.repositories.kasa_device_repository import (KasaDeviceLogRepository,
-                                                      KasaDeviceRepository)
+from data.repositories.kasa_device_repository import KasaDeviceRepository
 from domain.cache import CacheExpiration, CacheKey
+from domain.constants import ClientResponseMode, DeviceShadowSource
 from domain.exceptions import (ClientResponseNotFoundException,
                                DeviceNotFoundException,
                                InvalidDeviceRequestException,
+                               KasaDeviceStateException,
                                RegionNotFoundException)
 from domain.kasa.client_response import KasaClientResponse
 from domain.kasa.device import DeviceLog, KasaDevice
+from domain.kasa.device_list import KasaDeviceList
 from domain.kasa.preset import KasaPreset
+from domain.kasa.shadow import DeviceShadow
 from domain.rest import (DeviceSyncResponse, KasaRequest, KasaResponse,
-                         UpdateDeviceRequest)
+                         UpdateClientResponseRequest, UpdateDeviceRequest)
 from framework.clients.cache_client import CacheClientAsync
 from framework.concurrency import TaskCollection
+from framework.configuration import Configuration
 from framework.exceptions.nulls import ArgumentNullException
 from framework.logger.providers import get_logger
 from framework.serialization import Serializable
 from framework.serialization.utilities import serialize
 from framework.validators.nulls import none_or_whitespace
 from services.kasa_client_response_service import KasaClientResponseService
+from services.kasa_device_log_service import KasaDeviceLogService
+from services.kasa_device_shadow_service import KasaDeviceShadowService
 from services.kasa_event_service import KasaEventService
 from services.kasa_region_service import KasaRegionService
 from utils.helpers import DateTimeUtil, fire_task
@@ -33,42 +40,31 @@ logger = get_logger(__name__)
 class KasaDeviceService:
     def __init__(
         self,
+        configuration: Configuration,
         kasa_client: KasaClient,
         device_repository: KasaDeviceRepository,
-        device_log_repository: KasaDeviceLogRepository,
         region_service: KasaRegionService,
         cache_client: CacheClientAsync,
         client_response_service: KasaClientResponseService,
-        event_service: KasaEventService
+        event_service: KasaEventService,
+        device_log_service: KasaDeviceLogService,
+        shadow_service: KasaDeviceShadowService
     ):
         self._kasa_client = kasa_client
         self._device_repository = device_repository
-        self._device_log_repository = device_log_repository
         self._region_service = region_service
         self._cache_client = cache_client
         self._client_response_service = client_response_service
         self._event_service = event_service
+        self._device_log_service = device_log_service
+        self._shadow_service = shadow_service
 
-    async def get_device_logs(
-        self,
-        start_timestamp: int,
-        end_timestamp: int
-    ):
-        ArgumentNullException.if_none(start_timestamp, 'start_timestamp')
-        ArgumentNullException.if_none(end_timestamp, 'end_timestamp')
-
-        logger.info(f'Get device logs: {start_timestamp} -> {end_timestamp}')
-
-        entities = await self._device_log_repository.get_device_logs_by_timestamp_range(
-            start_timestamp=int(start_timestamp),
-            end_timestamp=int(end_timestamp))
+        self._client_response_mode = configuration.events.get(
+            'client_response_mode', ClientResponseMode.Event)
 
-        logs = [DeviceLog.from_entity(data=entity)
-                for entity in entities]
-
-        logger.info(f'Fetched {len(logs)} logs')
-
-        return logs
+        # Fingerprint of the last device list applied to
+        # the device shadows
+        self._status_fingerprint = None
 
     async def capture_device_log(
         self,
@@ -76,10 +72,12 @@ class KasaDeviceService:
         preset: KasaPreset,
         state_key: str,
         message: str,
-        level: Literal['INFO', 'ERROR'] = 'INFO'
+        level: Literal['INFO', 'ERROR'] = 'INFO',
+        latency: float = None
     ):
         '''
-        Capture a device log
+        Capture a device log, logs are buffered and
+        written in batches
         '''
 
         ArgumentNullException.if_none(device, 'device')
@@ -96,10 +94,11 @@ class KasaDeviceService:
             preset_id=preset.preset_id,
             preset_name=preset.preset_name,
             state_key=state_key,
-            message=message)
+            message=message,
+            latency=latency)
 
-        result = await self._device_log_repository.insert(
-            document=log.to_dict())
+        await self._device_log_service.capture_device_log(
+            log=log)
 
     async def expire_cached_device(
         self,
@@ -129,6 +128,20 @@ class KasaDeviceService:
         await self._cache_client.delete_key(
             key=CacheKey.device_list())
 
+    async def expire_sync_fingerprints(
+        self
+    ) -> None:
+        '''
+        Expire the stored sync fingerprints so the next
+        sync reconciles local device changes
+        '''
+
+        await TaskCollection(*[
+            self._cache_client.delete_key(
+                key=CacheKey.device_sync_fingerprint(
+                    destructive=destructive))
+            for destructive in [True, False]]).run()
+
     async def get_device(
         self,
         device_id: str
@@ -148,7 +161,7 @@ class KasaDeviceService:
 
         if device is not None:
             logger.info(f'Found cached device: {device_id}')
-            return KasaDevice(
+            return KasaDevice.from_entity(
                 data=device)
 
         # Fetch the device if it's not cached
@@ -168,7 +181,7 @@ class KasaDeviceService:
                     device_id=device_id),
                 value=device))
 
-        kasa_device = KasaDevice(
+        kasa_device = KasaDevice.from_entity(
             data=device)
 
         return kasa_device
@@ -185,107 +198,250 @@ class KasaDeviceService:
         device_entities = await self._device_repository.get_all()
 
         logger.info(f'Fetched {len(device_entities)} devices')
-        kasa_devices = [KasaDevice(device)
+        kasa_devices = [KasaDevice.from_entity(data=device)
                         for device in device_entities]
 
         return kasa_devices
 
     async def sync_devices(
         self,
-        destructive: bool = False
+        destructive: bool = False,
+        force: bool = False
     ):
         logger.info('Syncing devices')
 
-        # Fetch all known devices from database
-        device_entities = await self._device_repository.get_all()
+        started = time.perf_counter()
+
+        device_list = await self._kasa_client.get_device_list(
+            refresh=force)
+
+        await self.apply_device_statuses(
+            device_list=device_list)
+
+        # Nothing downstream can change if the device list
+        # matches the last one that was synced and no device
+        # was added or removed locally since, device updates
+        # expire the stored fingerprint
+        synced_fingerprint, device_count = await TaskCollection(
+            self._cache_client.get_cache(
+                key=CacheKey.device_sync_fingerprint(
+                    destructive=destructive)),
+            self._device_repository.get_device_count()).run()
+
+        sync_key = f'{device_list.fingerprint}-{device_count}'
+
+        if not force and synced_fingerprint == sync_key:
+            logger.info(
+                f'Device list unchanged since last sync: {device_list.fingerprint}')
 
-        known_devices = [KasaDevice(data=device)
-                         for device in device_entities]
+            return DeviceSyncResponse(
+                destructive=destructive,
+                created=list(),
+                updated=list(),
+                removed=list() if destructive else None,
+                duration=f'{round(time.perf_counter() - started, 3)}s',
+                fingerprint=device_list.fingerprint,
+                unchanged=True)
 
-        logger.info(f'Known devices fetched: {len(known_devices)}')
+        device_entities = await self._device_repository.get_all()
 
-        # Create a lookup by device IDs
         known_device_lookups = {
             device.device_id: device
-            for device in known_devices
+            for device in [KasaDevice.from_entity(data=entity)
+                           for entity in device_entities]
         }
 
-        # Get all Kasa device from Kasa
-        # service
-        kasa_devices = await self._kasa_client.get_devices()
+        logger.info(f'Known devices fetched: {len(known_device_lookups)}')
 
-        kasa_device_list = [KasaDevice.from_device_json_object(kasa_device=kasa_device)
-                            for kasa_device in kasa_devices.device_list]
-
-        logger.info(f'Kasa devices fetched: {len(kasa_device_list)}')
-
-        # Create a lookup by device IDs
         kasa_device_lookups = {
-            kasa_device.device_id: kasa_device
-            for kasa_device in kasa_device_list
+            device.device_id: device
+            for device in device_list.to_devices()
         }
 
-        known_ids = list(known_device_lookups.keys())
-        kasa_ids = list(kasa_device_lookups.keys())
-
-        # Devices w/ a database record but
-        # are unknown to Kasa client
-        unknown_devices = list(set(known_ids) - set(kasa_ids))
+        logger.info(f'Kasa devices fetched: {len(kasa_device_lookups)}')
 
         # Devices known to Kasa client but
         # missing a database record
-        missing_devices = list(set(kasa_ids) - set(known_ids))
+        created = [device
+                   for device_id, device in kasa_device_lookups.items()
+                   if device_id not in known_device_lookups]
+
+        # Devices that were renamed or changed type
+        # in the Kasa app
+        updated = list()
+        for device_id, kasa_device in kasa_device_lookups.items():
+            known_device = known_device_lookups.get(device_id)
+
+            if known_device is None:
+                continue
+
+            if (known_device.device_name != kasa_device.device_name
+                    or known_device.device_type != kasa_device.device_type):
+                updated.append(known_device.update_device(
+                    device_name=kasa_device.device_name,
+                    device_type=kasa_device.device_type,
+                    region_id=known_device.region_id))
 
-        logger.info(f'Unknown devices: {unknown_devices}')
-        logger.info(f'Missing devices: {missing_devices}')
+        # Devices w/ a database record but
+        # are unknown to Kasa client
+        removed = ([device
+                    for device_id, device in known_device_lookups.items()
+                    if device_id not in kasa_device_lookups]
+                   if destructive else list())
 
-        created = list()
-        for device_id in missing_devices:
-            logger.info(f'Syncing missing device: {device_id}')
-            device = kasa_device_lookups.get(device_id)
+        logger.info(
+            f'Sync diff: created: {len(created)}: updated: {len(updated)}: removed: {len(removed)}')
 
-            created.append(device)
+        result = await self._device_repository.apply_device_sync(
+            created=[device.to_dict() for device in created],
+            updated=[device.to_dict() for device in updated],
+            removed=[device.device_id for device in removed])
 
-            await self._device_repository.insert(
-                document=device.to_dict())
-            logger.info(f'Synced device: {device.to_dict()}')
+        if result is not None:
+            logger.info(
+                f'Sync result: inserted: {result.inserted_count}: modified: {result.modified_count}: deleted: {result.deleted_count}')
 
-        if not destructive:
-            logger.info(f'{len(created)} devices created')
-            return DeviceSyncResponse(
-                destructive=destructive,
-                created=created)
-
-        logger.info(f'Removing unknown Kasa devices')
+            # Expire the device list and any cached
+            # devices that changed in one pass
+            await TaskCollection(
+                self.expire_cached_device_list(),
+                *[self.expire_cached_device(device_id=device.device_id)
+                  for device in updated + removed]).run()
 
-        removed = list()
-        for device_id in unknown_devices:
-            logger.info(f'Removing device: {device_id}')
-            device = known_device_lookups.get(device_id)
+        device_count = await self._device_repository.get_device_count()
 
-            removed.append(device)
+        fire_task(
+            self._cache_client.set_cache(
+                key=CacheKey.device_sync_fingerprint(
+                    destructive=destructive),
+                value=f'{device_list.fingerprint}-{device_count}',
+                ttl=CacheExpiration.hours(24)))
 
-            await self._device_repository.delete(
-                selector=device.get_selector())
-
-        asyncio.create_task(
-            self._cache_client.delete_key(
-                key=CacheKey.device_list()))
+        duration = time.perf_counter() - started
+        logger.info(f'Device sync completed in {duration}s')
 
         return DeviceSyncResponse(
             destructive=destructive,
             created=created,
-            removed=removed)
+            updated=updated,
+            removed=removed if destructive else None,
+            duration=f'{round(duration, 3)}s',
+            fingerprint=device_list.fingerprint,
+            unchanged=False)
+
+    async def apply_device_statuses(
+        self,
+        device_list: KasaDeviceList
+    ) -> None:
+        '''
+        Feed the online status from the device list into
+        the device shadows when the list has changed
+        '''
+
+        ArgumentNullException.if_none(device_list, 'device_list')
+
+        if self._status_fingerprint == device_list.fingerprint:
+            return
+
+        changed = await self._shadow_service.record_online_statuses(
+            statuses=device_list.get_statuses())
+
+        self._status_fingerprint = device_list.fingerprint
+
+        logger.info(f'Device online status changed: {changed} devices')
+
+    async def get_device_statuses(
+        self,
+        refresh: bool = False
+    ) -> KasaDeviceList:
+        '''
+        Get the Kasa device list with the online status
+        of each device
+        '''
+
+        device_list = await self._kasa_client.get_device_list(
+            refresh=refresh)
+
+        await self.apply_device_statuses(
+            device_list=device_list)
+
+        return device_list
 
     async def get_device_state(
         self,
-        device_id: str
-    ):
+        device_id: str,
+        max_age: float = None,
+        source: str = DeviceShadowSource.Read
+    ) -> DeviceShadow:
+        '''
+        Get the device state from the device shadow if it's
+        within `max_age` seconds, otherwise read it from
+        the device
+        '''
+
         ArgumentNullException.if_none_or_whitespace(device_id, 'device_id')
 
-        return await self._kasa_client.get_device_state(
+        shadow = await self._shadow_service.get_fresh_shadow(
+            device_id=device_id,
+            max_age=max_age)
+
+        if shadow is not None:
+            logger.info(f'Serving device state from shadow: {device_id}')
+            return shadow
+
+        # Concurrent reads for the same device share one
+        # upstream request in the Kasa client
+        return await self._read_device_state(
+            device_id=device_id,
+            source=source)
+
+    async def get_device_states(
+        self,
+        device_ids: List[str],
+        max_age: float = None
+    ) -> Dict[str, DeviceShadow | Exception]:
+        '''
+        Get the state of a list of devices concurrently,
+        failed reads are returned as the exception for
+        the device rather than failing the batch
+        '''
+
+        ArgumentNullException.if_none(device_ids, 'device_ids')
+
+        # Preserve the request order w/o duplicates
+        device_ids = list(dict.fromkeys(device_ids))
+
+        logger.info(f'Get device states: {len(device_ids)} devices')
+
+        # Upstream requests are bounded by the Kasa client
+        # request limiter
+        results = await asyncio.gather(*[
+            self.get_device_state(
+                device_id=device_id,
+                max_age=max_age)
+            for device_id in device_ids
+        ], return_exceptions=True)
+
+        return dict(zip(device_ids, results))
+
+    async def _read_device_state(
+        self,
+        device_id: str,
+        source: str
+    ) -> DeviceShadow:
+        response = await self._kasa_client.get_device_state(
             device_id=device_id)
 
+        if response.is_error:
+            raise KasaDeviceStateException(
+                device_id=device_id,
+                message=response.error_message)
+
+        return await self._shadow_service.record_reported_state(
+            device_id=device_id,
+            reported=response.device_object,
+            source=source)
+
     async def set_device_state(
         self,
         device: KasaDevice,
@@ -313,7 +469,7 @@ class KasaDeviceService:
         logger.info(f'Sending Kasa device state request')
 
         # Get the state key for the updated device
-        state_key = typed_device.state_key()
+        state_key = preset.get_state_key()
         logger.info(f'Device state key: {device.device_name}: {state_key}')
 
         # Run Kasa client commands
@@ -332,23 +488,51 @@ class KasaDeviceService:
             logger.info('Non-list response type')
             response = client_results.to_dict()
 
-        # # Capture the device log
-        fire_task(
-            self.capture_device_log(
-                device=device,
-                preset=preset,
-                state_key=state_key,
-                message=f'Set device state response: {serialize(response)}',
-                level='ERROR' if client_results.is_error else 'INFO'))
-
-        # Send the event that captures the client response
+        # Capture the device log
+        await self.capture_device_log(
+            device=device,
+            preset=preset,
+            state_key=state_key,
+            message=f'Set device state response: {serialize(response)}',
+            level='ERROR' if client_results.is_error else 'INFO',
+            latency=client_results.latency)
+
+        # Hand the client response straight to the local
+        # writer, skipping the event queue round trip
+        if self._client_response_mode in [ClientResponseMode.Local,
+                                          ClientResponseMode.Both]:
+            self._client_response_service.queue_client_response(
+                request=UpdateClientResponseRequest({
+                    'device_id': device.device_id,
+                    'preset_id': preset.preset_id,
+                    'client_response': client_results.data,
+                    'state_key': state_key
+                }))
+
+        # Queue the event that captures the client response
         # for the device state change request
-        fire_task(
-            self._event_service.send_client_response_event(
+        if self._client_response_mode in [ClientResponseMode.Event,
+                                          ClientResponseMode.Both]:
+            await self._event_service.send_client_response_event(
                 device_id=device.device_id,
                 preset_id=preset.preset_id,
                 client_response=client_results.data,
-                state_key=state_key))
+                state_key=state_key)
+
+        # Track the requested state on the device shadow,
+        # the device has already changed so a shadow cache
+        # error shouldn't fail the request
+        try:
+            await self._shadow_service.record_desired_state(
+                device_id=device.device_id,
+                desired=preset.definition,
+                preset_id=preset.preset_id,
+                state_key=state_key,
+                error=(client_results.error_message
+                       if client_results.is_error else None))
+        except Exception as ex:
+            logger.exception(
+                f'{device.device_id}: Failed to record desired state: {str(ex)}')
 
         return (kasa_request, response)
 
@@ -368,7 +552,8 @@ class KasaDeviceService:
         # we're updating heres
         await TaskCollection(
             self.expire_cached_device(device_id=update_request.device_id),
-            self.expire_cached_device_list()).run()
+            self.expire_cached_device_list(),
+            self.expire_sync_fingerprints()).run()
 
         if none_or_whitespace(update_request.device_id):
             logger.info(f'No device ID provided in device update request')
@@ -444,7 +629,7 @@ class KasaDeviceService:
             raise RegionNotFoundException(
                 region_id=region_id)
 
-        device = KasaDevice(
+        device = KasaDevice.from_entity(
             data=device_entity)
 
         device.set_region(
@@ -501,7 +686,22 @@ class KasaDeviceService:
             region_id=region_id)
 
         # Parse entities into device models
-        devices = [KasaDevice(data=entity)
+        devices = [KasaDevice.from_entity(data=entity)
                    for entity in entities]
 
         return devices
+
+    async def get_device_ids_by_region(
+        self,
+        region_id: str
+    ) -> List[str]:
+        '''
+        Get the IDs of the devices in a region
+        '''
+
+        ArgumentNullException.if_none_or_whitespace(region_id, 'region_id')
+
+        entities = await self._device_repository.get_devices_ids_by_region(
+            region_id=region_id)
+
+        return [entity.get('device_id') for entity in entities]
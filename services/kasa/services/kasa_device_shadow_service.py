@@ -0,0 +1,258 @@
+import asyncio
+from typing import Callable, Dict, List
+
+from domain.cache import CacheExpiration, CacheKey
+from domain.constants import DeviceShadowSource
+from domain.kasa.shadow import DeviceShadow
+from framework.clients.cache_client import CacheClientAsync
+from framework.configuration import Configuration
+from framework.exceptions.nulls import ArgumentNullException
+from framework.logger.providers import get_logger
+from utils.helpers import fire_task, get_config_section
+
+logger = get_logger(__name__)
+
+
+class KasaDeviceShadowService:
+    def __init__(
+        self,
+        configuration: Configuration,
+        cache_client: CacheClientAsync
+    ):
+        self._cache_client = cache_client
+
+        settings = get_config_section(
+            configuration, 'shadow')
+
+        self._max_age = settings.get(
+            'max_age_seconds', 30)
+
+        # In-process shadows, Redis holds the shared copy
+        # across instances
+        self._shadows: Dict[str, DeviceShadow] = dict()
+
+        # Notified when a state change is sent to a device
+        self._desired_listeners: List[Callable[[DeviceShadow], None]] = list()
+
+        self._hits = 0
+        self._stale = 0
+        self._misses = 0
+
+    @property
+    def max_age(
+        self
+    ) -> float:
+        return self._max_age
+
+    def add_desired_listener(
+        self,
+        listener: Callable[[DeviceShadow], None]
+    ) -> None:
+        '''
+        Register a callback for desired state changes
+        '''
+
+        self._desired_listeners.append(listener)
+
+    async def get_shadow(
+        self,
+        device_id: str
+    ) -> DeviceShadow | None:
+        '''
+        Get the device shadow from memory, falling back
+        to the shared cache
+        '''
+
+        ArgumentNullException.if_none_or_whitespace(device_id, 'device_id')
+
+        shadow = self._shadows.get(device_id)
+        if shadow is not None:
+            return shadow
+
+        return await self._load(
+            device_id=device_id)
+
+    async def get_fresh_shadow(
+        self,
+        device_id: str,
+        max_age: float = None
+    ) -> DeviceShadow | None:
+        '''
+        Get the device shadow if its reported state is
+        within the staleness bound, otherwise None
+        '''
+
+        max_age = max_age if max_age is not None else self._max_age
+
+        shadow = await self.get_shadow(
+            device_id=device_id)
+
+        if shadow is None:
+            self._misses += 1
+            return None
+
+        # Another instance may have a fresher shadow
+        if shadow.is_stale(max_age=max_age):
+            shadow = await self._load(
+                device_id=device_id) or shadow
+
+        if shadow.is_stale(max_age=max_age):
+            logger.info(f'Stale device shadow: {device_id}')
+            self._stale += 1
+            return None
+
+        self._hits += 1
+        return shadow
+
+    async def record_reported_state(
+        self,
+        device_id: str,
+        reported: dict,
+        source: str = DeviceShadowSource.Read
+    ) -> DeviceShadow:
+        '''
+        Record the state reported by the device
+        '''
+
+        ArgumentNullException.if_none(reported, 'reported')
+
+        shadow = await self._get_or_create(
+            device_id=device_id)
+
+        shadow.report(
+            reported=reported,
+            source=source)
+
+        self._save(shadow)
+        return shadow
+
+    async def record_desired_state(
+        self,
+        device_id: str,
+        desired: dict,
+        preset_id: str,
+        state_key: str,
+        error: str = None
+    ) -> DeviceShadow:
+        '''
+        Record a state change sent to the device, the
+        reported state is out of sync until it's read
+        back
+        '''
+
+        shadow = await self._get_or_create(
+            device_id=device_id)
+
+        shadow.desire(
+            desired=desired,
+            preset_id=preset_id,
+            state_key=state_key,
+            error=error)
+
+        self._save(shadow)
+
+        for listener in self._desired_listeners:
+            listener(shadow)
+
+        return shadow
+
+    async def record_online_statuses(
+        self,
+        statuses: Dict[str, bool]
+    ) -> int:
+        '''
+        Record the online status of each device from the
+        Kasa device list, returns the number of devices
+        whose status changed
+        '''
+
+        ArgumentNullException.if_none(statuses, 'statuses')
+
+        changed = 0
+
+        # Load the shadows this process hasn't seen in one
+        # concurrent pass rather than a read per device
+        missing = [device_id for device_id in statuses
+                   if device_id not in self._shadows]
+
+        await asyncio.gather(*[
+            self._load(device_id=device_id)
+            for device_id in missing
+        ])
+
+        for device_id, online in statuses.items():
+            shadow = self._shadows.get(device_id)
+
+            if shadow is None:
+                shadow = DeviceShadow(
+                    device_id=device_id)
+                self._shadows[device_id] = shadow
+
+            if shadow.online == online:
+                continue
+
+            shadow.set_online(
+                online=online)
+
+            self._save(shadow)
+            changed += 1
+
+        return changed
+
+    def get_metrics(
+        self
+    ) -> dict:
+        return {
+            'shadows': len(self._shadows),
+            'max_age_seconds': self._max_age,
+            'hits': self._hits,
+            'stale': self._stale,
+            'misses': self._misses
+        }
+
+    async def _load(
+        self,
+        device_id: str
+    ) -> DeviceShadow | None:
+        entity = await self._cache_client.get_json(
+            key=CacheKey.device_shadow(
+                device_id=device_id))
+
+        if entity is None:
+            return None
+
+        shadow = DeviceShadow.from_entity(
+            data=entity)
+
+        # Keep the in-process copy if it's the newer one
+        current = self._shadows.get(device_id)
+        if current is not None and (current.reported_at or 0) > (shadow.reported_at or 0):
+            return current
+
+        self._shadows[device_id] = shadow
+        return shadow
+
+    async def _get_or_create(
+        self,
+        device_id: str
+    ) -> DeviceShadow:
+        shadow = await self.get_shadow(
+            device_id=device_id)
+
+        if shadow is None:
+            shadow = DeviceShadow(
+                device_id=device_id)
+            self._shadows[device_id] = shadow
+
+        return shadow
+
+    def _save(
+        self,
+        shadow: DeviceShadow
+    ) -> None:
+        fire_task(
+            self._cache_client.set_json(
+                key=CacheKey.device_shadow(
+                    device_id=shadow.device_id),
+                value=shadow.to_dict(),
+                ttl=CacheExpiration.hours(24)))
@@ -0,0 +1,62 @@
+from clients.identity_client import IdentityClient
+from clients.kasa_client import KasaClient
+from framework.logger.providers import get_logger
+from services.kasa_auth_service import KasaAuthService
+from services.kasa_client_response_service import KasaClientResponseService
+from services.kasa_device_log_service import KasaDeviceLogService
+from services.kasa_device_shadow_service import KasaDeviceShadowService
+from services.kasa_discovery_service import KasaDiscoveryService
+from services.kasa_event_service import KasaEventService
+from services.kasa_polling_service import KasaPollingService
+from services.kasa_reconciler_service import KasaReconcilerService
+
+logger = get_logger(__name__)
+
+
+class KasaDiagnosticsService:
+    def __init__(
+        self,
+        device_log_service: KasaDeviceLogService,
+        event_service: KasaEventService,
+        client_response_service: KasaClientResponseService,
+        identity_client: IdentityClient,
+        auth_service: KasaAuthService,
+        shadow_service: KasaDeviceShadowService,
+        reconciler_service: KasaReconcilerService,
+        kasa_client: KasaClient,
+        polling_service: KasaPollingService,
+        discovery_service: KasaDiscoveryService
+    ):
+        self._device_log_service = device_log_service
+        self._event_service = event_service
+        self._client_response_service = client_response_service
+        self._identity_client = identity_client
+        self._auth_service = auth_service
+        self._shadow_service = shadow_service
+        self._reconciler_service = reconciler_service
+        self._kasa_client = kasa_client
+        self._polling_service = polling_service
+        self._discovery_service = discovery_service
+
+    async def get_diagnostics(
+        self
+    ) -> dict:
+        '''
+        Get the in-process buffer and background
+        worker metrics
+        '''
+
+        logger.info('Get diagnostics')
+
+        return {
+            'device_logs': self._device_log_service.get_metrics(),
+            'events': self._event_service.get_metrics(),
+            'client_responses': self._client_response_service.get_metrics(),
+            'identity': self._identity_client.get_metrics(),
+            'auth': self._auth_service.get_metrics(),
+            'shadows': self._shadow_service.get_metrics(),
+            'reconciler': self._reconciler_service.get_metrics(),
+            'kasa_client': self._kasa_client.get_metrics(),
+            'polling': self._polling_service.get_metrics(),
+            'discovery': self._discovery_service.get_metrics()
+        }
@@ -0,0 +1,262 @@
+import asyncio
+import time
+from typing import Dict, List
+
+from clients.kasa_client import KasaClient
+from clients.kasa_discovery import broadcast_discovery
+from clients.kasa_transport import KASA_LAN_PORT
+from domain.cache import CacheExpiration, CacheKey
+from domain.kasa.discovery import DiscoveredDevice
+from framework.clients.cache_client import CacheClientAsync
+from framework.configuration import Configuration
+from framework.logger.providers import get_logger
+from utils.concurrency import SingleFlight
+from utils.helpers import get_config_section
+
+logger = get_logger(__name__)
+
+
+class KasaDiscoveryService:
+    '''
+    Finds devices on the local network with the Kasa UDP
+    discovery probe and keeps the LAN transport address
+    map current, devices that stop answering are evicted
+
+    Only devices this instance found are applied to the
+    LAN transport, what other instances found is shared
+    through the cache for reporting, and configured
+    addresses are never changed
+    '''
+
+    def __init__(
+        self,
+        configuration: Configuration,
+        cache_client: CacheClientAsync,
+        kasa_client: KasaClient
+    ):
+        self._cache_client = cache_client
+        self._kasa_client = kasa_client
+
+        settings = get_config_section(
+            configuration, 'discovery')
+
+        self._enabled = settings.get('enabled', False)
+        self._broadcast_address = settings.get(
+            'broadcast_address', '255.255.255.255')
+        self._port = settings.get('port', KASA_LAN_PORT)
+        self._interval = settings.get('interval_seconds', 60)
+        self._listen_seconds = settings.get('listen_seconds', 3)
+        self._evict_after = settings.get('evict_after_seconds', 600)
+
+        # Devices found by any instance, and the devices
+        # this instance found itself
+        self._devices: Dict[str, DiscoveredDevice] = dict()
+        self._local: Dict[str, DiscoveredDevice] = dict()
+        self._refreshes = SingleFlight(
+            name='kasa-device-discovery')
+
+        self._task: asyncio.Task = None
+        self._refreshed_at = None
+
+        self._runs = 0
+        self._errors = 0
+        self._discovered = 0
+        self._evicted = 0
+
+    @property
+    def is_running(
+        self
+    ) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(
+        self
+    ) -> None:
+        '''
+        Start the background discovery loop if it's enabled
+        '''
+
+        if not self._enabled or self.is_running:
+            return
+
+        logger.info('Starting device discovery')
+
+        self._task = asyncio.create_task(
+            self._run())
+
+    async def stop(
+        self
+    ) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def get_devices(
+        self,
+        refresh: bool = False
+    ) -> List[DiscoveredDevice]:
+        '''
+        Get the locally reachable devices, from the last
+        discovery run unless `refresh` is set
+        '''
+
+        if refresh:
+            await self.refresh()
+
+        elif not any(self._devices):
+            # Nothing discovered in this process yet, use
+            # what other instances found
+            self._merge(
+                devices=await self._load())
+            self._evict()
+
+        return sorted(
+            self._devices.values(),
+            key=lambda device: device.alias or device.device_id)
+
+    async def refresh(
+        self
+    ) -> List[DiscoveredDevice]:
+        '''
+        Run a discovery probe, concurrent refreshes share
+        the same probe
+        '''
+
+        return await self._refreshes.run(
+            key='discovery',
+            func=self._refresh)
+
+    def get_metrics(
+        self
+    ) -> dict:
+        return {
+            'enabled': self._enabled,
+            'running': self.is_running,
+            'devices': len(self._devices),
+            'local_devices': len(self._local),
+            'runs': self._runs,
+            'errors': self._errors,
+            'discovered': self._discovered,
+            'evicted': self._evicted,
+            'evict_after_seconds': self._evict_after,
+            'last_refresh_age': (
+                round(time.time() - self._refreshed_at, 3)
+                if self._refreshed_at is not None else None)
+        }
+
+    async def _refresh(
+        self
+    ) -> List[DiscoveredDevice]:
+        replies = await broadcast_discovery(
+            address=self._broadcast_address,
+            port=self._port,
+            timeout=self._listen_seconds)
+
+        found = [DiscoveredDevice.from_sysinfo(ip=ip, sysinfo=sysinfo)
+                 for ip, sysinfo in replies]
+
+        for device in found:
+            self._local[device.device_id] = device
+
+        # Merge in what other instances have seen so one
+        # instance missing a reply doesn't drop a device
+        # from the shared list
+        self._merge(
+            devices=await self._load())
+        self._merge(
+            devices=found)
+
+        self._evict()
+        self._apply()
+
+        self._runs += 1
+        self._discovered += len(found)
+        self._refreshed_at = time.time()
+
+        await self._cache_client.set_json(
+            key=CacheKey.device_discovery(),
+            value=[device.to_dict() for device in self._devices.values()],
+            ttl=CacheExpiration.minutes(
+                max(self._evict_after // 60, 1)))
+
+        logger.info(
+            f'Discovery refreshed: {len(found)} replies: {len(self._devices)} reachable')
+
+        return found
+
+    def _merge(
+        self,
+        devices: List[DiscoveredDevice]
+    ) -> None:
+        for device in devices:
+            current = self._devices.get(device.device_id)
+
+            if current is None or device.last_seen >= current.last_seen:
+                self._devices[device.device_id] = device
+
+    def _evict(
+        self
+    ) -> None:
+        lan_transport = self._kasa_client.lan_transport
+
+        for device_id, device in list(self._devices.items()):
+            if not device.is_expired(max_age=self._evict_after):
+                continue
+
+            logger.info(
+                f'{device_id}: Evicting device last seen {round(device.get_age())}s ago')
+
+            self._devices.pop(device_id)
+            self._evicted += 1
+
+        for device_id, device in list(self._local.items()):
+            if not device.is_expired(max_age=self._evict_after):
+                continue
+
+            self._local.pop(device_id)
+
+            if not lan_transport.is_static(device_id):
+                lan_transport.remove_address(
+                    device_id=device_id)
+
+    def _apply(
+        self
+    ) -> None:
+        lan_transport = self._kasa_client.lan_transport
+
+        for device in self._local.values():
+            if lan_transport.is_static(device.device_id):
+                continue
+
+            lan_transport.set_address(
+                device_id=device.device_id,
+                host=device.ip)
+
+    async def _load(
+        self
+    ) -> List[DiscoveredDevice]:
+        entities = await self._cache_client.get_json(
+            key=CacheKey.device_discovery())
+
+        return [DiscoveredDevice.from_entity(data=entity)
+                for entity in entities or list()]
+
+    async def _run(
+        self
+    ) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                self._errors += 1
+                logger.exception(f'Device discovery error: {str(ex)}')
+
+            await asyncio.sleep(self._interval)
@@ -1,9 +1,13 @@
+from typing import List
+
 from clients.event_client import EventClient
 from clients.identity_client import IdentityClient
 from domain.events import StoreKasaClientResponseEvent
 from framework.configuration import Configuration
 from framework.exceptions.nulls import ArgumentNullException
 from framework.logger import get_logger
+from utils.concurrency import BatchProcessor
+from utils.outbox import OutboxRelay, SqliteOutbox
 
 logger = get_logger(__name__)
 
@@ -21,6 +25,37 @@ class KasaEventService:
         self._configuration = configuration
         self._base_url = self._configuration.events.get('base_url')
 
+        # Buffer outgoing events and publish them in
+        # batches off the request path
+        self._buffer = BatchProcessor(
+            name='client-response-event-publisher',
+            handler=self._publish_events,
+            max_batch_size=self._configuration.events.get(
+                'batch_size', 100),
+            max_queue_size=self._configuration.events.get(
+                'max_queue_size', 5000),
+            flush_interval=self._configuration.events.get(
+                'flush_interval_seconds', 1))
+
+        # Durable outbox, events are persisted locally and
+        # relayed so a broker outage doesn't lose them
+        self._relay: OutboxRelay = None
+
+        outbox_path = self._configuration.events.get('outbox_path')
+        if outbox_path is not None:
+            self._relay = OutboxRelay(
+                name='client-response-event-outbox',
+                outbox=SqliteOutbox(path=outbox_path),
+                handler=self._publish_events,
+                batch_size=self._configuration.events.get(
+                    'batch_size', 100),
+                poll_interval=self._configuration.events.get(
+                    'flush_interval_seconds', 1),
+                max_retry_delay=self._configuration.events.get(
+                    'max_retry_delay_seconds', 60),
+                max_attempts=self._configuration.events.get(
+                    'outbox_max_attempts', 10))
+
     async def send_client_response_event(
         self,
         device_id: str,
@@ -44,20 +79,71 @@ class KasaEventService:
             state_key, 'state_key')
 
         logger.info(
-            f'{preset_id}: {device_id}: Dispatching client response event')
+            f'{preset_id}: {device_id}: Queueing client response event')
+
+        event = {
+            'kasa_response': client_response,
+            'device_id': device_id,
+            'preset_id': preset_id,
+            'state_key': state_key
+        }
+
+        if self._relay is not None:
+            await self._relay.outbox.append(
+                payload=event)
+            self._relay.notify()
+        else:
+            self._buffer.enqueue(event)
+
+    def start(
+        self
+    ) -> None:
+        if self._relay is not None:
+            self._relay.start()
+        else:
+            self._buffer.start()
+
+    async def stop(
+        self
+    ) -> None:
+        '''
+        Publish any buffered events and close the
+        service bus sender, events left in the outbox
+        are relayed on the next start
+        '''
+
+        if self._relay is not None:
+            await self._relay.stop()
+        else:
+            await self._buffer.stop()
+
+        await self._queue_client.close()
 
+    def get_metrics(
+        self
+    ) -> dict:
+        if self._relay is not None:
+            return self._relay.get_metrics()
+
+        return self._buffer.get_metrics()
+
+    async def _publish_events(
+        self,
+        events: List[dict]
+    ) -> None:
+        # One token for the whole batch
         token = await self._identity_client.get_token(
             client_name='kasa-api')
 
-        event = StoreKasaClientResponseEvent(
-            kasa_response=client_response,
-            device_id=device_id,
-            preset_id=preset_id,
-            state_key=state_key,
-            base_url=self._base_url,
-            token=token)
+        messages = [
+            StoreKasaClientResponseEvent(
+                base_url=self._base_url,
+                token=token,
+                **event).to_service_bus_message()
+            for event in events
+        ]
 
-        self._queue_client.send_message(
-            message=event.to_service_bus_message())
+        await self._queue_client.send_messages(
+            messages=messages)
 
-        logger.info(f'{preset_id}: {device_id}: Client response event sent')
+        logger.info(f'Published {len(messages)} client response events')
@@ -100,13 +100,12 @@ class KasaExecutionService:
             device=device,
             kasa_token=kasa_token)
 
-        typed_device = preset.to_device_preset(
-            device=device)
-
-        state_key = typed_device.state_key()
+        # Memoized per preset, shared with the state key
+        # computed for the device state request
+        state_key = preset.get_state_key()
 
         logger.info(
-            f'{device.device_name}: Typed device state key: {state_key}')
+            f'{device.device_name}: Preset state key: {state_key}')
 
         # Return the updated device state key
         return SetDeviceStateRequest.create_request(
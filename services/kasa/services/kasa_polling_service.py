@@ -0,0 +1,506 @@
+import asyncio
+import heapq
+import random
+import socket
+import time
+import uuid
+from typing import Dict, List, Set, Tuple
+
+from data.repositories.kasa_lease_repository import KasaLeaseRepository
+from domain.constants import DeviceShadowSource
+from domain.kasa.shadow import DeviceShadow
+from framework.configuration import Configuration
+from framework.logger.providers import get_logger
+from services.kasa_device_service import KasaDeviceService
+from services.kasa_device_shadow_service import KasaDeviceShadowService
+from utils.concurrency import TokenBucket
+from utils.helpers import get_config_section
+
+logger = get_logger(__name__)
+
+POLLING_LEASE_NAME = 'kasa-polling'
+
+
+class DevicePollSchedule:
+    __slots__ = (
+        'device_id',
+        'interval',
+        'next_poll_at',
+        'state_key',
+        'failures',
+        'polls',
+        'changes'
+    )
+
+    def __init__(
+        self,
+        device_id: str,
+        interval: float,
+        next_poll_at: float
+    ):
+        self.device_id = device_id
+        self.interval = interval
+        self.next_poll_at = next_poll_at
+        self.state_key = None
+        self.failures = 0
+        self.polls = 0
+        self.changes = 0
+
+
+class KasaPollingService:
+    '''
+    Polls device state on a per-device schedule, devices
+    that were just commanded or have drifted are polled
+    often and stable or offline devices back off, all
+    within a global request budget
+
+    Only the replica holding the polling lease polls, so
+    the budget holds across replicas, and only state
+    changes sent from that replica trigger a hot re-poll
+    '''
+
+    def __init__(
+        self,
+        configuration: Configuration,
+        device_service: KasaDeviceService,
+        shadow_service: KasaDeviceShadowService,
+        lease_repository: KasaLeaseRepository
+    ):
+        self._device_service = device_service
+        self._shadow_service = shadow_service
+        self._lease_repository = lease_repository
+
+        settings = get_config_section(
+            configuration, 'polling')
+
+        self._enabled = settings.get('enabled', False)
+        self._min_interval = settings.get('min_interval_seconds', 5)
+        self._interval = settings.get('interval_seconds', 60)
+        self._max_interval = settings.get('max_interval_seconds', 900)
+        self._backoff_factor = settings.get('backoff_factor', 1.5)
+        self._hot_seconds = settings.get('hot_seconds', 120)
+        self._concurrency = settings.get('concurrency', 4)
+        self._device_refresh_interval = settings.get(
+            'device_refresh_seconds', 600)
+
+        # Renewed a few times per lease so a leader that
+        # stops renewing is replaced within one lease
+        self._lease_seconds = settings.get('lease_seconds', 60)
+        self._lease_renew_interval = self._lease_seconds / 3
+
+        # Global budget shared by every device poll
+        budget_per_minute = settings.get('budget_per_minute', 60)
+        self._budget = TokenBucket(
+            name='device-polling-budget',
+            rate=budget_per_minute / 60,
+            capacity=settings.get('budget_burst', max(budget_per_minute / 6, 1)))
+
+        # Min heap of (next poll time, sequence, device ID),
+        # rescheduled entries are skipped lazily when popped
+        self._queue: List[Tuple[float, int, str]] = list()
+        self._schedules: Dict[str, DevicePollSchedule] = dict()
+        self._sequence = 0
+
+        self._task: asyncio.Task = None
+        self._wake: asyncio.Event = None
+        self._inflight: Set[asyncio.Task] = set()
+        self._semaphore = asyncio.Semaphore(self._concurrency)
+        self._devices_refreshed_at = None
+
+        self._holder = f'{socket.gethostname()}-{uuid.uuid4().hex[:8]}'
+        self._is_leader = False
+        self._lease_checked_at = None
+
+        self._polls = 0
+        self._changes = 0
+        self._errors = 0
+        self._offline = 0
+        self._deferred = 0
+
+        self._shadow_service.add_desired_listener(
+            self.notify_commanded)
+
+    @property
+    def is_running(
+        self
+    ) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(
+        self
+    ) -> None:
+        '''
+        Start the polling loop if it's enabled
+        '''
+
+        if not self._enabled or self.is_running:
+            return
+
+        logger.info('Starting device polling scheduler')
+
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(
+            self._run())
+
+    async def stop(
+        self
+    ) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        for task in list(self._inflight):
+            task.cancel()
+
+        await asyncio.gather(
+            *self._inflight,
+            return_exceptions=True)
+
+        if self._is_leader:
+            await self._lease_repository.release(
+                lease_name=POLLING_LEASE_NAME,
+                holder=self._holder)
+            self._is_leader = False
+            self._lease_checked_at = None
+
+    def set_devices(
+        self,
+        device_ids: List[str]
+    ) -> None:
+        '''
+        Add new devices to the schedule and drop removed
+        ones, existing schedules are kept
+        '''
+
+        now = time.time()
+        device_ids = set(device_ids)
+
+        for device_id in list(self._schedules):
+            if device_id not in device_ids:
+                self._schedules.pop(device_id)
+
+        for device_id in device_ids:
+            if device_id in self._schedules:
+                continue
+
+            schedule = DevicePollSchedule(
+                device_id=device_id,
+                interval=self._interval,
+                next_poll_at=now)
+
+            self._schedules[device_id] = schedule
+
+            # Spread the first polls over an interval so a
+            # restart doesn't poll every device at once
+            self._schedule(
+                schedule=schedule,
+                delay=random.uniform(0, self._interval))
+
+    def notify_commanded(
+        self,
+        shadow: DeviceShadow
+    ) -> None:
+        '''
+        Poll a device that was just sent a state change
+        at the hot interval to confirm it
+
+        Only takes effect on the replica holding the
+        polling lease, the other replicas have no
+        schedules. A state change served by another
+        replica is picked up when the device is next
+        polled on its current interval
+        '''
+
+        schedule = self._schedules.get(shadow.device_id)
+
+        if schedule is None:
+            return
+
+        schedule.interval = self._min_interval
+        self._schedule(
+            schedule=schedule,
+            delay=self._min_interval)
+
+    def get_next_interval(
+        self,
+        schedule: DevicePollSchedule,
+        shadow: DeviceShadow | None,
+        state_key: str | None
+    ) -> float:
+        '''
+        Get the next poll interval for a device from the
+        outcome of its last poll
+        '''
+
+        # Offline or failing, back off exponentially
+        if shadow is None:
+            return min(
+                self._interval * (2 ** schedule.failures),
+                self._max_interval)
+
+        changed = (schedule.state_key is not None
+                   and state_key is not None
+                   and state_key != schedule.state_key)
+        drifting = (shadow.state_key is not None
+                    and state_key is not None
+                    and state_key != shadow.state_key)
+        commanded = (shadow.desired_at is not None
+                     and time.time() - shadow.desired_at < self._hot_seconds)
+
+        if changed or drifting or commanded:
+            return self._min_interval
+
+        # Stable, relax back toward the max interval
+        return min(
+            max(schedule.interval, self._min_interval) * self._backoff_factor,
+            self._max_interval)
+
+    async def poll_device(
+        self,
+        device_id: str
+    ) -> None:
+        '''
+        Poll a device through the device state path and
+        reschedule it
+        '''
+
+        schedule = self._schedules.get(device_id)
+        if schedule is None:
+            return
+
+        shadow = None
+        state_key = None
+
+        # Don't spend a read on a device the device list
+        # reports as offline, back it off instead
+        current = await self._shadow_service.get_shadow(
+            device_id=device_id)
+
+        if current is not None and current.online is False:
+            self._offline += 1
+            schedule.failures += 1
+            schedule.interval = self.get_next_interval(
+                schedule=schedule,
+                shadow=None,
+                state_key=None)
+
+            self._schedule(
+                schedule=schedule,
+                delay=schedule.interval)
+            return
+
+        try:
+            shadow = await self._device_service.get_device_state(
+                device_id=device_id,
+                max_age=0,
+                source=DeviceShadowSource.Poll)
+
+            device = shadow.get_reported_device()
+            state_key = device.state_key() if device is not None else None
+            schedule.failures = 0
+
+        except Exception as ex:
+            self._errors += 1
+            schedule.failures += 1
+            logger.info(f'{device_id}: Device poll failed: {str(ex)}')
+
+        if (schedule.state_key is not None
+                and state_key is not None
+                and state_key != schedule.state_key):
+            schedule.changes += 1
+            self._changes += 1
+
+        schedule.interval = self.get_next_interval(
+            schedule=schedule,
+            shadow=shadow,
+            state_key=state_key)
+
+        if state_key is not None:
+            schedule.state_key = state_key
+
+        schedule.polls += 1
+        self._polls += 1
+
+        self._schedule(
+            schedule=schedule,
+            delay=schedule.interval)
+
+    def get_metrics(
+        self
+    ) -> dict:
+        now = time.time()
+        intervals = [schedule.interval
+                     for schedule in self._schedules.values()]
+
+        return {
+            'enabled': self._enabled,
+            'running': self.is_running,
+            'is_leader': self._is_leader,
+            'devices': len(self._schedules),
+            'hot': len([interval for interval in intervals
+                        if interval <= self._min_interval]),
+            'backed_off': len([interval for interval in intervals
+                               if interval >= self._max_interval]),
+            'inflight': len(self._inflight),
+            'polls': self._polls,
+            'changes': self._changes,
+            'errors': self._errors,
+            'offline': self._offline,
+            'deferred': self._deferred,
+            'next_poll_in': (
+                round(max(self._queue[0][0] - now, 0), 3)
+                if any(self._queue) else None),
+            'budget': self._budget.get_metrics()
+        }
+
+    def _schedule(
+        self,
+        schedule: DevicePollSchedule,
+        delay: float
+    ) -> None:
+        schedule.next_poll_at = time.time() + delay
+
+        self._sequence += 1
+        heapq.heappush(
+            self._queue,
+            (schedule.next_poll_at, self._sequence, schedule.device_id))
+
+        if self._wake is not None:
+            self._wake.set()
+
+    def _dispatch_due(
+        self
+    ) -> float:
+        '''
+        Start polls for every due device the budget allows,
+        returns the seconds until there's more to do
+        '''
+
+        while any(self._queue):
+            poll_at, _, device_id = self._queue[0]
+            schedule = self._schedules.get(device_id)
+
+            # Removed or rescheduled since it was queued
+            if schedule is None or schedule.next_poll_at != poll_at:
+                heapq.heappop(self._queue)
+                continue
+
+            wait = poll_at - time.time()
+            if wait > 0:
+                return wait
+
+            # Out of budget, leave it queued until a token
+            # is available
+            if not self._budget.try_acquire():
+                self._deferred += 1
+                return self._budget.get_wait() or self._max_interval
+
+            heapq.heappop(self._queue)
+
+            task = asyncio.create_task(
+                self._poll(device_id))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+        return self._max_interval
+
+    async def _poll(
+        self,
+        device_id: str
+    ) -> None:
+        async with self._semaphore:
+            await self.poll_device(
+                device_id=device_id)
+
+    async def _refresh_devices(
+        self
+    ) -> None:
+        now = time.time()
+
+        if (self._devices_refreshed_at is not None
+                and now - self._devices_refreshed_at < self._device_refresh_interval):
+            return
+
+        devices = await self._device_service.get_all_devices()
+
+        self.set_devices(
+            device_ids=[device.device_id for device in devices])
+        self._devices_refreshed_at = now
+
+        logger.info(f'Polling schedule refreshed: {len(devices)} devices')
+
+    async def _check_lease(
+        self
+    ) -> bool:
+        '''
+        Acquire or renew the polling lease, at most once
+        per renew interval
+        '''
+
+        now = time.time()
+
+        if (self._lease_checked_at is not None
+                and now - self._lease_checked_at < self._lease_renew_interval):
+            return self._is_leader
+
+        is_leader = await self._lease_repository.try_acquire(
+            lease_name=POLLING_LEASE_NAME,
+            holder=self._holder,
+            lease_seconds=self._lease_seconds)
+
+        if is_leader and not self._is_leader:
+            logger.info(f'Polling lease acquired: {self._holder}')
+
+            # Pick up devices added while another replica
+            # was polling
+            self._devices_refreshed_at = None
+
+        elif not is_leader and self._is_leader:
+            logger.info('Polling lease lost to another replica')
+
+        self._is_leader = is_leader
+        self._lease_checked_at = now
+
+        return self._is_leader
+
+    async def _tick(
+        self
+    ) -> float:
+        '''
+        Run one pass of the polling loop, returns the
+        seconds until the next pass
+        '''
+
+        if not await self._check_lease():
+            return self._lease_renew_interval
+
+        await self._refresh_devices()
+
+        return min(
+            self._dispatch_due(),
+            self._lease_renew_interval)
+
+    async def _run(
+        self
+    ) -> None:
+        while True:
+            self._wake.clear()
+
+            try:
+                delay = await self._tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                delay = self._min_interval
+                logger.exception(f'Device polling error: {str(ex)}')
+
+            try:
+                await asyncio.wait_for(
+                    self._wake.wait(),
+                    timeout=min(delay, self._device_refresh_interval))
+            except asyncio.TimeoutError:
+                pass
@@ -139,7 +139,7 @@ class KasaPresetSevice:
 
         if preset is not None:
             logger.info(f'Preset found in cache: {preset_id}')
-            return KasaPreset.from_dict(
+            return KasaPreset.from_entity(
                 data=preset)
 
         logger.info(f'Fetching preset from database: {preset_id}')
@@ -160,7 +160,7 @@ class KasaPresetSevice:
                 ttl=CacheExpiration.hours(24)))
 
         # Create preset model from document
-        kasa_preset = KasaPreset.from_dict(
+        kasa_preset = KasaPreset.from_entity(
             data=entity)
 
         return kasa_preset
@@ -186,7 +186,7 @@ class KasaPresetSevice:
                 preset_id=preset_id)
 
         # Parse preset model from document
-        kasa_preset = KasaPreset.from_dict(
+        kasa_preset = KasaPreset.from_entity(
             data=preset)
 
         logger.info(f'Deleting preset: {kasa_preset.preset_id}')
@@ -230,7 +230,7 @@ class KasaPresetSevice:
                 value=preset_entities,
                 ttl=CacheExpiration.hours(24)))
 
-        presets = [KasaPreset.from_dict(data=entity)
+        presets = [KasaPreset.from_entity(data=entity)
                    for entity in preset_entities]
 
         return presets
@@ -259,7 +259,7 @@ class KasaPresetSevice:
                 value=preset_entities,
                 ttl=CacheExpiration.hours(24)))
 
-        presets = [KasaPreset.from_dict(data=entity)
+        presets = [KasaPreset.from_entity(data=entity)
                    for entity in preset_entities]
 
         return presets
@@ -0,0 +1,286 @@
+import asyncio
+import random
+import socket
+import time
+import uuid
+from typing import Dict
+
+from data.repositories.kasa_device_repository import KasaDeviceRepository
+from data.repositories.kasa_lease_repository import KasaLeaseRepository
+from domain.constants import KasaDeviceType
+from domain.features import FeatureKey
+from domain.kasa.client_response import KasaClientResponse
+from domain.kasa.device import KasaDevice
+from domain.kasa.devices.light import KasaLight
+from domain.kasa.devices.plug import KasaPlug
+from domain.kasa.preset import KasaPreset
+from framework.clients.feature_client import FeatureClientAsync
+from framework.configuration import Configuration
+from framework.logger.providers import get_logger
+from services.kasa_client_response_service import KasaClientResponseService
+from services.kasa_device_service import KasaDeviceService
+from services.kasa_preset_service import KasaPresetSevice
+from utils.helpers import get_config_section
+
+logger = get_logger(__name__)
+
+RECONCILER_LEASE_NAME = 'kasa-reconciler'
+
+
+class KasaReconcilerService:
+    '''
+    Background loop that compares the state of synced
+    devices against their last requested state and
+    re-applies the preset when a device has drifted
+    '''
+
+    def __init__(
+        self,
+        configuration: Configuration,
+        device_repository: KasaDeviceRepository,
+        device_service: KasaDeviceService,
+        preset_service: KasaPresetSevice,
+        client_response_service: KasaClientResponseService,
+        lease_repository: KasaLeaseRepository,
+        feature_client: FeatureClientAsync
+    ):
+        self._device_repository = device_repository
+        self._device_service = device_service
+        self._preset_service = preset_service
+        self._client_response_service = client_response_service
+        self._lease_repository = lease_repository
+        self._feature_client = feature_client
+
+        settings = get_config_section(
+            configuration, 'reconciler')
+
+        self._enabled = settings.get('enabled', False)
+        self._interval = settings.get('interval_seconds', 300)
+        self._jitter = settings.get('jitter_seconds', 30)
+        self._concurrency = settings.get('concurrency', 4)
+        self._max_state_age = settings.get('max_state_age_seconds', 0)
+
+        # The lease outlives a run so the leader keeps it
+        # across intervals, it's renewed on each run
+        self._lease_seconds = settings.get(
+            'lease_seconds', self._interval * 2)
+
+        self._holder = f'{socket.gethostname()}-{uuid.uuid4().hex[:8]}'
+        self._task: asyncio.Task = None
+
+        self._runs = 0
+        self._skipped = 0
+        self._checked = 0
+        self._drifted = 0
+        self._reapplied = 0
+        self._errors = 0
+        self._is_leader = False
+        self._last_run_duration = None
+
+    @property
+    def is_running(
+        self
+    ) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(
+        self
+    ) -> None:
+        '''
+        Start the reconciliation loop if it's enabled
+        '''
+
+        if not self._enabled or self.is_running:
+            return
+
+        logger.info(f'Starting device reconciler: {self._holder}')
+
+        self._task = asyncio.create_task(
+            self._run())
+
+    async def stop(
+        self
+    ) -> None:
+        '''
+        Stop the reconciliation loop and hand off the
+        lease to another replica
+        '''
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._is_leader:
+            await self._lease_repository.release(
+                lease_name=RECONCILER_LEASE_NAME,
+                holder=self._holder)
+            self._is_leader = False
+
+    def get_next_delay(
+        self
+    ) -> float:
+        # Jitter so replicas and restarts don't line up
+        # on the same schedule
+        return self._interval + random.uniform(0, self._jitter)
+
+    async def run_once(
+        self
+    ) -> dict:
+        '''
+        Run a single reconciliation pass if this replica
+        holds the lease
+        '''
+
+        is_enabled = await self._feature_client.is_enabled(
+            feature_key=FeatureKey.KasaAutomatedSync)
+
+        if not is_enabled:
+            logger.info('Automated sync disabled, skipping reconciliation')
+            self._skipped += 1
+            return self.get_metrics()
+
+        self._is_leader = await self._lease_repository.try_acquire(
+            lease_name=RECONCILER_LEASE_NAME,
+            holder=self._holder,
+            lease_seconds=self._lease_seconds)
+
+        if not self._is_leader:
+            logger.info('Reconciler lease held by another replica')
+            self._skipped += 1
+            return self.get_metrics()
+
+        started = time.perf_counter()
+
+        entities = await self._device_repository.get_automated_sync_devices()
+        devices = [KasaDevice.from_entity(data=entity)
+                   for entity in entities]
+
+        logger.info(f'Reconciling {len(devices)} synced devices')
+
+        # Batch read the last requested state for every
+        # device in one query
+        client_responses = await self._client_response_service.get_client_responses(
+            device_ids=[device.device_id for device in devices])
+
+        desired = {
+            client_response.device_id: client_response
+            for client_response in client_responses
+        }
+
+        presets: Dict[str, KasaPreset] = dict()
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def reconcile(device: KasaDevice):
+            async with semaphore:
+                try:
+                    await self._reconcile_device(
+                        device=device,
+                        client_response=desired.get(device.device_id),
+                        presets=presets)
+                except Exception as ex:
+                    self._errors += 1
+                    logger.exception(
+                        f'{device.device_id}: Failed to reconcile device: {str(ex)}')
+
+        await asyncio.gather(*[
+            reconcile(device) for device in devices
+            if device.device_id in desired
+        ])
+
+        self._runs += 1
+        self._last_run_duration = round(
+            time.perf_counter() - started, 3)
+
+        logger.info(
+            f'Reconciled {len(devices)} devices in {self._last_run_duration}s')
+
+        return self.get_metrics()
+
+    def get_metrics(
+        self
+    ) -> dict:
+        return {
+            'enabled': self._enabled,
+            'running': self.is_running,
+            'holder': self._holder,
+            'is_leader': self._is_leader,
+            'runs': self._runs,
+            'skipped': self._skipped,
+            'checked': self._checked,
+            'drifted': self._drifted,
+            'reapplied': self._reapplied,
+            'errors': self._errors,
+            'last_run_duration': self._last_run_duration
+        }
+
+    async def _get_preset(
+        self,
+        preset_id: str,
+        presets: Dict[str, KasaPreset]
+    ) -> KasaPreset:
+        # Drifted devices usually share a handful of
+        # presets, fetch each once per run
+        if preset_id not in presets:
+            presets[preset_id] = await self._preset_service.get_preset(
+                preset_id=preset_id)
+
+        return presets[preset_id]
+
+    async def _reconcile_device(
+        self,
+        device: KasaDevice,
+        client_response: KasaClientResponse,
+        presets: Dict[str, KasaPreset]
+    ) -> bool:
+        shadow = await self._device_service.get_device_state(
+            device_id=device.device_id,
+            max_age=self._max_state_age)
+
+        self._checked += 1
+
+        if device.device_type == KasaDeviceType.KasaLight:
+            reported = KasaLight.from_device_object(
+                device_object=shadow.reported)
+        elif device.device_type == KasaDeviceType.KasaPlug:
+            reported = KasaPlug.from_device_object(
+                device_object=shadow.reported)
+        else:
+            return False
+
+        if reported.state_key() == client_response.state_key:
+            return False
+
+        logger.info(
+            f'{device.device_id}: Device drifted from preset {client_response.preset_id}')
+
+        self._drifted += 1
+
+        preset = await self._get_preset(
+            preset_id=client_response.preset_id,
+            presets=presets)
+
+        await self._device_service.set_device_state(
+            device=device,
+            preset=preset)
+
+        self._reapplied += 1
+
+        return True
+
+    async def _run(
+        self
+    ) -> None:
+        while True:
+            await asyncio.sleep(self.get_next_delay())
+
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                self._errors += 1
+                logger.exception(f'Device reconciliation failed: {str(ex)}')
@@ -89,7 +89,7 @@ class KasaSceneService:
 
         if scene is not None:
             logger.info(f'Returning cached scene: {scene_id}')
-            return KasaScene.from_dict(data=scene)
+            return KasaScene.from_entity(data=scene)
 
         logger.info(f'Fetching scene from db: {scene_id}')
         scene = await self._scene_repository.get_scene_by_id(
@@ -106,7 +106,7 @@ class KasaSceneService:
             value=scene,
             ttl=CacheExpiration.hours(1)))
 
-        return KasaScene.from_dict(
+        return KasaScene.from_entity(
             data=scene)
 
     async def delete_scene(
@@ -131,7 +131,7 @@ class KasaSceneService:
             raise SceneNotFoundException(
                 scene_id=scene_id)
 
-        scene = KasaScene.from_dict(data=scene)
+        scene = KasaScene.from_entity(data=scene)
 
         # Delete the scene
         delete_result = await self._scene_repository.delete(
@@ -218,7 +218,7 @@ class KasaSceneService:
         else:
             logger.info('Returning cached scenes')
 
-        kasa_scenes = [KasaScene.from_dict(data=entity)
+        kasa_scenes = [KasaScene.from_entity(data=entity)
                        for entity in entities]
 
         return kasa_scenes
@@ -239,7 +239,7 @@ class KasaSceneService:
             logger.info(f'No scenes found for category: {scene_category_id}')
             return list()
 
-        scenes = [KasaScene.from_dict(data=entity)
+        scenes = [KasaScene.from_entity(data=entity)
                   for entity in entities]
 
         return scenes
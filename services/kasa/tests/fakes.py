@@ -0,0 +1,124 @@
+import asyncio
+import json
+import struct
+
+from clients.kasa_transport import decrypt, encrypt, obfuscate
+from domain.constants import KasaDeviceType
+
+
+class FakeKasaDevice:
+    '''
+    Local protocol device server for transport tests,
+    answers get_sysinfo and set_relay_state over TCP and
+    the discovery probe over UDP
+    '''
+
+    def __init__(
+        self,
+        device_id: str,
+        alias: str = 'Fake Plug'
+    ):
+        self.sysinfo = {
+            'deviceId': device_id,
+            'alias': alias,
+            'mic_type': KasaDeviceType.KasaPlug,
+            'relay_state': 0,
+            'err_code': 0
+        }
+
+        self.requests = list()
+        self._server: asyncio.AbstractServer = None
+        self._discovery: asyncio.DatagramTransport = None
+
+    @property
+    def port(
+        self
+    ) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    @property
+    def discovery_port(
+        self
+    ) -> int:
+        return self._discovery.get_extra_info('sockname')[1]
+
+    async def start(
+        self
+    ) -> None:
+        self._server = await asyncio.start_server(
+            self._handle,
+            host='127.0.0.1',
+            port=0)
+
+        self._discovery, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: FakeDiscoveryProtocol(self),
+            local_addr=('127.0.0.1', 0))
+
+    async def stop(
+        self
+    ) -> None:
+        self._discovery.close()
+        self._server.close()
+        await self._server.wait_closed()
+
+    def respond(
+        self,
+        request: dict
+    ) -> dict:
+        system = request.get('system', dict())
+        response = dict()
+
+        if 'set_relay_state' in system:
+            self.sysinfo['relay_state'] = system.get(
+                'set_relay_state').get('state')
+            response['set_relay_state'] = {'err_code': 0}
+
+        if 'get_sysinfo' in system:
+            response['get_sysinfo'] = dict(self.sysinfo)
+
+        return {'system': response}
+
+    async def _handle(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            header = await reader.readexactly(4)
+            length = struct.unpack('>I', header)[0]
+
+            request = json.loads(decrypt(
+                await reader.readexactly(length)))
+            self.requests.append(request)
+
+            writer.write(encrypt(
+                json.dumps(self.respond(request)).encode()))
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+class FakeDiscoveryProtocol(asyncio.DatagramProtocol):
+    def __init__(
+        self,
+        device: FakeKasaDevice
+    ):
+        self._device = device
+
+    def connection_made(
+        self,
+        transport: asyncio.DatagramTransport
+    ) -> None:
+        self._transport = transport
+
+    def datagram_received(
+        self,
+        data: bytes,
+        addr: tuple
+    ) -> None:
+        # Discovery datagrams carry no length prefix
+        request = json.loads(decrypt(data))
+
+        self._transport.sendto(
+            obfuscate(json.dumps(self._device.respond(request)).encode()),
+            addr)
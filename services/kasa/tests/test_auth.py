@@ -0,0 +1,100 @@
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from clients.jwks_client import JwksClient
+from domain.exceptions import ForbiddenException, UnauthorizedException
+from domain.kasa.auth import AdRole, AuthPolicy
+from services.kasa_auth_service import KasaAuthService
+
+AUDIENCE = 'api://kasa-test'
+ISSUER = 'https://issuer.test'
+KID = 'test-key'
+
+
+class KasaAuthServiceTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.private_key = rsa.generate_private_key(
+            public_exponent=65537,
+            key_size=2048)
+
+        jwk = jwt.algorithms.RSAAlgorithm.to_jwk(
+            self.private_key.public_key(),
+            as_dict=True)
+        jwk.update({'kid': KID, 'use': 'sig', 'alg': 'RS256'})
+
+        response = MagicMock()
+        response.is_error = False
+        response.json.return_value = {'keys': [jwk]}
+
+        self.http_client = AsyncMock()
+        self.http_client.get.return_value = response
+
+        configuration = SimpleNamespace(
+            ad_auth=SimpleNamespace(
+                tenant_id='test-tenant',
+                audiences=[AUDIENCE],
+                issuer=ISSUER),
+            auth=dict())
+
+        self.service = KasaAuthService(
+            configuration=configuration,
+            jwks_client=JwksClient(
+                configuration=configuration,
+                http_client=self.http_client))
+
+    def get_token(self, roles, expires_in=3600):
+        return jwt.encode(
+            {
+                'aud': AUDIENCE,
+                'iss': ISSUER,
+                'exp': int(time.time()) + expires_in,
+                'roles': roles
+            },
+            key=self.private_key,
+            algorithm='RS256',
+            headers={'kid': KID})
+
+    async def test_authorize_caches_verified_token(self):
+        # Arrange
+        token = self.get_token(roles=[AdRole.Read])
+
+        # Act
+        for _ in range(5):
+            claims = await self.service.authorize(
+                token=token,
+                policy=AuthPolicy.Read)
+
+        metrics = self.service.get_metrics().get('tokens')
+
+        # Assert
+        self.assertEqual(claims.get('roles'), [AdRole.Read])
+        self.assertEqual(self.http_client.get.call_count, 1)
+        self.assertEqual(metrics.get('misses'), 1)
+        self.assertEqual(metrics.get('hits'), 4)
+
+    async def test_authorize_missing_role_forbidden(self):
+        # Arrange
+        token = self.get_token(roles=[AdRole.Read])
+
+        # Act / Assert
+        with self.assertRaises(ForbiddenException):
+            await self.service.authorize(
+                token=token,
+                policy=AuthPolicy.Write)
+
+    async def test_authorize_expired_token_unauthorized(self):
+        # Arrange
+        token = self.get_token(
+            roles=[AdRole.Read],
+            expires_in=-60)
+
+        # Act / Assert
+        with self.assertRaises(UnauthorizedException):
+            await self.service.authorize(
+                token=token,
+                policy=AuthPolicy.Read)
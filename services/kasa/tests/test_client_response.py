@@ -1,10 +1,15 @@
+import unittest
 import uuid
 from datetime import datetime
+from unittest.mock import AsyncMock
 
 from data.repositories.kasa_client_response_repository import \
     KasaClientResponseRepository
+from domain.exceptions import InvalidClientResponseRequestException
 from domain.kasa.client_response import KasaClientResponse
 from domain.rest import UpdateClientResponseRequest
+from providers.kasa_client_response_provider import \
+    KasaClientResponseProvider
 from services.kasa_client_response_service import KasaClientResponseService
 from tests.buildup import ApplicationBase
 from tests.helpers import TestHelper
@@ -128,3 +133,107 @@ class KasaClientResponseTests(ApplicationBase):
         self.assertIsNotNone(updated_record)
         self.assertEqual(updated_value, update_id)
         self.assertEqual(insert_result.acknowledged, True)
+
+    async def test_update_client_responses(self):
+        # Arrange
+        service: KasaClientResponseService = self.resolve(
+            KasaClientResponseService)
+        repository: KasaClientResponseRepository = self.resolve(
+            KasaClientResponseRepository)
+
+        existing_device_id = str(uuid.uuid4())
+        new_device_id = str(uuid.uuid4())
+        update_id = str(uuid.uuid4())
+
+        await repository.insert({
+            'client_response_id': str(uuid.uuid4()),
+            'device_id': existing_device_id,
+            'preset_id': str(uuid.uuid4()),
+            'client_response': dict(),
+            'state_key': str(uuid.uuid4()),
+            'created_date': datetime.now(),
+            'modified_date': datetime.now()
+        })
+
+        requests = [
+            UpdateClientResponseRequest({
+                'device_id': device_id,
+                'preset_id': str(uuid.uuid4()),
+                'client_response': {'test': update_id},
+                'state_key': str(uuid.uuid4())
+            })
+            for device_id in [existing_device_id, new_device_id]
+        ]
+
+        # Invalid request w/o a client response
+        requests.append(UpdateClientResponseRequest({
+            'device_id': str(uuid.uuid4())
+        }))
+
+        # Act
+        result = await service.update_client_responses(
+            requests=requests)
+
+        entities = await repository.get_client_responses(
+            device_ids=[existing_device_id, new_device_id])
+
+        # Assert
+        self.assertEqual(result.upserted, 1)
+        self.assertEqual(result.modified, 1)
+        self.assertEqual(len(result.rejected), 1)
+        self.assertEqual(len(entities), 2)
+
+        for entity in entities:
+            client_response = KasaClientResponse.from_entity(
+                data=entity)
+            self.assertEqual(
+                client_response.client_response.get('test'), update_id)
+            self.assertIsNotNone(client_response.client_response_id)
+
+    async def test_queue_client_response_written_on_stop(self):
+        # Arrange
+        service: KasaClientResponseService = self.resolve(
+            KasaClientResponseService)
+        repository: KasaClientResponseRepository = self.resolve(
+            KasaClientResponseRepository)
+
+        device_id = str(uuid.uuid4())
+        update_id = str(uuid.uuid4())
+
+        # Act
+        queued = service.queue_client_response(
+            request=UpdateClientResponseRequest({
+                'device_id': device_id,
+                'preset_id': str(uuid.uuid4()),
+                'client_response': {'test': update_id},
+                'state_key': str(uuid.uuid4())
+            }))
+
+        await service.stop()
+
+        entities = await repository.get_client_responses(
+            device_ids=[device_id])
+
+        # Assert
+        self.assertTrue(queued)
+        self.assertEqual(len(entities), 1)
+        self.assertEqual(service.get_metrics().get('flushed'), 1)
+
+
+class KasaClientResponseProviderTests(unittest.IsolatedAsyncioTestCase):
+    async def test_update_client_responses_requires_list(self):
+        # Arrange
+        service = AsyncMock()
+        provider = KasaClientResponseProvider(
+            kasa_client_response_service=service)
+
+        # Act / Assert
+        with self.assertRaises(InvalidClientResponseRequestException):
+            await provider.update_client_responses(
+                body={'device_id': str(uuid.uuid4())})
+
+        with self.assertRaises(InvalidClientResponseRequestException):
+            await provider.update_client_responses(
+                body=['device_id'])
+
+        service.update_client_responses.assert_not_called()
@@ -0,0 +1,45 @@
+import unittest
+
+from utils.concurrency import BatchProcessor
+
+
+class BatchProcessorTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.batches = list()
+
+        async def handler(batch):
+            self.batches.append(batch)
+
+        self.processor = BatchProcessor(
+            name='test',
+            handler=handler,
+            flush_interval=0.01)
+
+    async def test_stop_flushes_queued_items(self):
+        # Arrange
+        self.processor.enqueue(1)
+        self.processor.enqueue(2)
+
+        # Act
+        await self.processor.stop()
+
+        # Assert
+        self.assertEqual(sum(self.batches, list()), [1, 2])
+
+    async def test_enqueue_after_stop_dropped(self):
+        # Arrange
+        self.processor.enqueue(1)
+        await self.processor.stop()
+
+        # Act
+        queued = self.processor.enqueue(2)
+        put = await self.processor.put(3)
+
+        # Assert
+        metrics = self.processor.get_metrics()
+
+        self.assertFalse(queued)
+        self.assertFalse(put)
+        self.assertFalse(self.processor.is_running)
+        self.assertEqual(metrics.get('dropped'), 2)
+        self.assertEqual(metrics.get('queue_depth'), 0)
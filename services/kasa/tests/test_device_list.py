@@ -0,0 +1,51 @@
+import unittest
+import uuid
+
+from domain.constants import KasaDeviceType
+from domain.kasa.device_list import KasaDeviceList, KasaDeviceStatus
+
+
+def get_kasa_device(device_id, status=KasaDeviceStatus.Online, **kwargs):
+    return {
+        'deviceId': device_id,
+        'alias': device_id,
+        'deviceType': KasaDeviceType.KasaPlug,
+        'status': status,
+        'appServerUrl': 'https://use1-wap.tplinkcloud.com'
+    } | kwargs
+
+
+class KasaDeviceListTests(unittest.TestCase):
+    def setUp(self):
+        self.device_ids = [str(uuid.uuid4()) for _ in range(3)]
+
+    def test_fingerprint_ignores_order_and_irrelevant_fields(self):
+        # Arrange
+        devices = [get_kasa_device(device_id)
+                   for device_id in self.device_ids]
+        reordered = [get_kasa_device(device_id, fwVer='1.0.1')
+                     for device_id in reversed(self.device_ids)]
+
+        # Act
+        first = KasaDeviceList(devices=devices)
+        second = KasaDeviceList(devices=reordered)
+
+        # Assert
+        self.assertEqual(first.fingerprint, second.fingerprint)
+
+    def test_fingerprint_changes_with_status(self):
+        # Arrange
+        devices = [get_kasa_device(device_id)
+                   for device_id in self.device_ids]
+        offline = devices[:-1] + [get_kasa_device(
+            self.device_ids[-1],
+            status=KasaDeviceStatus.Offline)]
+
+        # Act
+        first = KasaDeviceList(devices=devices)
+        second = KasaDeviceList(devices=offline)
+
+        # Assert
+        self.assertNotEqual(first.fingerprint, second.fingerprint)
+        self.assertFalse(second.get_statuses().get(self.device_ids[-1]))
+        self.assertTrue(second.get_statuses().get(self.device_ids[0]))
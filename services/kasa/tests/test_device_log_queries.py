@@ -0,0 +1,77 @@
+import datetime
+import unittest
+
+from data.constants import DeviceLogConstants
+from domain.queries import DeviceLogAnalyticsKey, GetDeviceLogAnalyticsQuery
+
+START = int(datetime.datetime(2024, 5, 1, 13, 30, tzinfo=datetime.UTC).timestamp())
+END = int(datetime.datetime(2024, 5, 2, 9, 0, tzinfo=datetime.UTC).timestamp())
+
+
+class GetDeviceLogAnalyticsQueryTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.query = GetDeviceLogAnalyticsQuery(
+            start_timestamp=START,
+            end_timestamp=END,
+            bucket='hour')
+
+    def test_get_pipeline_facets_devices_and_presets(self):
+        # Act
+        pipeline = self.query.get_pipeline()
+
+        # Assert
+        match, facet = pipeline
+
+        self.assertEqual(match, {'$match': self.query.get_query()})
+        self.assertEqual(
+            match['$match']['timestamp']['$gte'],
+            datetime.datetime(2024, 5, 1, 13, 30, tzinfo=datetime.UTC))
+        self.assertEqual(set(facet['$facet']), {'devices', 'presets'})
+
+        group = facet['$facet']['devices'][0]['$group']
+        self.assertEqual(group['_id']['key'], '$metadata.device_id')
+        self.assertEqual(group['_id']['bucket'], {'$dateTrunc': {
+            'date': '$timestamp',
+            'unit': 'hour'
+        }})
+        self.assertEqual(
+            group['latency']['$percentile']['p'],
+            DeviceLogConstants.LatencyPercentiles)
+
+        preset_group = facet['$facet']['presets'][0]['$group']
+        self.assertEqual(preset_group['_id']['key'], '$preset_id')
+        self.assertEqual(preset_group['name'], {'$last': '$preset_name'})
+
+    def test_get_rollup_pipeline_merges_into_collection(self):
+        # Act
+        pipeline = self.query.get_rollup_pipeline(
+            key_type=DeviceLogAnalyticsKey.Preset,
+            collection='rollups')
+
+        # Assert
+        self.assertEqual(pipeline[0], {'$match': self.query.get_query()})
+        self.assertEqual(
+            pipeline[1]['$group']['_id']['key_type'],
+            DeviceLogAnalyticsKey.Preset)
+        self.assertEqual([list(stage)[0] for stage in pipeline],
+                         ['$match', '$group', '$set', '$sort', '$merge'])
+        self.assertEqual(pipeline[-1], {'$merge': {
+            'into': 'rollups',
+            'on': '_id',
+            'whenMatched': 'replace',
+            'whenNotMatched': 'insert'
+        }})
+
+    def test_get_rollup_query_truncates_start_to_day(self):
+        # Act
+        query = self.query.get_rollup_query(
+            key_type=DeviceLogAnalyticsKey.Device)
+
+        # Assert
+        self.assertEqual(query, {
+            '_id.key_type': DeviceLogAnalyticsKey.Device,
+            '_id.bucket': {
+                '$gte': datetime.datetime(2024, 5, 1, tzinfo=datetime.UTC),
+                '$lte': datetime.datetime(2024, 5, 2, 9, 0, tzinfo=datetime.UTC)
+            }
+        })
@@ -0,0 +1,80 @@
+from data.repositories.kasa_device_repository import KasaDeviceLogRepository
+from domain.kasa.device import DeviceLog
+from domain.queries import DeviceLogCursor, GetDeviceLogsByTimestampRangeQuery
+from services.kasa_device_log_service import KasaDeviceLogService
+from tests.buildup import ApplicationBase
+from utils.helpers import DateTimeUtil
+
+
+class KasaDeviceLogServiceTests(ApplicationBase):
+    async def asyncSetUp(self) -> None:
+        self.repo: KasaDeviceLogRepository = self.resolve(
+            KasaDeviceLogRepository)
+        self.service: KasaDeviceLogService = self.resolve(
+            KasaDeviceLogService)
+
+    def get_test_log(self, device_id):
+        return DeviceLog(
+            log_id=self.guid(),
+            timestamp=DateTimeUtil.timestamp(),
+            level='INFO',
+            device_id=device_id,
+            device_name=self.guid(),
+            preset_id=self.guid(),
+            preset_name=self.guid(),
+            state_key=self.guid(),
+            message=self.guid())
+
+    async def test_capture_device_logs_flushed_on_stop(self):
+        # Arrange
+        device_id = self.guid()
+
+        # Act
+        for _ in range(10):
+            await self.service.capture_device_log(
+                log=self.get_test_log(device_id=device_id))
+
+        await self.service.stop()
+
+        logs = await self.repo.collection.find({
+            'metadata.device_id': device_id
+        }).to_list(length=None)
+
+        # Assert
+        self.assertEqual(len(logs), 10)
+        self.assertEqual(self.service.get_metrics().get('flushed'), 10)
+
+    async def test_get_device_logs_paginated(self):
+        # Arrange
+        device_id = self.guid()
+        timestamp = DateTimeUtil.timestamp()
+
+        logs = [self.get_test_log(device_id=device_id)
+                for _ in range(5)]
+
+        await self.repo.insert_logs(
+            documents=[log.to_entity() for log in logs])
+
+        query = GetDeviceLogsByTimestampRangeQuery(
+            start_timestamp=timestamp - 60,
+            end_timestamp=timestamp + 60,
+            device_id=device_id)
+
+        # Act
+        fetched = list()
+        page = await self.service.get_device_logs(
+            query=query,
+            limit=2)
+        fetched.extend(page.logs)
+
+        while page.cursor is not None:
+            query.cursor = DeviceLogCursor.decode(page.cursor)
+            page = await self.service.get_device_logs(
+                query=query,
+                limit=2)
+            fetched.extend(page.logs)
+
+        # Assert
+        self.assertEqual(
+            sorted([log.log_id for log in fetched]),
+            sorted([log.log_id for log in logs]))
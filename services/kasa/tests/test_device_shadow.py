@@ -0,0 +1,113 @@
+import asyncio
+import unittest
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+from clients.kasa_client import KasaClient
+from domain.constants import DeviceShadowSource
+from services.kasa_device_service import KasaDeviceService
+from services.kasa_device_shadow_service import KasaDeviceShadowService
+from tests.buildup import ApplicationBase
+
+
+class KasaDeviceShadowTests(ApplicationBase):
+    def configure_services(self, service_collection):
+        self.kasa_client = AsyncMock()
+
+        service_collection.add_singleton(
+            dependency_type=KasaClient,
+            factory=lambda container: self.kasa_client)
+
+    async def asyncSetUp(self) -> None:
+        self.shadow_service: KasaDeviceShadowService = self.resolve(
+            KasaDeviceShadowService)
+        self.device_service: KasaDeviceService = self.resolve(
+            KasaDeviceService)
+
+    async def test_reported_state_served_from_shadow(self):
+        # Arrange
+        device_id = self.guid()
+
+        await self.shadow_service.record_reported_state(
+            device_id=device_id,
+            reported={'relay_state': 1},
+            source=DeviceShadowSource.Poll)
+
+        # Act
+        shadow = await self.device_service.get_device_state(
+            device_id=device_id,
+            max_age=60)
+
+        # Assert
+        self.assertEqual(shadow.reported, {'relay_state': 1})
+        self.assertFalse(shadow.get_freshness(max_age=60).get('stale'))
+        self.kasa_client.get_device_state.assert_not_called()
+
+    async def test_desired_state_marks_shadow_out_of_sync(self):
+        # Arrange
+        device_id = self.guid()
+
+        await self.shadow_service.record_reported_state(
+            device_id=device_id,
+            reported={'relay_state': 0})
+
+        await self.shadow_service.record_desired_state(
+            device_id=device_id,
+            desired={'state': True},
+            preset_id=self.guid(),
+            state_key=self.guid())
+
+        response = MagicMock()
+        response.is_error = False
+        response.device_object = {'relay_state': 1}
+        self.kasa_client.get_device_state.return_value = response
+
+        # Act
+        fresh = await self.shadow_service.get_fresh_shadow(
+            device_id=device_id,
+            max_age=60)
+
+        shadow = await self.device_service.get_device_state(
+            device_id=device_id,
+            max_age=60)
+
+        # Assert
+        self.assertIsNone(fresh)
+        self.assertTrue(shadow.in_sync)
+        self.assertEqual(shadow.reported, {'relay_state': 1})
+        self.assertEqual(shadow.reported_source, DeviceShadowSource.Read)
+        self.kasa_client.get_device_state.assert_called_once()
+
+
+class KasaDeviceShadowStatusTests(unittest.IsolatedAsyncioTestCase):
+    async def test_record_online_statuses_loads_shadows_concurrently(self):
+        # Arrange
+        cache_client = AsyncMock()
+
+        active = 0
+        peak = 0
+
+        async def get_json(key):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+        cache_client.get_json.side_effect = get_json
+
+        shadow_service = KasaDeviceShadowService(
+            configuration=MagicMock(shadow={}),
+            cache_client=cache_client)
+
+        statuses = {str(uuid.uuid4()): index % 2 == 0
+                    for index in range(10)}
+
+        # Act
+        changed = await shadow_service.record_online_statuses(
+            statuses=statuses)
+
+        # Assert
+        self.assertEqual(changed, 10)
+        self.assertEqual(peak, 10)
+        self.assertEqual(cache_client.get_json.call_count, 10)
@@ -1,6 +1,17 @@
+import asyncio
+import unittest
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
 from requests import delete
+from clients.kasa_client import KasaClient
+from framework.clients.cache_client import CacheClientAsync
 from data.repositories.kasa_device_repository import KasaDeviceRepository
+from domain.constants import ClientResponseMode, KasaDeviceType
+from domain.kasa.device_list import KasaDeviceList
 from domain.kasa.devices.plug import KasaPlug
+from domain.kasa.preset import KasaPreset
+from providers.kasa_device_provider import KasaDeviceProvider
 from services.kasa_device_service import KasaDeviceService
 from tests.buildup import ApplicationBase
 from tests.helpers import TestHelper
@@ -46,3 +57,208 @@ class KasaDeviceServiceTests(ApplicationBase):
         device_list = await self.service.get_all_devices()
 
         self.assertTrue(len(device_list) > 0)
+
+
+class KasaDeviceSyncTests(ApplicationBase):
+    def configure_services(self, service_collection):
+        self.kasa_client = AsyncMock()
+
+        service_collection.add_singleton(
+            dependency_type=KasaClient,
+            factory=lambda container: self.kasa_client)
+
+    async def asyncSetUp(self) -> None:
+        self.repo: KasaDeviceRepository = self.resolve(
+            KasaDeviceRepository)
+        self.service: KasaDeviceService = self.resolve(
+            KasaDeviceService)
+
+    def get_kasa_device(self, device_id, alias):
+        return {
+            'deviceId': device_id,
+            'alias': alias,
+            'deviceType': KasaDeviceType.KasaPlug
+        }
+
+    async def test_sync_devices(self):
+        # Arrange
+        existing = helper.get_test_device()
+        await self.repo.insert(existing)
+
+        renamed = self.guid()
+        missing_id = self.guid()
+
+        self.kasa_client.get_device_list.return_value = KasaDeviceList(
+            devices=[
+                self.get_kasa_device(existing.get('device_id'), renamed),
+                self.get_kasa_device(missing_id, self.guid())
+            ])
+
+        # Act
+        result = await self.service.sync_devices(
+            destructive=False)
+
+        updated = await self.repo.get_device_by_id(
+            device_id=existing.get('device_id'))
+        created = await self.repo.get_device_by_id(
+            device_id=missing_id)
+
+        # Assert
+        self.assertIsNotNone(result.duration)
+        self.assertFalse(result.unchanged)
+        self.assertIsNotNone(created)
+        self.assertEqual(updated.get('device_name'), renamed)
+        self.assertEqual(updated.get('region_id'), existing.get('region_id'))
+
+    async def test_sync_devices_reconciles_local_removals(self):
+        # Arrange
+        device_id = self.guid()
+        self.kasa_client.get_device_list.return_value = KasaDeviceList(
+            devices=[self.get_kasa_device(device_id, self.guid())])
+
+        cache_client = self.resolve(CacheClientAsync)
+
+        await self.service.sync_devices(
+            destructive=False)
+        await asyncio.sleep(0)
+
+        cache_client.get_cache.return_value = (
+            cache_client.set_cache.call_args.kwargs.get('value'))
+
+        unchanged = await self.service.sync_devices(
+            destructive=False)
+
+        # Act
+        await self.repo.delete({
+            'device_id': device_id
+        })
+
+        result = await self.service.sync_devices(
+            destructive=False)
+
+        # Assert
+        self.assertTrue(unchanged.unchanged)
+        self.assertFalse(result.unchanged)
+        self.assertIsNotNone(
+            await self.repo.get_device_by_id(device_id=device_id))
+
+
+class KasaDeviceStateBatchTests(ApplicationBase):
+    def configure_services(self, service_collection):
+        self.kasa_client = AsyncMock()
+
+        service_collection.add_singleton(
+            dependency_type=KasaClient,
+            factory=lambda container: self.kasa_client)
+
+    async def asyncSetUp(self) -> None:
+        self.provider_service: KasaDeviceProvider = self.resolve(
+            KasaDeviceProvider)
+
+    def get_state_response(self, device_id, relay_state=1):
+        response = MagicMock()
+        response.is_error = False
+        response.device_object = {
+            'deviceId': device_id,
+            'alias': device_id,
+            'mic_type': KasaDeviceType.KasaPlug,
+            'relay_state': relay_state
+        }
+
+        return response
+
+    async def test_get_device_states_removes_duplicate_ids(self):
+        # Arrange
+        device_id = self.guid()
+
+        self.kasa_client.get_device_state.side_effect = (
+            lambda device_id: self.get_state_response(device_id))
+
+        # Act
+        result = await self.provider_service.get_device_states(
+            body={'device_ids': [device_id, device_id], 'max_age': 0})
+
+        # Assert
+        self.kasa_client.get_device_state.assert_called_once()
+        self.assertEqual(result.get('count'), 1)
+        self.assertEqual(
+            result.get('states')[0].get('state').get('state'), True)
+
+    async def test_get_device_states_per_device_errors(self):
+        # Arrange
+        device_id = self.guid()
+        failed_device_id = self.guid()
+
+        failed = MagicMock()
+        failed.is_error = True
+        failed.error_message = 'Device is offline'
+
+        self.kasa_client.get_device_state.side_effect = (
+            lambda device_id: (failed if device_id == failed_device_id
+                               else self.get_state_response(device_id)))
+
+        # Act
+        result = await self.provider_service.get_device_states(
+            body={'device_ids': [device_id, failed_device_id],
+                  'max_age': 0})
+
+        # Assert
+        states = {state.get('device_id'): state
+                  for state in result.get('states')}
+
+        self.assertEqual(result.get('errors'), 1)
+        self.assertIsNone(states.get(device_id).get('error'))
+        self.assertIn('Device is offline',
+                      states.get(failed_device_id).get('error'))
+
+
+class KasaDeviceSetStateTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.kasa_client = AsyncMock()
+        self.kasa_client.set_device_state.return_value = MagicMock(
+            is_error=False,
+            data={'error_code': 0},
+            latency=10)
+
+        self.shadow_service = AsyncMock()
+        self.client_response_service = MagicMock()
+        self.event_service = AsyncMock()
+
+        self.service = KasaDeviceService(
+            configuration=MagicMock(events={
+                'client_response_mode': ClientResponseMode.Both
+            }),
+            kasa_client=self.kasa_client,
+            device_repository=AsyncMock(),
+            region_service=AsyncMock(),
+            cache_client=AsyncMock(),
+            client_response_service=self.client_response_service,
+            event_service=self.event_service,
+            device_log_service=AsyncMock(),
+            shadow_service=self.shadow_service)
+
+    async def test_shadow_error_does_not_fail_set_state(self):
+        # Arrange
+        device = KasaPlug(
+            device_id=str(uuid.uuid4()),
+            device_name='Test Plug',
+            state=False)
+        preset = KasaPreset.from_dict(data={
+            'preset_id': str(uuid.uuid4()),
+            'preset_name': 'On',
+            'device_type': KasaDeviceType.KasaPlug,
+            'definition': {'state': True}
+        })
+
+        self.shadow_service.record_desired_state.side_effect = Exception(
+            'Redis unavailable')
+
+        # Act
+        _, response = await self.service.set_device_state(
+            device=device,
+            preset=preset)
+
+        # Assert
+        self.assertIsNotNone(response)
+        self.client_response_service.queue_client_response.assert_called_once()
+        self.event_service.send_client_response_event.assert_called_once()
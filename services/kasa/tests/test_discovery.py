@@ -0,0 +1,151 @@
+import asyncio
+import time
+import unittest
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from clients.kasa_discovery import broadcast_discovery
+from clients.kasa_transport import KasaLanTransport
+from services.kasa_discovery_service import KasaDiscoveryService
+from tests.fakes import FakeKasaDevice
+
+
+class KasaDiscoveryTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.device_id = str(uuid.uuid4())
+
+        self.device = FakeKasaDevice(
+            device_id=self.device_id)
+        await self.device.start()
+
+        self.cache_client = AsyncMock()
+        self.cache_client.get_json.return_value = None
+
+        self.lan_transport = KasaLanTransport()
+
+        self.service = KasaDiscoveryService(
+            configuration=MagicMock(discovery={
+                'broadcast_address': '127.0.0.1',
+                'port': self.device.discovery_port,
+                'listen_seconds': 0.2,
+                'evict_after_seconds': 600
+            }),
+            cache_client=self.cache_client,
+            kasa_client=MagicMock(lan_transport=self.lan_transport))
+
+    async def asyncTearDown(self) -> None:
+        await self.device.stop()
+
+    async def test_broadcast_discovery_parses_replies(self):
+        # Act
+        devices = await broadcast_discovery(
+            address='127.0.0.1',
+            port=self.device.discovery_port,
+            timeout=0.2)
+
+        # Assert
+        self.assertEqual(len(devices), 1)
+
+        ip, sysinfo = devices[0]
+        self.assertEqual(ip, '127.0.0.1')
+        self.assertEqual(sysinfo.get('deviceId'), self.device_id)
+
+    async def test_refresh_sets_lan_addresses(self):
+        # Act
+        await self.service.refresh()
+        devices = await self.service.get_devices()
+
+        # Assert
+        self.assertTrue(self.lan_transport.has_address(self.device_id))
+        self.assertEqual([device.device_id for device in devices],
+                         [self.device_id])
+        self.cache_client.set_json.assert_called_once()
+
+    async def test_stale_shared_devices_evicted(self):
+        # Arrange
+        stale_id = str(uuid.uuid4())
+        self.cache_client.get_json.return_value = [{
+            'device_id': stale_id,
+            'ip': '10.0.0.2',
+            'last_seen': time.time() - 3600
+        }]
+
+        # Act
+        with patch('services.kasa_discovery_service.broadcast_discovery',
+                   AsyncMock(return_value=list())):
+            await self.service.refresh()
+
+        # Assert
+        metrics = self.service.get_metrics()
+
+        self.assertEqual(metrics.get('devices'), 0)
+        self.assertEqual(metrics.get('evicted'), 1)
+
+    async def test_locally_discovered_devices_evicted(self):
+        # Arrange
+        service = KasaDiscoveryService(
+            configuration=MagicMock(discovery={
+                'broadcast_address': '127.0.0.1',
+                'port': self.device.discovery_port,
+                'listen_seconds': 0.1,
+                'evict_after_seconds': 0.2
+            }),
+            cache_client=self.cache_client,
+            kasa_client=MagicMock(lan_transport=self.lan_transport))
+
+        await service.refresh()
+        self.assertTrue(self.lan_transport.has_address(self.device_id))
+
+        # Act
+        await asyncio.sleep(0.3)
+        with patch('services.kasa_discovery_service.broadcast_discovery',
+                   AsyncMock(return_value=list())):
+            await service.refresh()
+
+        # Assert
+        self.assertFalse(self.lan_transport.has_address(self.device_id))
+
+    async def test_static_addresses_not_changed(self):
+        # Arrange
+        lan_transport = KasaLanTransport(
+            addresses={self.device_id: '10.0.0.9'})
+
+        service = KasaDiscoveryService(
+            configuration=MagicMock(discovery={
+                'broadcast_address': '127.0.0.1',
+                'port': self.device.discovery_port,
+                'listen_seconds': 0.1,
+                'evict_after_seconds': 0.2
+            }),
+            cache_client=self.cache_client,
+            kasa_client=MagicMock(lan_transport=lan_transport))
+
+        # Act
+        await service.refresh()
+        await asyncio.sleep(0.3)
+        with patch('services.kasa_discovery_service.broadcast_discovery',
+                   AsyncMock(return_value=list())):
+            await service.refresh()
+
+        # Assert
+        self.assertTrue(lan_transport.is_static(self.device_id))
+        self.assertEqual(
+            lan_transport._addresses.get(self.device_id)[0], '10.0.0.9')
+
+    async def test_get_devices_loads_shared_cache(self):
+        # Arrange
+        self.cache_client.get_json.return_value = [{
+            'device_id': self.device_id,
+            'ip': '10.0.0.3',
+            'alias': 'Shared Plug',
+            'last_seen': time.time() - 30
+        }]
+
+        # Act
+        devices = await self.service.get_devices()
+
+        # Assert
+        self.assertEqual(devices[0].ip, '10.0.0.3')
+
+        # Another instance's network may not be this one's
+        self.assertFalse(self.lan_transport.has_address(self.device_id))
@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from azure.servicebus.exceptions import MessageSizeExceededError
+
+from clients.event_client import EventClient
+
+
+class FakeMessageBatch:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.size = 0
+        self.messages = list()
+
+    def __len__(self):
+        return len(self.messages)
+
+    def add_message(self, message):
+        if self.size + len(message) > self.max_size:
+            raise MessageSizeExceededError(
+                message='Message batch size exceeded')
+
+        self.size += len(message)
+        self.messages.append(message)
+
+
+class EventClientTests(unittest.IsolatedAsyncioTestCase):
+    def get_client(self, max_size: int):
+        self.sent = list()
+
+        async def send_messages(batch):
+            self.sent.append(list(batch.messages))
+
+        self.sender = MagicMock()
+        self.sender.create_message_batch = AsyncMock(
+            side_effect=lambda: FakeMessageBatch(max_size=max_size))
+        self.sender.send_messages = AsyncMock(
+            side_effect=send_messages)
+
+        with patch('clients.event_client.ServiceBusClient') as client:
+            client.from_connection_string.return_value.get_queue_sender.return_value = self.sender
+
+            return EventClient(
+                configuration=MagicMock(service_bus={
+                    'connection_string': 'Endpoint=sb://test/',
+                    'queue_name': 'test'
+                }))
+
+    async def test_send_messages_single_batch(self):
+        # Arrange
+        client = self.get_client(max_size=10)
+
+        # Act
+        sent = await client.send_messages(['a', 'b', 'c'])
+
+        # Assert
+        self.assertEqual(sent, 1)
+        self.assertEqual(self.sent, [['a', 'b', 'c']])
+
+    async def test_send_messages_rolls_over_full_batch(self):
+        # Arrange
+        client = self.get_client(max_size=4)
+
+        # Act
+        sent = await client.send_messages(['aa', 'bb', 'cc', 'd'])
+
+        # Assert
+        self.assertEqual(sent, 2)
+        self.assertEqual(self.sent, [['aa', 'bb'], ['cc', 'd']])
+
+    async def test_send_messages_oversized_message_raises(self):
+        # Arrange
+        client = self.get_client(max_size=4)
+
+        # Act / Assert
+        with self.assertRaises(MessageSizeExceededError):
+            await client.send_messages(['toolarge'])
+
+        self.assertEqual(self.sent, list())
+
+    async def test_send_messages_empty(self):
+        # Arrange
+        client = self.get_client(max_size=4)
+
+        # Act
+        sent = await client.send_messages(list())
+
+        # Assert
+        self.assertEqual(sent, 0)
+        self.sender.send_messages.assert_not_called()
@@ -0,0 +1,65 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from framework.constants.constants import ConfigurationKey
+from httpx import AsyncClient
+
+from clients.identity_client import IdentityClient
+from tests.buildup import ApplicationBase
+
+
+class IdentityClientTests(ApplicationBase):
+    def configure_services(self, service_collection):
+        self.http_client = AsyncMock()
+
+        service_collection.add_singleton(
+            dependency_type=AsyncClient,
+            factory=lambda container: self.http_client)
+
+    async def asyncSetUp(self) -> None:
+        response = MagicMock()
+        response.is_error = False
+        response.status_code = 200
+        response.json.return_value = {
+            'access_token': self.guid(),
+            'expires_in': 3600
+        }
+
+        self.http_client.post.return_value = response
+        self.access_token = response.json.return_value.get('access_token')
+
+        self.client: IdentityClient = self.resolve(IdentityClient)
+        self.client.add_client({
+            'name': 'test-client',
+            ConfigurationKey.CLIENT_CLIENT_ID: self.guid(),
+            ConfigurationKey.CLIENT_CLIENT_SECRET: self.guid(),
+            ConfigurationKey.CLIENT_GRANT_TYPE: 'client_credentials',
+            ConfigurationKey.CLIENT_SCOPE: ['api://test/.default']
+        })
+
+    async def test_get_token_concurrent_fetches_deduplicated(self):
+        # Act
+        tokens = await asyncio.gather(*[
+            self.client.get_token(client_name='test-client')
+            for _ in range(5)
+        ])
+
+        cached = await self.client.get_token(
+            client_name='test-client')
+
+        # Assert
+        self.assertEqual(self.http_client.post.call_count, 1)
+        self.assertTrue(all([token == self.access_token
+                             for token in tokens]))
+        self.assertEqual(cached, self.access_token)
+
+    async def test_get_token_scope_does_not_mutate_client(self):
+        # Act
+        await self.client.get_token(
+            client_name='test-client',
+            scope='api://other/.default')
+
+        # Assert
+        self.assertEqual(
+            self.client.get_client('test-client').get('scope'),
+            'api://test/.default')
@@ -0,0 +1,252 @@
+import asyncio
+import unittest
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+from clients.kasa_client import KasaClient
+
+
+class KasaClientStateReadTests(unittest.IsolatedAsyncioTestCase):
+    def get_client(self, state_cache_ttl_seconds=0):
+        configuration = MagicMock(kasa={
+            'username': 'username',
+            'password': 'password',
+            'base_url': 'https://kasa',
+            'state_cache_ttl_seconds': state_cache_ttl_seconds,
+            'regional_routing': False
+        })
+
+        self.cache_client = AsyncMock()
+        self.cache_client.get_cache.return_value = str(uuid.uuid4())
+
+        self.http_client = AsyncMock()
+
+        async def post(url, json):
+            await asyncio.sleep(0.01)
+
+            response = MagicMock()
+            response.status_code = 200
+            response.json.return_value = {
+                'error_code': 0,
+                'result': {'responseData': {'system': {'get_sysinfo': {
+                    'deviceId': json.get('params').get('deviceId'),
+                    'relay_state': 1
+                }}}}
+            }
+
+            return response
+
+        self.http_client.post.side_effect = post
+
+        return KasaClient(
+            configuration=configuration,
+            cache_client=self.cache_client,
+            http_client=self.http_client)
+
+    async def test_get_device_state_concurrent_reads_deduplicated(self):
+        # Arrange
+        client = self.get_client()
+        device_id = str(uuid.uuid4())
+
+        # Act
+        responses = await asyncio.gather(*[
+            client.get_device_state(device_id=device_id)
+            for _ in range(5)
+        ])
+
+        # Assert
+        self.assertEqual(self.http_client.post.call_count, 1)
+        self.assertTrue(all([response is responses[0]
+                             for response in responses]))
+        self.assertEqual(
+            client.get_metrics().get('state_reads').get('shared'), 4)
+
+    async def test_get_device_state_served_from_micro_cache(self):
+        # Arrange
+        client = self.get_client(state_cache_ttl_seconds=5)
+        device_id = str(uuid.uuid4())
+
+        # Act
+        first = await client.get_device_state(device_id=device_id)
+        second = await client.get_device_state(device_id=device_id)
+
+        # Assert
+        self.assertIs(first, second)
+        self.assertEqual(self.http_client.post.call_count, 1)
+
+    async def test_set_device_state_expires_cached_state(self):
+        # Arrange
+        client = self.get_client(state_cache_ttl_seconds=5)
+        device_id = str(uuid.uuid4())
+
+        await client.get_device_state(device_id=device_id)
+
+        # Act
+        await client.set_device_state(
+            kasa_request={'params': {'deviceId': device_id}},
+            kasa_token=str(uuid.uuid4()))
+        await client.get_device_state(device_id=device_id)
+
+        # Assert
+        self.assertEqual(self.http_client.post.call_count, 3)
+
+    async def test_read_in_flight_during_set_is_not_cached(self):
+        # Arrange
+        client = self.get_client(state_cache_ttl_seconds=5)
+        device_id = str(uuid.uuid4())
+
+        stale_read = asyncio.create_task(
+            client.get_device_state(device_id=device_id))
+        await asyncio.sleep(0)
+
+        # Act
+        await client.set_device_state(
+            kasa_request={'params': {'deviceId': device_id}},
+            kasa_token=str(uuid.uuid4()))
+        stale = await stale_read
+        fresh = await client.get_device_state(device_id=device_id)
+
+        # Assert
+        self.assertIsNot(stale, fresh)
+        self.assertEqual(self.http_client.post.call_count, 3)
+
+
+class KasaClientDeviceListTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        configuration = MagicMock(kasa={
+            'username': 'username',
+            'password': 'password',
+            'base_url': 'https://kasa',
+            'device_list_ttl_seconds': 30
+        })
+
+        self.client = KasaClient(
+            configuration=configuration,
+            cache_client=AsyncMock(),
+            http_client=AsyncMock())
+
+        self.client.get_devices = AsyncMock(
+            return_value=MagicMock(
+                device_list=[{'deviceId': str(uuid.uuid4()), 'status': 1}],
+                response=MagicMock(is_error=False)))
+
+    async def test_get_device_list_cached_within_ttl(self):
+        # Act
+        device_lists = await asyncio.gather(*[
+            self.client.get_device_list()
+            for _ in range(3)
+        ])
+        cached = await self.client.get_device_list()
+
+        # Assert
+        self.client.get_devices.assert_called_once()
+        self.assertIs(cached, device_lists[0])
+
+    async def test_get_device_list_refresh_bypasses_cache(self):
+        # Act
+        first = await self.client.get_device_list()
+        refreshed = await self.client.get_device_list(refresh=True)
+
+        # Assert
+        self.assertEqual(self.client.get_devices.call_count, 2)
+        self.assertEqual(first.fingerprint, refreshed.fingerprint)
+
+
+class KasaClientRoutingTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        configuration = MagicMock(kasa={
+            'username': 'username',
+            'password': 'password',
+            'base_url': 'https://wap.tplinkcloud.com'
+        })
+
+        cache_client = AsyncMock()
+        cache_client.get_cache.return_value = str(uuid.uuid4())
+
+        self.http_client = AsyncMock()
+        self.http_client.post.return_value = MagicMock(
+            status_code=200,
+            json=MagicMock(return_value={'error_code': 0, 'result': {}}))
+
+        self.client = KasaClient(
+            configuration=configuration,
+            cache_client=cache_client,
+            http_client=self.http_client)
+
+        self.device_id = str(uuid.uuid4())
+        self.client.get_devices = AsyncMock(
+            return_value=MagicMock(
+                device_list=[{
+                    'deviceId': self.device_id,
+                    'status': 1,
+                    'appServerUrl': 'https://use1-wap.tplinkcloud.com/'
+                }],
+                response=MagicMock(is_error=False)))
+
+    async def test_passthrough_routed_to_device_endpoint(self):
+        # Arrange
+        await self.client.get_device_list()
+
+        # Act
+        await self.client.get_device_state(
+            device_id=self.device_id)
+
+        # Assert
+        url = self.http_client.post.call_args.kwargs.get('url')
+        routing = self.client.get_metrics().get('routing')
+
+        self.assertTrue(url.startswith('https://use1-wap.tplinkcloud.com/?'))
+        self.assertEqual(routing.get('routed'), 1)
+        self.assertEqual(
+            routing.get('endpoints').get(
+                'https://use1-wap.tplinkcloud.com').get('requests'), 1)
+
+    async def test_unmapped_device_uses_default_endpoint(self):
+        # Act
+        await self.client.get_device_state(
+            device_id=str(uuid.uuid4()))
+
+        # Assert
+        url = self.http_client.post.call_args.kwargs.get('url')
+
+        self.assertTrue(url.startswith('https://wap.tplinkcloud.com/?'))
+        self.assertEqual(
+            self.client.get_metrics().get('routing').get('unrouted'), 1)
+
+
+    async def test_slow_endpoint_does_not_hold_global_slots(self):
+        # Arrange
+        fast_device_id = str(uuid.uuid4())
+        self.client.get_devices.return_value.device_list.append({
+            'deviceId': fast_device_id,
+            'status': 1,
+            'appServerUrl': 'https://euw1-wap.tplinkcloud.com/'
+        })
+        await self.client.get_device_list()
+
+        release = asyncio.Event()
+
+        async def post(url, json):
+            if url.startswith('https://use1-wap'):
+                await release.wait()
+            return MagicMock(
+                status_code=200,
+                json=MagicMock(return_value={'error_code': 0, 'result': {}}))
+
+        self.http_client.post.side_effect = post
+
+        slow = [asyncio.create_task(self.client.set_device_state(
+            kasa_request={'params': {'deviceId': self.device_id}}))
+            for _ in range(30)]
+        await asyncio.sleep(0.01)
+
+        # Act
+        response = await asyncio.wait_for(
+            self.client.get_device_state(device_id=fast_device_id),
+            timeout=1)
+
+        # Assert
+        self.assertFalse(response.is_error)
+
+        release.set()
+        await asyncio.gather(*slow)
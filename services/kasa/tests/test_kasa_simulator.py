@@ -0,0 +1,120 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from httpx import AsyncClient
+
+from clients.kasa_client import KasaClient
+from clients.kasa_simulator import (SIMULATOR_DEVICE_OFFLINE,
+                                    SIMULATOR_RATE_LIMITED,
+                                    KasaCloudSimulator)
+from domain.constants import KasaDeviceType
+from domain.kasa.devices.light import KasaLight
+from domain.kasa.devices.plug import KasaPlug
+
+
+class KasaCloudSimulatorTests(unittest.IsolatedAsyncioTestCase):
+    def get_client(self, settings: dict = None):
+        self.simulator = KasaCloudSimulator.from_config(
+            base_url='https://wap.tplinkcloud.com',
+            settings={
+                'seed': 1,
+                'fleet': {
+                    'plugs': 2,
+                    'lights': 2,
+                    'endpoints': ['https://use1-wap.tplinkcloud.com'],
+                    'latency': {'distribution': 'fixed', 'median_ms': 1}
+                }
+            } | (settings or dict()))
+
+        cache_client = AsyncMock()
+        cache_client.get_cache.return_value = None
+
+        return KasaClient(
+            configuration=MagicMock(kasa={
+                'username': 'username',
+                'password': 'password',
+                'base_url': 'https://wap.tplinkcloud.com'
+            }),
+            cache_client=cache_client,
+            http_client=AsyncClient(transport=self.simulator))
+
+    def get_device(self, device_type: str):
+        return next(device for device in self.simulator.devices
+                    if device.device_type == device_type)
+
+    async def test_device_list_served_from_fleet(self):
+        # Arrange
+        client = self.get_client()
+
+        # Act
+        device_list = await client.get_device_list()
+
+        # Assert
+        self.assertEqual(len(device_list.devices), 4)
+        self.assertEqual(
+            self.simulator.get_metrics().get('methods'),
+            {'login': 1, 'getDeviceList': 1})
+
+    async def test_set_plug_state_round_trip(self):
+        # Arrange
+        client = self.get_client()
+        device = self.get_device(KasaDeviceType.KasaPlug)
+
+        plug = KasaPlug(
+            device_id=device.device_id,
+            device_name=device.alias,
+            state=True)
+
+        # Act
+        await client.set_device_state(
+            kasa_request=plug.to_kasa_request())
+        response = await client.get_device_state(
+            device_id=device.device_id)
+
+        # Assert
+        self.assertEqual(response.device_object.get('relay_state'), 1)
+
+    async def test_light_state_parsed_by_device_model(self):
+        # Arrange
+        client = self.get_client()
+        device = self.get_device(KasaDeviceType.KasaLight)
+
+        # Act
+        response = await client.get_device_state(
+            device_id=device.device_id)
+        light = KasaLight.from_kasa_response(
+            kasa_response=response)
+
+        # Assert
+        self.assertFalse(light.state)
+        self.assertEqual(light.brightness, 100)
+
+    async def test_offline_device_returns_error(self):
+        # Arrange
+        client = self.get_client()
+        device = self.get_device(KasaDeviceType.KasaPlug)
+        self.simulator.set_online(device.device_id, False)
+
+        # Act
+        response = await client.get_device_state(
+            device_id=device.device_id)
+
+        # Assert
+        self.assertEqual(response.error_code, SIMULATOR_DEVICE_OFFLINE)
+
+    async def test_throttle_rule_limits_passthroughs(self):
+        # Arrange
+        client = self.get_client({
+            'throttles': [{'rate_per_second': 0.001, 'burst': 2}]
+        })
+        devices = self.simulator.devices
+
+        # Act
+        responses = [
+            await client.get_device_state(device_id=device.device_id)
+            for device in devices[:3]
+        ]
+
+        # Assert
+        self.assertEqual(responses[2].error_code, SIMULATOR_RATE_LIMITED)
+        self.assertEqual(self.simulator.get_metrics().get('throttled'), 1)
@@ -0,0 +1,182 @@
+import asyncio
+import socket
+import unittest
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+from clients.kasa_client import KasaClient
+from clients.kasa_transport import KasaLanTransport, decrypt, encrypt
+from tests.fakes import FakeKasaDevice
+
+
+def get_unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class KasaLanProtocolTests(unittest.TestCase):
+    def test_encrypt_decrypt_round_trip(self):
+        # Arrange
+        payload = b'{"system":{"get_sysinfo":null}}'
+
+        # Act
+        encrypted = encrypt(payload)
+
+        # Assert
+        self.assertEqual(int.from_bytes(encrypted[:4], 'big'), len(payload))
+        self.assertEqual(encrypted[4], 171 ^ payload[0])
+        self.assertEqual(decrypt(encrypted[4:]), payload)
+
+
+class KasaLanTransportTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.device_id = str(uuid.uuid4())
+        self.device = FakeKasaDevice(
+            device_id=self.device_id)
+        await self.device.start()
+
+        cache_client = AsyncMock()
+        cache_client.get_cache.return_value = str(uuid.uuid4())
+
+        self.http_client = AsyncMock()
+        self.http_client.post.return_value = MagicMock(
+            status_code=200,
+            json=MagicMock(return_value={
+                'error_code': 0,
+                'result': {'responseData': {'system': {'get_sysinfo': {
+                    'deviceId': self.device_id,
+                    'relay_state': 0
+                }}}}
+            }))
+
+        self.client = KasaClient(
+            configuration=MagicMock(kasa={
+                'username': 'username',
+                'password': 'password',
+                'base_url': 'https://wap.tplinkcloud.com',
+                'regional_routing': False,
+                'lan': {'enabled': True, 'timeout_seconds': 1}
+            }),
+            cache_client=cache_client,
+            http_client=self.http_client)
+
+    async def asyncTearDown(self) -> None:
+        await self.device.stop()
+
+    async def test_get_device_state_over_lan(self):
+        # Arrange
+        self.client.lan_transport.set_address(
+            device_id=self.device_id,
+            host='127.0.0.1',
+            port=self.device.port)
+
+        # Act
+        response = await self.client.get_device_state(
+            device_id=self.device_id)
+
+        # Assert
+        lan = self.client.get_metrics().get('transports').get('lan')
+
+        self.assertFalse(response.is_error)
+        self.assertEqual(
+            response.device_object.get('deviceId'), self.device_id)
+        self.assertEqual(lan.get('requests'), 1)
+        self.assertIsNotNone(lan.get('avg_latency_ms'))
+        self.http_client.post.assert_not_called()
+
+    async def test_set_device_state_over_lan(self):
+        # Arrange
+        self.client.lan_transport.set_address(
+            device_id=self.device_id,
+            host='127.0.0.1',
+            port=self.device.port)
+
+        # Act
+        response = await self.client.set_device_state(
+            kasa_request={
+                'method': 'passthrough',
+                'params': {
+                    'deviceId': self.device_id,
+                    'requestData': {
+                        'system': {'set_relay_state': {'state': 1}}
+                    }
+                }
+            })
+
+        # Assert
+        self.assertFalse(response.is_error)
+        self.assertEqual(self.device.sysinfo.get('relay_state'), 1)
+        self.assertIsNotNone(response.latency)
+
+    async def test_unreachable_device_falls_back_to_cloud(self):
+        # Arrange
+        self.client.lan_transport.set_address(
+            device_id=self.device_id,
+            host='127.0.0.1',
+            port=get_unused_port())
+
+        # Act
+        response = await self.client.get_device_state(
+            device_id=self.device_id)
+
+        # Assert
+        transports = self.client.get_metrics().get('transports')
+
+        self.assertFalse(response.is_error)
+        self.assertEqual(transports.get('lan').get('errors'), 1)
+        self.assertEqual(transports.get('lan').get('fallbacks'), 1)
+        self.assertEqual(transports.get('cloud').get('requests'), 1)
+        self.http_client.post.assert_called_once()
+
+    async def test_device_error_falls_back_to_cloud(self):
+        # Arrange
+        self.client.lan_transport.set_address(
+            device_id=self.device_id,
+            host='127.0.0.1',
+            port=self.device.port)
+        self.device.sysinfo['err_code'] = -1
+
+        # Act
+        response = await self.client.get_device_state(
+            device_id=self.device_id)
+
+        # Assert
+        transports = self.client.get_metrics().get('transports')
+
+        self.assertFalse(response.is_error)
+        self.assertEqual(transports.get('lan').get('errors'), 1)
+        self.assertEqual(transports.get('lan').get('fallbacks'), 1)
+        self.http_client.post.assert_called_once()
+
+    async def test_lan_requests_bounded_by_concurrency(self):
+        # Arrange
+        transport = KasaLanTransport(
+            addresses={self.device_id: '127.0.0.1'},
+            concurrency=2)
+
+        active = 0
+        peak = 0
+
+        async def send(host, port, payload):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+            return encrypt(payload)[4:]
+
+        transport._send = send
+
+        # Act
+        await asyncio.gather(*[
+            transport.send(
+                device_id=self.device_id,
+                request_data={'system': {'get_sysinfo': {'err_code': 0}}})
+            for _ in range(6)
+        ])
+
+        # Assert
+        self.assertEqual(peak, 2)
+        self.assertEqual(transport.get_metrics().get('requests'), 6)
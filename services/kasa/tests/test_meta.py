@@ -0,0 +1,29 @@
+import unittest
+
+from domain.exceptions import (InvalidCursorException, PresetNotFoundException,
+                               RequiredFieldException)
+from utils.meta import stream_error_handler
+
+
+class StreamErrorHandlerTests(unittest.IsolatedAsyncioTestCase):
+    async def get_status(self, ex):
+        @stream_error_handler
+        async def route():
+            raise ex
+
+        _, status = await route()
+        return status
+
+    async def test_request_errors_are_bad_request(self):
+        self.assertEqual(await self.get_status(
+            InvalidCursorException('cursor')), 400)
+        self.assertEqual(await self.get_status(
+            RequiredFieldException('device_ids')), 400)
+
+    async def test_not_found_errors(self):
+        self.assertEqual(await self.get_status(
+            PresetNotFoundException('preset_id')), 404)
+
+    async def test_unexpected_errors_are_server_errors(self):
+        self.assertEqual(await self.get_status(
+            Exception('Failed')), 500)
@@ -0,0 +1,143 @@
+import os
+import tempfile
+import unittest
+import uuid
+
+from utils.outbox import OutboxRelay, SqliteOutbox
+
+
+class StubBroker:
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.received = list()
+
+    async def publish(self, events):
+        if self.failures > 0:
+            self.failures -= 1
+            raise Exception('Broker unavailable')
+
+        self.received.extend(events)
+
+
+class OutboxRelayTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(
+            self.directory.name, 'outbox.db')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def get_relay(self, broker: StubBroker, outbox: SqliteOutbox):
+        return OutboxRelay(
+            name='test-outbox',
+            outbox=outbox,
+            handler=broker.publish,
+            batch_size=2,
+            retry_delay=0)
+
+    async def test_relay_delivers_in_order(self):
+        # Arrange
+        broker = StubBroker()
+        relay = self.get_relay(
+            broker=broker,
+            outbox=SqliteOutbox(path=self.path))
+
+        event_ids = [str(uuid.uuid4()) for _ in range(5)]
+        for event_id in event_ids:
+            await relay.outbox.append({'event_id': event_id})
+
+        # Act
+        while await relay.relay() > 0:
+            pass
+
+        await relay.stop()
+
+        # Assert
+        self.assertEqual(
+            [event.get('event_id') for event in broker.received],
+            event_ids)
+        self.assertEqual(relay.get_metrics().get('relayed'), 5)
+        self.assertEqual(relay.get_metrics().get('pending'), 0)
+
+    async def test_relay_retries_failed_batch(self):
+        # Arrange
+        broker = StubBroker(failures=1)
+        relay = self.get_relay(
+            broker=broker,
+            outbox=SqliteOutbox(path=self.path))
+
+        await relay.outbox.append({'event_id': str(uuid.uuid4())})
+
+        # Act
+        failed = await relay.relay()
+        metrics = relay.get_metrics()
+
+        retried = await relay.relay()
+        await relay.stop()
+
+        # Assert
+        self.assertEqual(failed, 0)
+        self.assertEqual(metrics.get('pending'), 1)
+        self.assertEqual(metrics.get('failed'), 1)
+        self.assertIsNotNone(metrics.get('last_error'))
+        self.assertEqual(retried, 1)
+        self.assertEqual(len(broker.received), 1)
+
+    async def test_outbox_survives_restart(self):
+        # Arrange
+        outbox = SqliteOutbox(path=self.path)
+        await outbox.append({'event_id': str(uuid.uuid4())})
+        outbox.close()
+
+        broker = StubBroker()
+        relay = self.get_relay(
+            broker=broker,
+            outbox=SqliteOutbox(path=self.path))
+
+        # Act
+        relay.start()
+        relay.notify()
+
+        while len(broker.received) == 0:
+            await relay.outbox.get_stats()
+
+        await relay.stop()
+
+        # Assert
+        self.assertEqual(len(broker.received), 1)
+
+    async def test_poison_entry_does_not_block_batch(self):
+        # Arrange
+        class PoisonBroker(StubBroker):
+            async def publish(self, events):
+                if any([event.get('poison') for event in events]):
+                    raise Exception('Message size exceeded')
+                self.received.extend(events)
+
+        broker = PoisonBroker()
+        relay = OutboxRelay(
+            name='test-outbox',
+            outbox=SqliteOutbox(path=self.path),
+            handler=broker.publish,
+            batch_size=10,
+            retry_delay=0,
+            max_attempts=2)
+
+        await relay.outbox.append({'event_id': 'first'})
+        await relay.outbox.append({'event_id': 'poison', 'poison': True})
+        await relay.outbox.append({'event_id': 'last'})
+
+        # Act
+        for _ in range(4):
+            await relay.relay()
+
+        metrics = relay.get_metrics()
+        await relay.stop()
+
+        # Assert
+        self.assertEqual(
+            [event.get('event_id') for event in broker.received],
+            ['first', 'last'])
+        self.assertEqual(metrics.get('pending'), 0)
+        self.assertEqual(metrics.get('dead_lettered'), 1)
@@ -0,0 +1,167 @@
+import time
+import unittest
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+from domain.constants import DeviceShadowSource, KasaDeviceType
+from domain.kasa.shadow import DeviceShadow
+from services.kasa_device_shadow_service import KasaDeviceShadowService
+from services.kasa_polling_service import KasaPollingService
+
+
+def get_plug_shadow(device_id: str, relay_state: int = 1) -> DeviceShadow:
+    return DeviceShadow(
+        device_id=device_id,
+        reported={
+            'deviceId': device_id,
+            'alias': 'Test Plug',
+            'mic_type': KasaDeviceType.KasaPlug,
+            'relay_state': relay_state
+        },
+        reported_at=time.time(),
+        reported_source=DeviceShadowSource.Poll)
+
+
+class KasaPollingServiceTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        configuration = MagicMock(
+            shadow={},
+            polling={
+                'min_interval_seconds': 5,
+                'interval_seconds': 60,
+                'max_interval_seconds': 600,
+                'backoff_factor': 2,
+                'budget_per_minute': 60,
+                'budget_burst': 2
+            })
+
+        cache_client = AsyncMock()
+        cache_client.get_json.return_value = None
+
+        self.shadow_service = KasaDeviceShadowService(
+            configuration=configuration,
+            cache_client=cache_client)
+        self.device_service = AsyncMock()
+
+        self.lease_repository = AsyncMock()
+        self.lease_repository.try_acquire.return_value = True
+
+        self.service = KasaPollingService(
+            configuration=configuration,
+            device_service=self.device_service,
+            shadow_service=self.shadow_service,
+            lease_repository=self.lease_repository)
+
+    async def test_stable_device_backs_off_and_changed_device_is_hot(self):
+        # Arrange
+        device_id = str(uuid.uuid4())
+        self.service.set_devices([device_id])
+        schedule = self.service._schedules.get(device_id)
+
+        self.device_service.get_device_state.return_value = get_plug_shadow(
+            device_id=device_id)
+
+        # Act
+        await self.service.poll_device(device_id)
+        await self.service.poll_device(device_id)
+        stable_interval = schedule.interval
+
+        self.device_service.get_device_state.return_value = get_plug_shadow(
+            device_id=device_id,
+            relay_state=0)
+
+        await self.service.poll_device(device_id)
+
+        # Assert
+        self.assertEqual(stable_interval, 240)
+        self.assertEqual(schedule.interval, 5)
+        self.assertEqual(schedule.changes, 1)
+        self.device_service.get_device_state.assert_called_with(
+            device_id=device_id,
+            max_age=0,
+            source=DeviceShadowSource.Poll)
+
+    async def test_failed_device_backs_off(self):
+        # Arrange
+        device_id = str(uuid.uuid4())
+        self.service.set_devices([device_id])
+        schedule = self.service._schedules.get(device_id)
+
+        self.device_service.get_device_state.side_effect = Exception(
+            'Device is offline')
+
+        # Act
+        await self.service.poll_device(device_id)
+        await self.service.poll_device(device_id)
+
+        # Assert
+        self.assertEqual(schedule.failures, 2)
+        self.assertEqual(schedule.interval, 240)
+        self.assertEqual(self.service.get_metrics().get('errors'), 2)
+
+    async def test_dispatch_due_respects_budget(self):
+        # Arrange
+        device_ids = [str(uuid.uuid4()) for _ in range(5)]
+        self.service.set_devices(device_ids)
+
+        for schedule in self.service._schedules.values():
+            self.service._schedule(schedule=schedule, delay=0)
+
+        self.device_service.get_device_state.side_effect = (
+            lambda device_id, **kwargs: get_plug_shadow(device_id))
+
+        # Act
+        wait = self.service._dispatch_due()
+        inflight = len(self.service._inflight)
+        await self.service.stop()
+
+        # Assert
+        metrics = self.service.get_metrics()
+        self.assertEqual(inflight, 2)
+        self.assertGreater(wait, 0)
+        self.assertEqual(metrics.get('deferred'), 1)
+        self.assertEqual(metrics.get('budget').get('acquired'), 2)
+
+    async def test_commanded_device_rescheduled_hot(self):
+        # Arrange
+        device_id = str(uuid.uuid4())
+        self.service.set_devices([device_id])
+        schedule = self.service._schedules.get(device_id)
+        schedule.interval = 600
+
+        # Act
+        await self.shadow_service.record_desired_state(
+            device_id=device_id,
+            desired={'state': True},
+            preset_id=str(uuid.uuid4()),
+            state_key=str(uuid.uuid4()))
+
+        # Assert
+        self.assertEqual(schedule.interval, 5)
+        self.assertLessEqual(schedule.next_poll_at, time.time() + 5)
+
+    async def test_tick_skipped_without_lease(self):
+        # Arrange
+        self.lease_repository.try_acquire.return_value = False
+
+        # Act
+        delay = await self.service._tick()
+
+        # Assert
+        self.assertGreater(delay, 0)
+        self.assertFalse(self.service.get_metrics().get('is_leader'))
+        self.device_service.get_all_devices.assert_not_called()
+
+    async def test_tick_polls_with_lease(self):
+        # Arrange
+        self.device_service.get_all_devices.return_value = list()
+
+        # Act
+        await self.service._tick()
+        await self.service._tick()
+        await self.service.stop()
+
+        # Assert
+        self.lease_repository.try_acquire.assert_called_once()
+        self.lease_repository.release.assert_called_once()
+        self.device_service.get_all_devices.assert_called_once()
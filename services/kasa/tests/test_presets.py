@@ -1,10 +1,16 @@
+import unittest
+import uuid
+
 from data.repositories.kasa_preset_repository import KasaPresetRepository
 from domain.constants import KasaDeviceType
 from domain.exceptions import PresetNotFoundException
+from domain.kasa.device import KasaDevice
+from domain.kasa.preset import KasaPreset
 from domain.rest import UpdatePresetRequest
 from services.kasa_preset_service import KasaPresetSevice
 from tests.buildup import ApplicationBase
 from tests.helpers import TestHelper
+from utils.helpers import generate_key, generate_state_key
 
 helper = TestHelper()
 
@@ -128,3 +134,82 @@ class KasaPresetServiceTests(ApplicationBase):
 
         # Assert
         self.assertIsNotNone(result)
+
+
+class KasaPresetStateKeyTests(unittest.TestCase):
+    def get_preset(self, device_type, definition):
+        return KasaPreset.from_dict(data={
+            'preset_id': str(uuid.uuid4()),
+            'preset_name': 'Test',
+            'device_type': device_type,
+            'definition': definition
+        })
+
+    def get_device(self, device_type):
+        return KasaDevice.from_entity(data={
+            'device_id': str(uuid.uuid4()),
+            'device_name': 'Test',
+            'device_type': device_type
+        })
+
+    def test_light_state_key_matches_baseline(self):
+        # Arrange
+        definition = {
+            'state': True,
+            'brightness': 80,
+            'hue': 30,
+            'saturation': 60,
+            'temperature': 2700
+        }
+        preset = self.get_preset(KasaDeviceType.KasaLight, definition)
+
+        # Unmemoized key format the stored state keys use
+        expected = generate_key(items=[True, 60, 80, 30, 2700])
+
+        # Act
+        device = preset.to_device_preset(
+            device=self.get_device(KasaDeviceType.KasaLight))
+
+        # Assert
+        self.assertEqual(preset.get_state_key(), expected)
+        self.assertEqual(device.state_key(), expected)
+
+    def test_light_state_key_missing_temperature(self):
+        # Arrange
+        preset = self.get_preset(KasaDeviceType.KasaLight, {
+            'state': False,
+            'brightness': 10,
+            'hue': 0,
+            'saturation': 0
+        })
+
+        expected = generate_key(items=[False, 0, 10, 0, 0])
+
+        # Act
+        device = preset.to_device_preset(
+            device=self.get_device(KasaDeviceType.KasaLight))
+
+        # Assert
+        self.assertEqual(preset.get_state_key(), expected)
+        self.assertEqual(device.state_key(), expected)
+
+    def test_plug_state_key_matches_baseline(self):
+        # Arrange
+        preset = self.get_preset(KasaDeviceType.KasaPlug, {'state': True})
+
+        expected = generate_key(items=[True])
+
+        # Act
+        device = preset.to_device_preset(
+            device=self.get_device(KasaDeviceType.KasaPlug))
+
+        # Assert
+        self.assertEqual(preset.get_state_key(), expected)
+        self.assertEqual(device.state_key(), expected)
+
+    def test_state_key_same_for_tuple_and_list_params(self):
+        self.assertEqual(
+            generate_state_key(
+                device_type=KasaDeviceType.KasaPlug,
+                params=(True,)),
+            generate_key(items=[True]))
@@ -0,0 +1,107 @@
+import unittest
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+from domain.constants import KasaDeviceType
+from domain.kasa.client_response import KasaClientResponse
+from domain.kasa.devices.plug import KasaPlug
+from domain.kasa.shadow import DeviceShadow
+from services.kasa_reconciler_service import KasaReconcilerService
+
+
+def get_plug_shadow(device_id: str, relay_state: int) -> MagicMock:
+    shadow = MagicMock(spec=DeviceShadow)
+    shadow.reported = {
+        'deviceId': device_id,
+        'alias': 'Test Plug',
+        'mic_type': KasaDeviceType.KasaPlug,
+        'relay_state': relay_state
+    }
+
+    return shadow
+
+
+class KasaReconcilerServiceTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.device_id = str(uuid.uuid4())
+        self.preset_id = str(uuid.uuid4())
+
+        self.device_repository = AsyncMock()
+        self.device_repository.get_automated_sync_devices.return_value = [{
+            'device_id': self.device_id,
+            'device_name': 'Test Plug',
+            'device_type': KasaDeviceType.KasaPlug,
+            'device_sync': True
+        }]
+
+        self.client_response_service = AsyncMock()
+        self.client_response_service.get_client_responses.return_value = [
+            KasaClientResponse.from_entity(data={
+                'device_id': self.device_id,
+                'preset_id': self.preset_id,
+                'client_response': dict(),
+                'state_key': KasaPlug.get_state_key(
+                    definition={'state': True})
+            })
+        ]
+
+        self.device_service = AsyncMock()
+        self.preset_service = AsyncMock()
+
+        self.lease_repository = AsyncMock()
+        self.lease_repository.try_acquire.return_value = True
+
+        self.feature_client = AsyncMock()
+        self.feature_client.is_enabled.return_value = True
+
+        self.service = KasaReconcilerService(
+            configuration=MagicMock(reconciler={'concurrency': 2}),
+            device_repository=self.device_repository,
+            device_service=self.device_service,
+            preset_service=self.preset_service,
+            client_response_service=self.client_response_service,
+            lease_repository=self.lease_repository,
+            feature_client=self.feature_client)
+
+    async def test_run_once_reapplies_drifted_device(self):
+        # Arrange
+        self.device_service.get_device_state.return_value = get_plug_shadow(
+            device_id=self.device_id,
+            relay_state=0)
+
+        # Act
+        metrics = await self.service.run_once()
+
+        # Assert
+        self.assertEqual(metrics.get('checked'), 1)
+        self.assertEqual(metrics.get('drifted'), 1)
+        self.assertEqual(metrics.get('reapplied'), 1)
+        self.preset_service.get_preset.assert_called_once_with(
+            preset_id=self.preset_id)
+        self.device_service.set_device_state.assert_called_once()
+
+    async def test_run_once_skips_device_in_sync(self):
+        # Arrange
+        self.device_service.get_device_state.return_value = get_plug_shadow(
+            device_id=self.device_id,
+            relay_state=1)
+
+        # Act
+        metrics = await self.service.run_once()
+
+        # Assert
+        self.assertEqual(metrics.get('checked'), 1)
+        self.assertEqual(metrics.get('drifted'), 0)
+        self.device_service.set_device_state.assert_not_called()
+
+    async def test_run_once_skipped_without_lease(self):
+        # Arrange
+        self.lease_repository.try_acquire.return_value = False
+
+        # Act
+        metrics = await self.service.run_once()
+
+        # Assert
+        self.assertFalse(metrics.get('is_leader'))
+        self.assertEqual(metrics.get('skipped'), 1)
+        self.device_repository.get_automated_sync_devices.assert_not_called()
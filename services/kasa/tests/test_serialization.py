@@ -0,0 +1,71 @@
+import gzip
+import json
+import unittest
+
+from domain.constants import KasaDeviceType
+from domain.kasa.device import KasaDevice
+from domain.kasa.devices.plug import KasaPlug
+from utils.serialization import (accepts_gzip, dumps, gzip_chunks,
+                                 iter_json_array)
+
+
+class SerializationTests(unittest.IsolatedAsyncioTestCase):
+    def get_devices(self, count):
+        return [KasaDevice.from_entity({
+            'device_id': str(index),
+            'device_name': f'device-{index}',
+            'device_type': KasaDeviceType.KasaPlug
+        }) for index in range(count)]
+
+    async def read(self, chunks):
+        return b''.join([chunk async for chunk in chunks])
+
+    async def test_iter_json_array_matches_dumps(self):
+        # Arrange
+        devices = self.get_devices(count=600)
+
+        # Act
+        body = await self.read(iter_json_array(
+            items=devices,
+            chunk_size=100))
+
+        # Assert
+        self.assertEqual(json.loads(body), json.loads(dumps(devices)))
+
+    async def test_iter_json_array_empty(self):
+        # Act
+        body = await self.read(iter_json_array(items=[]))
+
+        # Assert
+        self.assertEqual(json.loads(body), [])
+
+    async def test_gzip_chunks_round_trip(self):
+        # Arrange
+        devices = self.get_devices(count=300)
+
+        # Act
+        body = await self.read(gzip_chunks(
+            iter_json_array(items=devices)))
+
+        # Assert
+        self.assertEqual(
+            json.loads(gzip.decompress(body)),
+            [device.to_dict() for device in devices])
+
+    def test_accepts_gzip(self):
+        self.assertTrue(accepts_gzip({'Accept-Encoding': 'br, gzip;q=0.8'}))
+        self.assertFalse(accepts_gzip({'Accept-Encoding': 'identity'}))
+        self.assertFalse(accepts_gzip({}))
+
+    def test_slotted_models_have_no_instance_dict(self):
+        # Arrange
+        device = self.get_devices(count=1)[0]
+        plug = KasaPlug(
+            device_id=device.device_id,
+            device_name=device.device_name,
+            state=True)
+
+        # Assert
+        self.assertFalse(hasattr(device, '__dict__'))
+        self.assertFalse(hasattr(plug, '__dict__'))
+        self.assertEqual(plug.to_dict().get('state'), True)
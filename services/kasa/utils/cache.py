@@ -0,0 +1,89 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class BoundedTtlCache:
+    '''
+    In-process LRU cache capped at `max_size` entries
+    where each entry carries its own expiry
+    '''
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int = 1024
+    ):
+        self._name = name
+        self._max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(
+        self,
+        key: Hashable
+    ) -> Any:
+        '''
+        Get a cached value, None if the key isn't
+        cached or has expired
+        '''
+
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self._misses += 1
+            return None
+
+        value, expires_at = entry
+
+        if time.time() >= expires_at:
+            self._entries.pop(key, None)
+            self._misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._hits += 1
+
+        return value
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        expires_at: float
+    ) -> None:
+        '''
+        Cache a value until the epoch time `expires_at`,
+        evicting the least recently used entry when full
+        '''
+
+        if time.time() >= expires_at:
+            return
+
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def delete(
+        self,
+        key: Hashable
+    ) -> None:
+        self._entries.pop(key, None)
+
+    def get_metrics(
+        self
+    ) -> dict:
+        return {
+            'name': self._name,
+            'size': len(self._entries),
+            'max_size': self._max_size,
+            'hits': self._hits,
+            'misses': self._misses,
+            'evictions': self._evictions
+        }
@@ -0,0 +1,431 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from framework.logger.providers import get_logger
+
+logger = get_logger(__name__)
+
+
+class BatchProcessor:
+    '''
+    Bounded in-process buffer that hands items to
+    `handler` in batches once `max_batch_size` items
+    are queued or `flush_interval` seconds pass
+    '''
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[List[Any]], Awaitable[None]],
+        max_batch_size: int = 100,
+        max_queue_size: int = 1000,
+        flush_interval: float = 5,
+        block_timeout: float = 0
+    ):
+        self._name = name
+        self._handler = handler
+        self._max_batch_size = max_batch_size
+        self._flush_interval = flush_interval
+        self._block_timeout = block_timeout
+
+        self._queue = asyncio.Queue(
+            maxsize=max_queue_size)
+        self._task: asyncio.Task = None
+        self._pending: asyncio.Future = None
+        self._collecting = list()
+        self._stopped = False
+
+        self._enqueued = 0
+        self._flushed = 0
+        self._dropped = 0
+        self._failed = 0
+        self._batches = 0
+        self._last_flush_duration = None
+
+    @property
+    def queue_depth(
+        self
+    ) -> int:
+        return self._queue.qsize()
+
+    @property
+    def is_running(
+        self
+    ) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(
+        self
+    ) -> None:
+        '''
+        Start the background flush loop, must be
+        called from a running event loop
+        '''
+
+        self._stopped = False
+
+        if self.is_running:
+            return
+
+        logger.info(f'{self._name}: Starting batch processor')
+        self._task = asyncio.create_task(
+            self._run())
+
+    def enqueue(
+        self,
+        item: Any
+    ) -> bool:
+        '''
+        Queue an item without waiting, the item is
+        dropped and counted if the buffer is full or
+        the processor has been stopped
+        '''
+
+        if self._reject_stopped():
+            return False
+
+        self._ensure_running()
+
+        try:
+            self._queue.put_nowait(item)
+            self._enqueued += 1
+            return True
+        except asyncio.QueueFull:
+            self._dropped += 1
+            logger.warning(
+                f'{self._name}: Buffer full, dropped item: {self._dropped} dropped')
+            return False
+
+    async def put(
+        self,
+        item: Any
+    ) -> bool:
+        '''
+        Queue an item, waiting up to `block_timeout`
+        seconds for space before dropping it
+        '''
+
+        if self._block_timeout <= 0:
+            return self.enqueue(item)
+
+        if self._reject_stopped():
+            return False
+
+        self._ensure_running()
+
+        try:
+            await asyncio.wait_for(
+                self._queue.put(item),
+                timeout=self._block_timeout)
+            self._enqueued += 1
+            return True
+        except asyncio.TimeoutError:
+            self._dropped += 1
+            logger.warning(
+                f'{self._name}: Timed out waiting for buffer space: {self._dropped} dropped')
+            return False
+
+    async def stop(
+        self
+    ) -> None:
+        '''
+        Stop the flush loop and flush anything
+        left in the buffer, items queued after this
+        are dropped rather than restarting the loop
+        '''
+
+        self._stopped = True
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        # Let a flush that was in flight at cancellation
+        # finish before draining the rest
+        if self._pending is not None and not self._pending.done():
+            await self._pending
+
+        # Items pulled off the queue for a batch that
+        # was still being collected
+        collecting, self._collecting = self._collecting, list()
+        await self._flush(collecting)
+
+        logger.info(
+            f'{self._name}: Flushing {self.queue_depth} buffered items on shutdown')
+
+        while not self._queue.empty():
+            batch = self._drain(
+                max_items=self._max_batch_size)
+            await self._flush(batch)
+
+    def get_metrics(
+        self
+    ) -> dict:
+        return {
+            'name': self._name,
+            'running': self.is_running,
+            'stopped': self._stopped,
+            'queue_depth': self.queue_depth,
+            'enqueued': self._enqueued,
+            'flushed': self._flushed,
+            'dropped': self._dropped,
+            'failed': self._failed,
+            'batches': self._batches,
+            'last_flush_duration': self._last_flush_duration
+        }
+
+    def _ensure_running(
+        self
+    ) -> None:
+        if not self.is_running:
+            self.start()
+
+    def _reject_stopped(
+        self
+    ) -> bool:
+        if not self._stopped:
+            return False
+
+        self._dropped += 1
+        logger.warning(
+            f'{self._name}: Processor stopped, dropped item: {self._dropped} dropped')
+
+        return True
+
+    def _drain(
+        self,
+        max_items: int
+    ) -> List[Any]:
+        batch = list()
+        while len(batch) < max_items and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _next_batch(
+        self
+    ) -> List[Any]:
+        '''
+        Wait for the first item, then collect until the
+        batch is full or the flush interval elapses
+        '''
+
+        loop = asyncio.get_running_loop()
+
+        # Collect into the instance so a batch in progress
+        # is still flushed if the loop is cancelled
+        batch = self._collecting
+        batch.append(await self._queue.get())
+        deadline = loop.time() + self._flush_interval
+
+        while len(batch) < self._max_batch_size:
+            batch.extend(self._drain(
+                max_items=self._max_batch_size - len(batch)))
+
+            remaining = deadline - loop.time()
+            if len(batch) >= self._max_batch_size or remaining <= 0:
+                break
+
+            try:
+                batch.append(await asyncio.wait_for(
+                    self._queue.get(),
+                    timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        self._collecting = list()
+        return batch
+
+    async def _run(
+        self
+    ) -> None:
+        while True:
+            batch = await self._next_batch()
+
+            # Shield the flush so a shutdown mid-flush
+            # doesn't lose the batch
+            self._pending = asyncio.ensure_future(
+                self._flush(batch))
+            await asyncio.shield(self._pending)
+
+    async def _flush(
+        self,
+        batch: List[Any]
+    ) -> None:
+        if len(batch) == 0:
+            return
+
+        started = time.perf_counter()
+
+        try:
+            await self._handler(batch)
+            self._flushed += len(batch)
+        except Exception as ex:
+            self._failed += len(batch)
+            logger.exception(
+                f'{self._name}: Failed to flush batch of {len(batch)}: {str(ex)}')
+        finally:
+            self._batches += 1
+            self._last_flush_duration = round(
+                time.perf_counter() - started, 3)
+
+
+class SingleFlight:
+    '''
+    De-duplicate concurrent calls by key, callers that
+    arrive while a call for the same key is in flight
+    share its result
+    '''
+
+    def __init__(
+        self,
+        name: str
+    ):
+        self._name = name
+        self._inflight: Dict[str, asyncio.Future] = dict()
+
+        self._calls = 0
+        self._shared = 0
+
+    def is_inflight(
+        self,
+        key: str
+    ) -> bool:
+        return key in self._inflight
+
+    async def run(
+        self,
+        key: str,
+        func: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        '''
+        Run `func` unless a call for `key` is already
+        in flight, in which case await that call
+        '''
+
+        future = self._inflight.get(key)
+
+        if future is not None:
+            self._shared += 1
+            # Shield so one caller being cancelled doesn't
+            # cancel the call for everyone else
+            return await asyncio.shield(future)
+
+        self._calls += 1
+
+        future = asyncio.ensure_future(func())
+        future.add_done_callback(
+            lambda done: self._release(key, done))
+        self._inflight[key] = future
+
+        return await asyncio.shield(future)
+
+    def _release(
+        self,
+        key: str,
+        future: asyncio.Future
+    ) -> None:
+        if self._inflight.get(key) is future:
+            self._inflight.pop(key)
+
+        # Retrieve the exception so a call nobody is left
+        # waiting on doesn't log an unretrieved error
+        if not future.cancelled():
+            future.exception()
+
+    def get_metrics(
+        self
+    ) -> dict:
+        return {
+            'name': self._name,
+            'inflight': len(self._inflight),
+            'calls': self._calls,
+            'shared': self._shared
+        }
+
+
+class TokenBucket:
+    '''
+    Request budget that refills at `rate` tokens per
+    second up to `capacity`
+    '''
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        capacity: float
+    ):
+        self._name = name
+        self._rate = rate
+        self._capacity = capacity
+
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+        self._acquired = 0
+        self._rejected = 0
+
+    def _refill(
+        self
+    ) -> None:
+        now = time.monotonic()
+
+        self._tokens = min(
+            self._capacity,
+            self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def try_acquire(
+        self,
+        tokens: float = 1
+    ) -> bool:
+        '''
+        Take `tokens` from the bucket if they're available
+        '''
+
+        self._refill()
+
+        if self._tokens < tokens:
+            self._rejected += 1
+            return False
+
+        self._tokens -= tokens
+        self._acquired += 1
+
+        return True
+
+    def get_wait(
+        self,
+        tokens: float = 1
+    ) -> float:
+        '''
+        Seconds until `tokens` are available
+        '''
+
+        self._refill()
+
+        if self._tokens >= tokens or self._rate <= 0:
+            return 0
+
+        return (tokens - self._tokens) / self._rate
+
+    def get_metrics(
+        self
+    ) -> dict:
+        self._refill()
+
+        return {
+            'name': self._name,
+            'rate_per_second': self._rate,
+            'capacity': self._capacity,
+            'available': round(self._tokens, 3),
+            'utilization': round(1 - (self._tokens / self._capacity), 3)
+            if self._capacity > 0 else None,
+            'acquired': self._acquired,
+            'rejected': self._rejected
+        }
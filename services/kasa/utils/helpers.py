@@ -2,6 +2,8 @@ import asyncio
 import datetime
 import json
 import time
+from functools import lru_cache
+
 from framework.crypto.hashing import sha256
 from dateutil import parser
 
@@ -24,6 +26,15 @@ def get_map(items: list, key: str, is_dict: bool = True):
         }
 
 
+def get_config_section(configuration, section: str) -> dict:
+    '''
+    Get an optional configuration section, empty
+    if it isn't defined
+    '''
+
+    return getattr(configuration, section, None) or dict()
+
+
 def generate_key(items):
     return sha256(
         data=json.dumps(
@@ -33,6 +44,20 @@ def generate_key(items):
     )
 
 
+@lru_cache(maxsize=4096)
+def generate_state_key(
+    device_type: str,
+    params: tuple
+) -> str:
+    '''
+    Memoized state key for a device type and its state
+    parameters, which don't depend on the device
+    '''
+
+    return generate_key(
+        items=params)
+
+
 class DateTimeUtil:
     @staticmethod
     def timestamp() -> int:
@@ -1,21 +1,176 @@
 from functools import wraps
 from typing import List
 
-from framework.auth.wrappers.azure_ad_wrappers import azure_ad_authorization
 from framework.di.static_provider import inject_container_async
+from framework.exceptions.nulls import ArgumentNullException
 from framework.handlers.response_handler_async import response_handler
-from quart import Blueprint
+from framework.logger.providers import get_logger
+from quart import Blueprint, Response, request
+
+from domain.exceptions import (ForbiddenException,
+                               InvalidClientResponseRequestException,
+                               InvalidCursorException,
+                               InvalidDeviceException,
+                               InvalidDeviceLogRequestException,
+                               InvalidDeviceRequestException,
+                               InvalidDeviceTypeException,
+                               InvalidPresetException, InvalidRegionException,
+                               InvalidRegionIdException, NotFoundException,
+                               NullArgumentException, RequiredFieldException,
+                               RequiredRouteSegmentException,
+                               UnauthorizedException)
+from services.kasa_auth_service import KasaAuthService
+from utils.serialization import (STREAM_CHUNK_SIZE, json_array_response,
+                                 json_response)
+
+logger = get_logger(__name__)
+
+# Request errors the caller can fix, anything else from
+# a streamed route is a server error
+BAD_REQUEST_EXCEPTIONS = (
+    ArgumentNullException,
+    NullArgumentException,
+    RequiredFieldException,
+    RequiredRouteSegmentException,
+    InvalidClientResponseRequestException,
+    InvalidCursorException,
+    InvalidDeviceException,
+    InvalidDeviceLogRequestException,
+    InvalidDeviceRequestException,
+    InvalidDeviceTypeException,
+    InvalidPresetException,
+    InvalidRegionException,
+    InvalidRegionIdException
+)
+
+
+def get_auth_service() -> KasaAuthService:
+    # Deferred to avoid importing the container graph
+    # when the routes are imported
+    from utils.provider import ContainerProvider
+
+    return ContainerProvider.get_service_provider().resolve(
+        KasaAuthService)
+
+
+def get_bearer_token() -> str:
+    header = request.headers.get('Authorization', '')
+    scheme, _, token = header.partition(' ')
+
+    if scheme.lower() != 'bearer':
+        return None
+
+    return token.strip()
+
+
+def token_authorization(scheme: str):
+    '''
+    Authorize the request bearer token against the
+    policy `scheme`, verified tokens are cached until
+    they expire
+    '''
+
+    def decorator(function):
+        @wraps(function)
+        async def wrapper(*args, **kwargs):
+            try:
+                await get_auth_service().authorize(
+                    token=get_bearer_token(),
+                    policy=scheme)
+            except UnauthorizedException as ex:
+                return {'error': str(ex)}, 401
+            except ForbiddenException as ex:
+                return {'error': str(ex)}, 403
+
+            return await function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_error_status(ex: Exception) -> int:
+    if isinstance(ex, BAD_REQUEST_EXCEPTIONS):
+        return 400
+    if isinstance(ex, NotFoundException):
+        return 404
+
+    return 500
+
+
+def stream_error_handler(function):
+    '''
+    Error handling for streamed routes, which return
+    the response as-is rather than going through
+    the response handler
+    '''
+
+    @wraps(function)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await function(*args, **kwargs)
+        except Exception as ex:
+            status = get_error_status(ex)
+
+            if status == 500:
+                logger.exception(f'Stream request failed: {str(ex)}')
+            else:
+                logger.info(f'Stream request rejected: {status}: {str(ex)}')
+
+            return {'error': str(ex)}, status
+    return wrapper
 
 
 class MetaBlueprint(Blueprint):
     def configure(self,  rule: str, methods: List[str], auth_scheme: str):
         def decorator(function):
             @self.route(rule, methods=methods, endpoint=f'__route__{function.__name__}')
+            @token_authorization(scheme=auth_scheme)
             @response_handler
-            @azure_ad_authorization(scheme=auth_scheme)
             @inject_container_async
             @wraps(function)
             async def wrapper(*args, **kwargs):
                 return await function(*args, **kwargs)
             return wrapper
         return decorator
+
+    def stream(self, rule: str, methods: List[str], auth_scheme: str):
+        def decorator(function):
+            @self.route(rule, methods=methods, endpoint=f'__route__{function.__name__}')
+            @token_authorization(scheme=auth_scheme)
+            @stream_error_handler
+            @inject_container_async
+            @wraps(function)
+            async def wrapper(*args, **kwargs):
+                return await function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def json(self, rule: str, methods: List[str], auth_scheme: str):
+        '''
+        Route that encodes its result on the fast JSON path,
+        large lists are streamed as a JSON array and
+        responses are gzipped when the client accepts it
+        '''
+
+        def decorator(function):
+            @self.route(rule, methods=methods, endpoint=f'__route__{function.__name__}')
+            @token_authorization(scheme=auth_scheme)
+            @stream_error_handler
+            @inject_container_async
+            @wraps(function)
+            async def wrapper(*args, **kwargs):
+                result = await function(*args, **kwargs)
+
+                if isinstance(result, Response):
+                    return result
+
+                if (isinstance(result, (list, tuple))
+                        and len(result) > STREAM_CHUNK_SIZE):
+                    return json_array_response(
+                        items=result,
+                        headers=request.headers)
+
+                return json_response(
+                    value=result,
+                    headers=request.headers)
+            return wrapper
+        return decorator
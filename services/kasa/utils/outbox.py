@@ -0,0 +1,519 @@
+import asyncio
+import json
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, List
+
+from framework.logger.providers import get_logger
+
+logger = get_logger(__name__)
+
+
+class OutboxEntry:
+    def __init__(
+        self,
+        entry_id: int,
+        payload: dict,
+        created: float,
+        attempts: int
+    ):
+        self.entry_id = entry_id
+        self.payload = payload
+        self.created = created
+        self.attempts = attempts
+
+
+class SqliteOutbox:
+    '''
+    Durable append-only outbox backed by a local SQLite
+    file, blocking calls are run off the event loop
+    '''
+
+    def __init__(
+        self,
+        path: str
+    ):
+        self._path = path
+        self._cnxn: sqlite3.Connection = None
+        self._lock = threading.Lock()
+
+    def _connect(
+        self
+    ) -> sqlite3.Connection:
+        if self._cnxn is None:
+            logger.info(f'Opening outbox: {self._path}')
+
+            cnxn = sqlite3.connect(
+                self._path,
+                isolation_level=None,
+                check_same_thread=False)
+
+            cnxn.execute('PRAGMA journal_mode=WAL')
+            cnxn.execute('''
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    payload TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt REAL NOT NULL DEFAULT 0,
+                    last_error TEXT
+                )''')
+            cnxn.execute('''
+                CREATE INDEX IF NOT EXISTS ix_outbox_next_attempt
+                ON outbox (next_attempt, id)''')
+            cnxn.execute('''
+                CREATE TABLE IF NOT EXISTS outbox_dead_letter (
+                    id INTEGER PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    last_error TEXT,
+                    dead_lettered REAL NOT NULL
+                )''')
+
+            self._cnxn = cnxn
+
+        return self._cnxn
+
+    def _execute(
+        self,
+        func: Callable[[sqlite3.Connection], Any]
+    ) -> Any:
+        with self._lock:
+            return func(self._connect())
+
+    async def _run(
+        self,
+        func: Callable[[sqlite3.Connection], Any]
+    ) -> Any:
+        return await asyncio.to_thread(
+            self._execute, func)
+
+    async def append(
+        self,
+        payload: dict
+    ) -> int:
+        '''
+        Durably append a payload, returns the entry ID
+        '''
+
+        data = json.dumps(payload, default=str)
+
+        def append(cnxn: sqlite3.Connection):
+            cursor = cnxn.execute(
+                'INSERT INTO outbox (payload, created) VALUES (?, ?)',
+                (data, time.time()))
+            return cursor.lastrowid
+
+        return await self._run(append)
+
+    async def fetch(
+        self,
+        limit: int
+    ) -> List[OutboxEntry]:
+        '''
+        Get the oldest entries that are due for
+        delivery
+        '''
+
+        def fetch(cnxn: sqlite3.Connection):
+            return cnxn.execute(
+                '''SELECT id, payload, created, attempts FROM outbox
+                WHERE next_attempt <= ? ORDER BY id LIMIT ?''',
+                (time.time(), limit)).fetchall()
+
+        rows = await self._run(fetch)
+
+        return [OutboxEntry(
+            entry_id=row[0],
+            payload=json.loads(row[1]),
+            created=row[2],
+            attempts=row[3])
+            for row in rows]
+
+    async def remove(
+        self,
+        entry_ids: List[int]
+    ) -> None:
+        '''
+        Remove delivered entries
+        '''
+
+        def remove(cnxn: sqlite3.Connection):
+            cnxn.executemany(
+                'DELETE FROM outbox WHERE id = ?',
+                [(entry_id,) for entry_id in entry_ids])
+
+        await self._run(remove)
+
+    async def defer(
+        self,
+        entry_ids: List[int],
+        delay: float,
+        error: str = None,
+        count_attempt: bool = True
+    ) -> None:
+        '''
+        Hold the entries back for `delay` seconds, records
+        a failed delivery attempt unless `count_attempt` is
+        unset
+        '''
+
+        next_attempt = time.time() + delay
+        increment = 1 if count_attempt else 0
+
+        def defer(cnxn: sqlite3.Connection):
+            cnxn.executemany(
+                '''UPDATE outbox SET attempts = attempts + ?,
+                next_attempt = ?, last_error = ? WHERE id = ?''',
+                [(increment, next_attempt, error, entry_id)
+                 for entry_id in entry_ids])
+
+        await self._run(defer)
+
+    async def dead_letter(
+        self,
+        entry_ids: List[int],
+        error: str = None
+    ) -> None:
+        '''
+        Move entries that can't be delivered out of the
+        outbox into the dead letter table
+        '''
+
+        def dead_letter(cnxn: sqlite3.Connection):
+            with cnxn:
+                cnxn.execute('BEGIN')
+                cnxn.executemany(
+                    '''INSERT OR REPLACE INTO outbox_dead_letter
+                    (id, payload, created, attempts, last_error, dead_lettered)
+                    SELECT id, payload, created, attempts + 1, ?, ?
+                    FROM outbox WHERE id = ?''',
+                    [(error, time.time(), entry_id)
+                     for entry_id in entry_ids])
+                cnxn.executemany(
+                    'DELETE FROM outbox WHERE id = ?',
+                    [(entry_id,) for entry_id in entry_ids])
+
+        await self._run(dead_letter)
+
+    async def get_stats(
+        self
+    ) -> dict:
+        '''
+        Get the pending entry count and the age of
+        the oldest pending entry
+        '''
+
+        def stats(cnxn: sqlite3.Connection):
+            pending, oldest = cnxn.execute(
+                'SELECT COUNT(*), MIN(created) FROM outbox').fetchone()
+            dead_lettered = cnxn.execute(
+                'SELECT COUNT(*) FROM outbox_dead_letter').fetchone()[0]
+
+            return pending, oldest, dead_lettered
+
+        pending, oldest, dead_lettered = await self._run(stats)
+
+        return {
+            'pending': pending,
+            'dead_lettered': dead_lettered,
+            'lag_seconds': (
+                round(time.time() - oldest, 3)
+                if oldest is not None else 0)
+        }
+
+    def close(
+        self
+    ) -> None:
+        with self._lock:
+            if self._cnxn is not None:
+                self._cnxn.close()
+                self._cnxn = None
+
+
+class OutboxRelay:
+    '''
+    Background relay that drains an outbox in batches
+    to `handler`, a failed batch is retried one entry at
+    a time so a single bad entry can't hold back the rest,
+    entries are retried with exponential backoff and dead
+    lettered after `max_attempts`
+    '''
+
+    def __init__(
+        self,
+        name: str,
+        outbox: SqliteOutbox,
+        handler: Callable[[List[Any]], Awaitable[None]],
+        batch_size: int = 100,
+        poll_interval: float = 1,
+        retry_delay: float = 1,
+        max_retry_delay: float = 60,
+        max_attempts: int = 10
+    ):
+        self._name = name
+        self._outbox = outbox
+        self._handler = handler
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+        self._retry_delay = retry_delay
+        self._max_retry_delay = max_retry_delay
+        self._max_attempts = max_attempts
+
+        self._task: asyncio.Task = None
+        self._wake: asyncio.Event = None
+
+        self._relayed = 0
+        self._failed = 0
+        self._batches = 0
+        self._pending = 0
+        self._dead_lettered = 0
+        self._lag_seconds = 0
+        self._last_error = None
+        self._last_relay_duration = None
+
+    @property
+    def outbox(
+        self
+    ) -> SqliteOutbox:
+        return self._outbox
+
+    @property
+    def is_running(
+        self
+    ) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(
+        self
+    ) -> None:
+        '''
+        Start the relay loop, must be called from a
+        running event loop
+        '''
+
+        if self.is_running:
+            return
+
+        logger.info(f'{self._name}: Starting outbox relay')
+
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(
+            self._run())
+
+    def notify(
+        self
+    ) -> None:
+        '''
+        Wake the relay when a new entry is appended
+        '''
+
+        if self._wake is not None:
+            self._wake.set()
+
+    async def stop(
+        self
+    ) -> None:
+        '''
+        Stop the relay loop, undelivered entries stay
+        in the outbox for the next start
+        '''
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        self._outbox.close()
+
+    def get_retry_delay(
+        self,
+        attempts: int
+    ) -> float:
+        delay = min(
+            self._retry_delay * (2 ** attempts),
+            self._max_retry_delay)
+
+        # Jitter so retries don't hammer a recovering
+        # broker in lockstep
+        return delay * random.uniform(0.5, 1)
+
+    async def relay(
+        self
+    ) -> int:
+        '''
+        Relay one batch of due entries, returns the
+        number of entries delivered
+        '''
+
+        entries = await self._outbox.fetch(
+            limit=self._batch_size)
+
+        if not any(entries):
+            await self._refresh_stats()
+            return 0
+
+        started = time.perf_counter()
+
+        try:
+            await self._handler(
+                [entry.payload for entry in entries])
+
+            delivered = entries
+
+        except Exception as ex:
+            self._last_error = str(ex)
+
+            logger.exception(
+                f'{self._name}: Failed to relay {len(entries)} entries: {str(ex)}')
+
+            if len(entries) > 1:
+                delivered = await self._relay_each(
+                    entries=entries)
+            else:
+                delivered = list()
+                await self._fail(
+                    entry=entries[0],
+                    error=str(ex))
+
+        finally:
+            self._batches += 1
+            self._last_relay_duration = round(
+                time.perf_counter() - started, 3)
+
+        if any(delivered):
+            await self._outbox.remove(
+                entry_ids=[entry.entry_id for entry in delivered])
+
+            self._relayed += len(delivered)
+            logger.info(f'{self._name}: Relayed {len(delivered)} entries')
+
+        await self._refresh_stats()
+
+        return len(delivered)
+
+    async def _relay_each(
+        self,
+        entries: List[OutboxEntry]
+    ) -> List[OutboxEntry]:
+        '''
+        Deliver a failed batch one entry at a time, stops
+        at the first failure so an outage costs one more
+        call rather than one per entry, returns the entries
+        that were delivered
+        '''
+
+        delivered = list()
+
+        for index, entry in enumerate(entries):
+            try:
+                await self._handler([entry.payload])
+                delivered.append(entry)
+                continue
+            except Exception as ex:
+                await self._fail(
+                    entry=entry,
+                    error=str(ex))
+
+            # Hold the untried entries back without counting
+            # an attempt against them, the failed entry is
+            # backed off so they go ahead of it next time
+            remaining = [remaining.entry_id
+                         for remaining in entries[index + 1:]]
+
+            if any(remaining):
+                await self._outbox.defer(
+                    entry_ids=remaining,
+                    delay=self.get_retry_delay(attempts=0),
+                    count_attempt=False)
+
+            break
+
+        return delivered
+
+    async def _fail(
+        self,
+        entry: OutboxEntry,
+        error: str
+    ) -> None:
+        '''
+        Back off a failed entry, or dead letter it once it's
+        out of attempts
+        '''
+
+        self._failed += 1
+        self._last_error = error
+
+        if entry.attempts + 1 >= self._max_attempts:
+            logger.info(
+                f'{self._name}: Dead lettering entry {entry.entry_id} after {entry.attempts + 1} attempts: {error}')
+
+            await self._outbox.dead_letter(
+                entry_ids=[entry.entry_id],
+                error=error)
+            return
+
+        await self._outbox.defer(
+            entry_ids=[entry.entry_id],
+            delay=self.get_retry_delay(
+                attempts=entry.attempts),
+            error=error)
+
+    def get_metrics(
+        self
+    ) -> dict:
+        return {
+            'name': self._name,
+            'running': self.is_running,
+            'pending': self._pending,
+            'dead_lettered': self._dead_lettered,
+            'lag_seconds': self._lag_seconds,
+            'relayed': self._relayed,
+            'failed': self._failed,
+            'batches': self._batches,
+            'last_error': self._last_error,
+            'last_relay_duration': self._last_relay_duration
+        }
+
+    async def _refresh_stats(
+        self
+    ) -> None:
+        stats = await self._outbox.get_stats()
+
+        self._pending = stats.get('pending')
+        self._dead_lettered = stats.get('dead_lettered')
+        self._lag_seconds = stats.get('lag_seconds')
+
+    async def _run(
+        self
+    ) -> None:
+        while True:
+            # Clear before relaying so an append during the
+            # relay isn't missed
+            self._wake.clear()
+
+            try:
+                relayed = await self.relay()
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                relayed = 0
+                logger.exception(
+                    f'{self._name}: Outbox relay error: {str(ex)}')
+
+            # Keep draining while there's a full backlog
+            if relayed >= self._batch_size:
+                continue
+
+            try:
+                await asyncio.wait_for(
+                    self._wake.wait(),
+                    timeout=self._poll_interval)
+            except asyncio.TimeoutError:
+                pass
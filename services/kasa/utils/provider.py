@@ -5,15 +5,20 @@ from framework.clients.feature_client import FeatureClientAsync
 from framework.configuration.configuration import Configuration
 from framework.di.service_collection import ServiceCollection
 from framework.di.static_provider import ProviderBase
-from httpx import AsyncClient
+from httpx import AsyncClient, AsyncHTTPTransport
 from motor.motor_asyncio import AsyncIOMotorClient
 
 from clients.event_client import EventClient
 from clients.identity_client import IdentityClient
+from clients.jwks_client import JwksClient
 from clients.kasa_client import KasaClient
+from clients.kasa_simulator import KasaCloudSimulator
 from data.repositories.kasa_client_response_repository import \
     KasaClientResponseRepository
-from data.repositories.kasa_device_repository import KasaDeviceLogRepository, KasaDeviceRepository
+from data.repositories.kasa_device_repository import (
+    KasaDeviceLogRepository, KasaDeviceLogRollupRepository,
+    KasaDeviceRepository)
+from data.repositories.kasa_lease_repository import KasaLeaseRepository
 from data.repositories.kasa_preset_repository import KasaPresetRepository
 from data.repositories.kasa_region_repository import KasaRegionRepository
 from data.repositories.kasa_scene_category_repository import \
@@ -22,11 +27,18 @@ from data.repositories.kasa_scene_repository import KasaSceneRepository
 from domain.kasa.auth import configure_azure_ad
 from providers.kasa_client_response_provider import KasaClientResponseProvider
 from providers.kasa_device_provider import KasaDeviceProvider
+from services.kasa_auth_service import KasaAuthService
 from services.kasa_client_response_service import KasaClientResponseService
+from services.kasa_device_log_service import KasaDeviceLogService
 from services.kasa_device_service import KasaDeviceService
+from services.kasa_device_shadow_service import KasaDeviceShadowService
+from services.kasa_diagnostics_service import KasaDiagnosticsService
+from services.kasa_discovery_service import KasaDiscoveryService
 from services.kasa_event_service import KasaEventService
 from services.kasa_execution_service import KasaExecutionService
+from services.kasa_polling_service import KasaPollingService
 from services.kasa_preset_service import KasaPresetSevice
+from services.kasa_reconciler_service import KasaReconcilerService
 from services.kasa_region_service import KasaRegionService
 from services.kasa_scene_category_service import KasaSceneCategoryService
 from services.kasa_scene_service import KasaSceneService
@@ -36,6 +48,20 @@ import ssl
 def configure_http_client(container):
     ctx = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
     ctx.options |= 0x4  # OP_LEGACY_SERVER_CONNECT
+
+    configuration = container.resolve(Configuration)
+    simulator = configuration.kasa.get('simulator') or dict()
+
+    # Serve Kasa cloud requests from the simulator for load
+    # testing, every other host goes over the network
+    if simulator.get('enabled', False):
+        return AsyncClient(
+            timeout=None,
+            transport=KasaCloudSimulator.from_config(
+                base_url=configuration.kasa.get('base_url'),
+                settings=simulator,
+                fallback=AsyncHTTPTransport()))
+
     return AsyncClient(timeout=None)
 
 
@@ -56,6 +82,7 @@ def register_clients(descriptors: ServiceCollection):
     descriptors.add_singleton(CacheClientAsync)
     descriptors.add_singleton(FeatureClientAsync)
     descriptors.add_singleton(IdentityClient)
+    descriptors.add_singleton(JwksClient)
     descriptors.add_singleton(EventClient)
     descriptors.add_singleton(KasaClient)
 
@@ -68,17 +95,26 @@ def register_repositories(descriptors: ServiceCollection):
     descriptors.add_singleton(KasaClientResponseRepository)
     descriptors.add_singleton(KasaSceneCategoryRepository)
     descriptors.add_singleton(KasaDeviceLogRepository)
+    descriptors.add_singleton(KasaDeviceLogRollupRepository)
+    descriptors.add_singleton(KasaLeaseRepository)
 
 
 def register_services(descriptors: ServiceCollection):
     descriptors.add_singleton(KasaPresetSevice)
     descriptors.add_singleton(KasaSceneService)
     descriptors.add_singleton(KasaDeviceService)
+    descriptors.add_singleton(KasaDeviceLogService)
+    descriptors.add_singleton(KasaDeviceShadowService)
     descriptors.add_singleton(KasaSceneCategoryService)
     descriptors.add_singleton(KasaExecutionService)
     descriptors.add_singleton(KasaRegionService)
     descriptors.add_singleton(KasaEventService)
     descriptors.add_singleton(KasaClientResponseService)
+    descriptors.add_singleton(KasaDiagnosticsService)
+    descriptors.add_singleton(KasaAuthService)
+    descriptors.add_singleton(KasaReconcilerService)
+    descriptors.add_singleton(KasaPollingService)
+    descriptors.add_singleton(KasaDiscoveryService)
 
 
 def register_providers(descriptors: ServiceCollection):
@@ -0,0 +1,174 @@
+import datetime
+import json
+import uuid
+import zlib
+from typing import Any, AsyncIterable, AsyncIterator, Iterable
+
+from quart import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+JSON_MIMETYPE = 'application/json'
+
+# Responses smaller than this aren't worth compressing
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+
+# Number of array items encoded per streamed chunk
+STREAM_CHUNK_SIZE = 256
+
+
+def default(value: Any) -> Any:
+    '''
+    Fallback encoder for types the JSON encoder doesn't
+    handle natively
+    '''
+
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (set, tuple)):
+        return list(value)
+
+    raise TypeError(
+        f'Type is not JSON serializable: {type(value).__name__}')
+
+
+def dumps(value: Any) -> bytes:
+    '''
+    Encode a value to JSON bytes, using orjson when
+    it's installed
+    '''
+
+    if orjson is not None:
+        return orjson.dumps(
+            value,
+            default=default,
+            option=orjson.OPT_NON_STR_KEYS)
+
+    return json.dumps(
+        value,
+        default=default,
+        separators=(',', ':')).encode()
+
+
+def accepts_gzip(headers) -> bool:
+    accept_encoding = headers.get('Accept-Encoding', '')
+
+    return any([
+        encoding.split(';')[0].strip().lower() == 'gzip'
+        for encoding in accept_encoding.split(',')
+    ])
+
+
+async def iter_json_array(
+    items: Iterable | AsyncIterable,
+    chunk_size: int = STREAM_CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    '''
+    Encode a collection as a JSON array a chunk of items
+    at a time rather than as one string
+    '''
+
+    yield b'['
+
+    chunk = list()
+    separator = b''
+
+    def encode_chunk():
+        encoded = separator + b','.join([dumps(item) for item in chunk])
+        chunk.clear()
+        return encoded
+
+    if hasattr(items, '__aiter__'):
+        async for item in items:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                yield encode_chunk()
+                separator = b','
+    else:
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                yield encode_chunk()
+                separator = b','
+
+    if len(chunk) > 0:
+        yield encode_chunk()
+
+    yield b']'
+
+
+async def gzip_chunks(
+    chunks: AsyncIterable[bytes],
+    level: int = GZIP_LEVEL
+) -> AsyncIterator[bytes]:
+    '''
+    Gzip a stream of chunks as they're produced
+    '''
+
+    # wbits 31 writes the gzip header and trailer
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    async for chunk in chunks:
+        # Sync flush so each chunk goes out as it's encoded
+        # instead of sitting in the compressor
+        yield (compressor.compress(chunk)
+               + compressor.flush(zlib.Z_SYNC_FLUSH))
+
+    yield compressor.flush()
+
+
+def json_response(
+    value: Any,
+    headers,
+    status: int = 200
+) -> Response:
+    '''
+    Encode a value as a JSON response, gzipped when the
+    client accepts it and the body is large enough
+    '''
+
+    body = dumps(value)
+    response_headers = dict()
+
+    if len(body) >= GZIP_MIN_SIZE and accepts_gzip(headers):
+        body = zlib.compress(body, GZIP_LEVEL, wbits=31)
+        response_headers['Content-Encoding'] = 'gzip'
+        response_headers['Vary'] = 'Accept-Encoding'
+
+    return Response(
+        body,
+        status=status,
+        mimetype=JSON_MIMETYPE,
+        headers=response_headers)
+
+
+def json_array_response(
+    items: Iterable | AsyncIterable,
+    headers
+) -> Response:
+    '''
+    Stream a collection as a JSON array response, the
+    first items are sent before the whole collection
+    is encoded
+    '''
+
+    body = iter_json_array(items)
+    response_headers = dict()
+
+    if accepts_gzip(headers):
+        body = gzip_chunks(body)
+        response_headers['Content-Encoding'] = 'gzip'
+        response_headers['Vary'] = 'Accept-Encoding'
+
+    return Response(
+        body,
+        mimetype=JSON_MIMETYPE,
+        headers=response_headers)